@@ -1,6 +1,27 @@
 from django.apps import AppConfig
+from django.conf import settings
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_migrate
+
+
+def repair_search_index(sender, using, **kwargs):
+    """
+    SQLite migrations that rebuild the task table drop its triggers; recreate them (and reindex) if so.
+    """
+    from django.db import connections
+    from .search import create_search_index
+    create_search_index(connections[using])
 
 
 class TaskSystemConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'TaskSystemapp'
+
+    def ready(self):
+        from . import signals  # noqa: F401  Registers the task change receivers
+        post_migrate.connect(repair_search_index, sender=self)
+        from .db import configure_sqlite
+        connection_created.connect(configure_sqlite)
+        if 'TaskSystemapp.middleware.RequestTimingMiddleware' in settings.MIDDLEWARE:
+            from .middleware import install_query_recorder
+            connection_created.connect(install_query_recorder)
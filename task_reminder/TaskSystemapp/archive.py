@@ -0,0 +1,94 @@
+"""
+Hot/cold split of tasks: completed tasks that are older than TASK_ARCHIVE_AFTER_DAYS move from Task to TaskArchive.
+
+The archiver (the archive_tasks command) moves tasks in chunks. Each chunk is copied and deleted in its own short
+transaction, so it never holds the database's write lock for long, and an interrupted run simply continues on the
+next one. Only the archive view reads the archive; restoring a task moves it back with its old id.
+"""
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .models import Task, TaskArchive
+from .realtime import publish_task_changes
+from .signals import batch_task_changes
+
+ARCHIVE_AFTER = timedelta(days=getattr(settings, 'TASK_ARCHIVE_AFTER_DAYS', 90))
+ARCHIVE_CHUNK_SIZE = getattr(settings, 'TASK_ARCHIVE_CHUNK_SIZE', 500)
+ARCHIVED_FIELDS = (
+    'title', 'description', 'priority', 'created_at', 'start_date', 'due_date', 'reminder_offset',
+    'recurrence', 'recurrence_interval', 'recurrence_until',
+)
+
+
+def archivable_tasks(cutoff, user=None):
+    """
+    Completed tasks that were due and last changed before cutoff.
+    """
+    tasks = Task.objects.filter(is_completed=True, due_date__lt=cutoff, updated_at__lt=cutoff)
+    if user is not None:
+        tasks = tasks.filter(user=user)
+    return tasks
+
+
+def archive_chunk(cutoff, chunk_size, user=None):
+    """
+    Moves up to chunk_size archivable tasks to the archive in one transaction. Returns the number moved.
+    """
+    with transaction.atomic(), batch_task_changes():
+        tasks = list(archivable_tasks(cutoff, user).order_by('pk')[:chunk_size])
+        if not tasks:
+            return 0
+        TaskArchive.objects.bulk_create([
+            TaskArchive(
+                task_id=task.pk, user_id=task.user_id, completed_at=task.updated_at,
+                **{field: getattr(task, field) for field in ARCHIVED_FIELDS}
+            )
+            for task in tasks
+        ])
+        Task.objects.filter(pk__in=[task.pk for task in tasks]).delete()
+        by_user = {}
+        for task in tasks:
+            by_user.setdefault(task.user_id, []).append({'op': 'delete', 'id': task.pk})
+        for user_id, changes in by_user.items():
+            publish_task_changes(user_id, changes)
+    return len(tasks)
+
+
+def archive_tasks(older_than=None, chunk_size=None, user=None, pause=0, progress=None):
+    """
+    Archives every archivable task, chunk by chunk, sleeping pause seconds between chunks to leave room for other
+    writers. progress(moved) is called after every chunk with the running total. Returns the number of tasks moved.
+    """
+    cutoff = timezone.now() - (older_than or ARCHIVE_AFTER)
+    chunk_size = chunk_size or ARCHIVE_CHUNK_SIZE
+    total = 0
+    while True:
+        moved = archive_chunk(cutoff, chunk_size, user)
+        if not moved:
+            return total
+        total += moved
+        if progress:
+            progress(total)
+        if pause:
+            time.sleep(pause)
+
+
+def restore_task(archived):
+    """
+    Moves an archived task back to the task table, completed and with its old id.
+    """
+    with transaction.atomic():
+        task = Task(
+            pk=archived.task_id, user_id=archived.user_id, is_completed=True,
+            **{field: getattr(archived, field) for field in ARCHIVED_FIELDS}
+        )
+        task.save(force_insert=True)
+        # created_at is auto_now_add, so the original creation time is put back afterwards
+        Task.objects.filter(pk=task.pk).update(created_at=archived.created_at)
+        task.created_at = archived.created_at
+        archived.delete()
+    return task
@@ -0,0 +1,59 @@
+"""
+Per-user cache of task views.
+
+Keys include the user's tasks_version, so any task change makes the old entries unreachable
+and they simply age out of the cache (LRU culling and TTL) instead of being deleted one by one.
+"""
+import hashlib
+
+from django.conf import settings
+from django.core.cache import caches
+from django.utils.http import quote_etag
+
+# Rendered home page fragments are also time dependent (the "expiring" flags), so they live briefly
+HOME_FRAGMENT_TIMEOUT = getattr(settings, 'TASK_CACHE_HOME_TIMEOUT', 60)
+EVENTS_TIMEOUT = getattr(settings, 'TASK_CACHE_EVENTS_TIMEOUT', 300)
+# The widget's upcoming tasks also change as time passes, so they are recomputed at least this often
+WIDGET_TIMEOUT = getattr(settings, 'TASK_CACHE_WIDGET_TIMEOUT', 60)
+# Larger event feeds are streamed without being cached
+EVENTS_MAX_BYTES = getattr(settings, 'TASK_CACHE_EVENTS_MAX_BYTES', 1024 * 1024)
+
+
+def task_cache():
+    return caches[getattr(settings, 'TASK_CACHE_ALIAS', 'default')]
+
+
+def task_cache_key(user, name, *parts):
+    """
+    Cache key for one of the user's task views at the current task version.
+    date_joined guards against a recreated account inheriting a reused id.
+    """
+    digest = hashlib.md5('|'.join(str(part) for part in parts).encode()).hexdigest()
+    return f'tasks:{user.pk}:{user.date_joined.timestamp()}:{user.tasks_version}:{name}:{digest}'
+
+
+def task_validators(user, key):
+    """
+    ETag and Last-Modified timestamp (or None) for a response cached under key,
+    for use with django.utils.cache.get_conditional_response.
+    """
+    etag = quote_etag(hashlib.md5(key.encode()).hexdigest())
+    last_modified = int(user.tasks_changed_at.timestamp()) if user.tasks_changed_at else None
+    return etag, last_modified
+
+
+async def cache_stream(key, chunks, timeout=EVENTS_TIMEOUT, max_bytes=EVENTS_MAX_BYTES):
+    """
+    Passes the async chunks through while keeping a copy, which is cached once the stream completes within max_bytes.
+    """
+    kept = []
+    size = 0
+    async for chunk in chunks:
+        if kept is not None:
+            kept.append(chunk)
+            size += len(chunk)
+            if size > max_bytes:
+                kept = None
+        yield chunk
+    if kept is not None:
+        await task_cache().aset(key, ''.join(kept), timeout)
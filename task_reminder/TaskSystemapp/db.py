@@ -0,0 +1,18 @@
+"""
+SQLite connection set-up.
+"""
+from django.conf import settings
+
+
+def configure_sqlite(sender, connection, **kwargs):
+    """
+    connection_created receiver applying SQLITE_PRAGMAS to each new SQLite connection.
+    Replica connections are also made read-only.
+    """
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        for name, value in getattr(settings, 'SQLITE_PRAGMAS', {}).items():
+            cursor.execute(f'PRAGMA {name} = {value}')
+        if connection.alias != 'default':
+            cursor.execute('PRAGMA query_only = ON')
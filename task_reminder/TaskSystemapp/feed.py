@@ -0,0 +1,285 @@
+"""
+iCalendar subscription feed of a user's tasks.
+
+Calendar apps poll the feed URL, which carries the user's feed_token instead of a session.
+Tasks are rendered from an async projected query, one chunk of components at a time, so the feed is streamed rather than built in memory.
+"""
+from calendar import monthrange
+from datetime import date, datetime, timedelta, timezone as dt_timezone
+
+from django.utils import timezone
+
+from .models import Task, TaskOccurrence
+
+# Rows fetched from the database (and components written) per chunk of the feed
+FEED_CHUNK_SIZE = 500
+FEED_COLUMNS = (
+    'id', 'title', 'description', 'priority', 'start_date', 'due_date', 'is_completed', 'reminder_offset', 'updated_at',
+    'recurrence', 'recurrence_interval', 'recurrence_until',
+)
+# iCalendar PRIORITY: 1 is the highest, 9 the lowest
+ICS_PRIORITY = {'high': 1, 'medium': 5, 'low': 9}
+# iCalendar BYDAY weekday codes, Monday first as in date.weekday()
+ICS_WEEKDAYS = ('MO', 'TU', 'WE', 'TH', 'FR', 'SA', 'SU')
+
+
+def escape_text(value):
+    """
+    Escapes a TEXT property value (RFC 5545 3.3.11).
+    """
+    return (
+        value.replace('\\', '\\\\').replace(';', '\\;').replace(',', '\\,')
+        .replace('\r\n', '\\n').replace('\n', '\\n').replace('\r', '\\n')
+    )
+
+
+def fold_line(line):
+    """
+    Folds a content line into lines of at most 75 octets, continued with a leading space, and ends it with CRLF.
+    """
+    encoded = line.encode()
+    if len(encoded) <= 75:
+        return line + '\r\n'
+    parts = []
+    start = 0
+    limit = 75
+    while start < len(encoded):
+        end = min(start + limit, len(encoded))
+        # Never split inside a multi-byte UTF-8 character
+        while end < len(encoded) and (encoded[end] & 0xC0) == 0x80:
+            end -= 1
+        parts.append(encoded[start:end].decode())
+        start = end
+        limit = 74
+    return '\r\n '.join(parts) + '\r\n'
+
+
+def format_utc(value):
+    return value.astimezone(dt_timezone.utc).strftime('%Y%m%dT%H%M%SZ')
+
+
+def zone_id(tz):
+    """
+    The TZID times in tz are written with, or None for a UTC zone, whose times are written in UTC.
+    """
+    key = getattr(tz, 'key', None)
+    return None if key in (None, 'UTC', 'Etc/UTC') else key
+
+
+def local_time(value, tz):
+    return value.astimezone(tz).replace(tzinfo=None)
+
+
+def format_local(name, walls, tz):
+    """
+    A DATE-TIME property with one or more naive local times of tz, e.g. DUE;TZID=Europe/London:20300102T170000.
+    """
+    tzid = zone_id(tz)
+    values = ','.join(wall.strftime('%Y%m%dT%H%M%S') + ('' if tzid else 'Z') for wall in walls)
+    return f'{name};TZID={tzid}:{values}' if tzid else f'{name}:{values}'
+
+
+def format_time(name, value, tz):
+    return format_local(name, [local_time(value, tz)], tz)
+
+
+def format_offset(offset):
+    sign = '-' if offset < timedelta(0) else '+'
+    minutes = abs(offset) // timedelta(minutes=1)
+    return f'{sign}{minutes // 60:02d}{minutes % 60:02d}'
+
+
+def offset_changes(tz, year):
+    """
+    The UTC times in year, to the minute, at which the UTC offset of tz changes.
+    """
+    changes = []
+    day = datetime(year, 1, 1, tzinfo=dt_timezone.utc)
+    while day.year == year:
+        offset = day.astimezone(tz).utcoffset()
+        following = day + timedelta(days=1)
+        if following.astimezone(tz).utcoffset() != offset:
+            # Minutes into the day: the old offset holds at low, the new one at high
+            low, high = 0, 24 * 60
+            while high - low > 1:
+                middle = (low + high) // 2
+                if (day + timedelta(minutes=middle)).astimezone(tz).utcoffset() == offset:
+                    low = middle
+                else:
+                    high = middle
+            changes.append(day + timedelta(minutes=high))
+        day = following
+    return changes
+
+
+def vtimezone(tz, year):
+    """
+    The VTIMEZONE lines defining the TZID of tz: the offset changes it makes in year, repeated every year since 1970
+    on the same weekday of the month (e.g. the last Sunday of March).
+    """
+    lines = ['BEGIN:VTIMEZONE', f'TZID:{zone_id(tz)}']
+    changes = offset_changes(tz, year)
+    if not changes:
+        now = datetime(year, 1, 1, tzinfo=dt_timezone.utc).astimezone(tz)
+        offset = format_offset(now.utcoffset())
+        lines += [
+            'BEGIN:STANDARD', 'DTSTART:19700101T000000', f'TZOFFSETFROM:{offset}', f'TZOFFSETTO:{offset}',
+            f'TZNAME:{now.tzname()}', 'END:STANDARD',
+        ]
+    for change in changes:
+        before = (change - timedelta(minutes=1)).astimezone(tz).utcoffset()
+        after = change.astimezone(tz)
+        # The local time on the clocks when they are changed
+        wall = (change + before).replace(tzinfo=None)
+        week = -1 if wall.day + 7 > monthrange(wall.year, wall.month)[1] else (wall.day - 1) // 7 + 1
+        days = [
+            day for day in range(1, monthrange(1970, wall.month)[1] + 1)
+            if date(1970, wall.month, day).weekday() == wall.weekday()
+        ]
+        first = wall.replace(year=1970, day=days[week - 1 if week > 0 else week])
+        kind = 'DAYLIGHT' if after.dst() else 'STANDARD'
+        lines += [
+            f'BEGIN:{kind}',
+            f'DTSTART:{first.strftime("%Y%m%dT%H%M%S")}',
+            f'TZOFFSETFROM:{format_offset(before)}',
+            f'TZOFFSETTO:{format_offset(after.utcoffset())}',
+            f'TZNAME:{after.tzname()}',
+            f'RRULE:FREQ=YEARLY;BYMONTH={wall.month};BYDAY={week}{ICS_WEEKDAYS[wall.weekday()]}',
+            f'END:{kind}',
+        ]
+    lines.append('END:VTIMEZONE')
+    return lines
+
+
+def format_trigger(offset):
+    """
+    The TRIGGER duration (RFC 5545 3.3.6) of an alarm offset before the deadline, e.g. -PT2H, or PT30M after it.
+    """
+    sign = '-' if offset > timedelta(0) else ''
+    days, seconds = abs(offset).days, abs(offset).seconds
+    hours, rest = divmod(seconds, 3600)
+    minutes, seconds = divmod(rest, 60)
+    clock = ''.join(f'{n}{unit}' for n, unit in ((hours, 'H'), (minutes, 'M'), (seconds, 'S')) if n)
+    if clock or not days:
+        clock = f'T{clock or "0S"}'
+    return f'{sign}P{f"{days}D" if days else ""}{clock}'
+
+
+def render_component(row, domain, as_events=False, tz=dt_timezone.utc, overrides=()):
+    """
+    One task as a VTODO, or as a VEVENT ending at the deadline for calendars that do not show to-dos, with its times
+    in tz. Open tasks carry a VALARM their reminder offset before the deadline, so a recurring task's alarm repeats with
+    each occurrence, and recurring tasks carry their rule as an RRULE.
+    overrides are the task's stored occurrences as (original date, due date, is completed, is skipped): completed and
+    skipped ones are left out of the rule with EXDATE, and moved ones are written as components of their own.
+    """
+    (pk, title, description, priority, start_date, due_date, is_completed, reminder_offset, updated_at,
+     recurrence, interval, until) = (row[column] for column in FEED_COLUMNS)
+    kind = 'VEVENT' if as_events else 'VTODO'
+    if as_events:
+        start = start_date if start_date and start_date < due_date else due_date
+    elif recurrence:
+        # The rule repeats DTSTART, so a recurring to-do starts at its deadline like the rule does
+        start = due_date
+    else:
+        start = start_date if start_date and start_date <= due_date else None
+    # Occurrences are known by their start, which is lead before the deadline on the clock
+    lead = local_time(start, tz) - local_time(due_date, tz) if start else timedelta(0)
+
+    def component(extra, deadline, done):
+        lines = [
+            f'BEGIN:{kind}',
+            f'UID:task-{pk}@{domain}',
+            f'DTSTAMP:{format_utc(updated_at)}',
+            f'SUMMARY:{escape_text(title)}',
+        ]
+        if description:
+            lines.append(f'DESCRIPTION:{escape_text(description)}')
+        lines.append(f'PRIORITY:{ICS_PRIORITY.get(priority, 0)}')
+        if start:
+            lines.append(format_local('DTSTART', [local_time(deadline, tz) + lead], tz))
+        if as_events:
+            lines.append(format_time('DTEND', deadline, tz))
+        else:
+            lines.append(format_time('DUE', deadline, tz))
+            lines.append('STATUS:COMPLETED' if done else 'STATUS:NEEDS-ACTION')
+        lines += extra
+        lines.append(f'LAST-MODIFIED:{format_utc(updated_at)}')
+        if reminder_offset is not None and not done:
+            # Relative to DUE, or DTEND for events; both are the deadline
+            lines += [
+                'BEGIN:VALARM',
+                'ACTION:DISPLAY',
+                f'DESCRIPTION:{escape_text(title)}',
+                f'TRIGGER;RELATED=END:{format_trigger(reminder_offset)}',
+                'END:VALARM',
+            ]
+        lines.append(f'END:{kind}')
+        return ''.join(fold_line(line) for line in lines)
+
+    if not recurrence:
+        return component([], due_date, is_completed)
+    rule = f'RRULE:FREQ={recurrence.upper()};INTERVAL={interval}'
+    day = (local_time(due_date, tz) + lead).day
+    if recurrence == 'monthly' and day > 28:
+        # Months shorter than the day fall on their last day, as in recurrence.shift, rather than being left out
+        rule += f';BYMONTHDAY={",".join(str(n) for n in range(28, day + 1))};BYSETPOS=-1'
+    extra = [rule + (f';UNTIL={format_utc(until)}' if until else '')]
+    excluded = [local_time(original, tz) + lead for original, _, completed, skipped in overrides if completed or skipped]
+    if excluded:
+        extra.append(format_local('EXDATE', excluded, tz))
+    components = [component(extra, due_date, is_completed)]
+    for original, moved, completed, skipped in overrides:
+        if moved and not (completed or skipped):
+            recurrence_id = format_local('RECURRENCE-ID', [local_time(original, tz) + lead], tz)
+            components.append(component([recurrence_id], moved, False))
+    return ''.join(components)
+
+
+def feed_rows(user):
+    # values() rather than values_list(), which aiterator() cannot run outside the async context
+    return Task.objects.filter(user=user).order_by('due_date', 'id').values(*FEED_COLUMNS)
+
+
+async def feed_overrides(user):
+    """
+    {task id: [(original date, due date, is completed, is skipped)]} for the user's stored occurrences.
+    """
+    overrides = {}
+    rows = TaskOccurrence.objects.filter(task__user=user).order_by('original_date').values(
+        'task_id', 'original_date', 'due_date', 'is_completed', 'is_skipped'
+    )
+    async for row in rows:
+        overrides.setdefault(row['task_id'], []).append(
+            (row['original_date'], row['due_date'], row['is_completed'], row['is_skipped'])
+        )
+    return overrides
+
+
+async def stream_calendar(rows, domain, name, as_events=False, tz=dt_timezone.utc, overrides=None):
+    """
+    Yields the VCALENDAR for an async iterable of FEED_COLUMNS rows, FEED_CHUNK_SIZE components per chunk, with times
+    in tz and the occurrences in overrides (as returned by feed_overrides).
+    """
+    header = [
+        'BEGIN:VCALENDAR',
+        'VERSION:2.0',
+        f'PRODID:-//{domain}//Task Reminder//EN',
+        'CALSCALE:GREGORIAN',
+        'METHOD:PUBLISH',
+        f'X-WR-CALNAME:{escape_text(name)}',
+    ]
+    if zone_id(tz):
+        header.append(f'X-WR-TIMEZONE:{zone_id(tz)}')
+        header += vtimezone(tz, timezone.now().year)
+    yield ''.join(fold_line(line) for line in header)
+    overrides = overrides or {}
+    batch = []
+    async for row in rows:
+        batch.append(render_component(row, domain, as_events, tz, overrides.get(row['id'], ())))
+        if len(batch) == FEED_CHUNK_SIZE:
+            yield ''.join(batch)
+            batch = []
+    if batch:
+        yield ''.join(batch)
+    yield 'END:VCALENDAR\r\n'
@@ -1,6 +1,7 @@
 from django import forms
+from django.conf import settings
 from django.contrib.auth.forms import UserCreationForm
-from .models import CustomUser, Task
+from .models import CustomUser, Task, DEFAULT_REMINDER_OFFSET
 
 class LoginForm(forms.Form):
     username = forms.CharField()
@@ -43,6 +44,25 @@ class RegisterForm(UserCreationForm):
             user.save()
         return user
 
+# Form fields that also take numbers from a JSON body
+NUMBER_FIELDS = (forms.IntegerField, forms.FloatField, forms.DecimalField)
+
+
+def json_type_errors(form_class, data):
+    """
+    Errors for the values of JSON data that form_class's fields cannot parse: each must be a string or null,
+    or a number for a number field.
+    """
+    errors = {}
+    for name, field in form_class.base_fields.items():
+        value = data.get(name)
+        if value is None or isinstance(value, str):
+            continue
+        if isinstance(value, (int, float)) and not isinstance(value, bool) and isinstance(field, NUMBER_FIELDS):
+            continue
+        errors[name] = ['Expected a number' if isinstance(field, NUMBER_FIELDS) else 'Expected a string']
+    return errors
+
 class QuickTaskForm(forms.ModelForm):
     class Meta:
         model = Task
@@ -56,16 +76,61 @@ class DetailedTaskForm(forms.ModelForm):
     class Meta:
         model = Task
         # Adding tasks in detail requires filling in the task name, priority, start date, deadline and task description.
-        fields = ['title', 'priority', 'start_date', 'due_date', 'description']
+        # The reminder offset is optional and falls back to 2 hours before the deadline.
+        # A task can repeat from its deadline, e.g. every 2 weeks until a given date.
+        fields = [
+            'title', 'priority', 'start_date', 'due_date', 'description', 'reminder_offset',
+            'recurrence', 'recurrence_interval', 'recurrence_until',
+        ]
         widgets = {
             'start_date': forms.DateTimeInput(attrs={'type': 'datetime-local'}),
             'due_date': forms.DateTimeInput(attrs={'type': 'datetime-local'}),
+            'recurrence_until': forms.DateTimeInput(attrs={'type': 'datetime-local'}),
         }
 
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fields['reminder_offset'].required = False
+        self.fields['recurrence_interval'].required = False
+
+    def clean_recurrence_interval(self):
+        return self.cleaned_data.get('recurrence_interval') or 1
+
+    def clean_reminder_offset(self):
+        offset = self.cleaned_data.get('reminder_offset')
+        if offset is None:
+            return DEFAULT_REMINDER_OFFSET
+        if offset.total_seconds() < 0:
+            raise forms.ValidationError("The reminder must be before the deadline")
+        return offset
+
+class TaskImportForm(forms.ModelForm):
+    class Meta:
+        model = Task
+        # One record of an imported CSV or iCalendar file; the reminder offset keeps its default
+        fields = ['title', 'priority', 'start_date', 'due_date', 'description', 'is_completed']
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fields['priority'].required = False
+
+    def clean_priority(self):
+        return self.cleaned_data.get('priority') or Task._meta.get_field('priority').default
+
+class RescheduleOccurrenceForm(forms.Form):
+    # The new deadline of one occurrence of a recurring task, in the user's time zone
+    due_date = forms.DateTimeField(widget=forms.DateTimeInput(attrs={'type': 'datetime-local'}))
+
 class UserUpdateForm(forms.ModelForm):
+    language = forms.ChoiceField(
+        required=False,
+        label="Language",
+        choices=[('', 'Site default')] + list(settings.LANGUAGES),
+    )
+
     class Meta:
         model = CustomUser
-        fields = ['username', 'email', 'phone', 'region']
+        fields = ['username', 'email', 'phone', 'region', 'language']
 
     def save(self, commit=True):
         user = super().save(commit=False)
@@ -0,0 +1,282 @@
+"""
+Task import from CSV and iCalendar (.ics) files.
+
+Files are read as a stream of records, one CSV row or one VTODO/VEVENT component at a time, and imported in
+chunks: each chunk is validated with TaskImportForm, inserted with one bulk_create and committed together with
+the job's progress. Memory use depends on the chunk size only, and a failed import resumes after the last chunk.
+"""
+import csv
+import io
+import logging
+import re
+from datetime import datetime, time
+from itertools import islice
+from zoneinfo import ZoneInfo
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .forms import TaskImportForm
+from .locales import user_timezone
+from .models import Task
+from .signals import bump_task_version
+
+logger = logging.getLogger(__name__)
+
+IMPORT_CHUNK_SIZE = getattr(settings, 'TASK_IMPORT_CHUNK_SIZE', 500)
+# Invalid records kept on the job; the rest are only counted
+MAX_IMPORT_ERRORS = 100
+
+# Accepted CSV column names (case-insensitive) for each task field
+CSV_COLUMNS = {
+    'title': 'title', 'name': 'title', 'summary': 'title', 'task': 'title',
+    'description': 'description', 'notes': 'description',
+    'priority': 'priority',
+    'start_date': 'start_date', 'start': 'start_date',
+    'due_date': 'due_date', 'due': 'due_date', 'deadline': 'due_date',
+    'is_completed': 'is_completed', 'completed': 'is_completed', 'done': 'is_completed',
+}
+TRUE_VALUES = {'1', 'true', 'yes', 'y', 'x', 'done', 'completed'}
+
+ICS_ESCAPES = re.compile(r'\\([\\;,nN])')
+
+
+def import_format(file_name):
+    """
+    Import format for a file name, or None if it is not a supported file type.
+    """
+    extension = file_name.rsplit('.', 1)[-1].lower() if '.' in file_name else ''
+    if extension in ('ics', 'ical', 'ifb'):
+        return 'ics'
+    if extension in ('csv', 'txt'):
+        return 'csv'
+    return None
+
+
+def read_csv(stream, tz):
+    """
+    Yields one record per CSV row, keyed by task field. Columns that are not task fields are ignored.
+    Naive dates are left as text: the form reads them in the active time zone.
+    """
+    reader = csv.reader(stream)
+    header = next(reader, None)
+    if header is None:
+        return
+    fields = [CSV_COLUMNS.get(column.strip().lower()) for column in header]
+    for row in reader:
+        if not any(row):
+            continue
+        record = {field: value.strip() for field, value in zip(fields, row) if field}
+        if 'priority' in record:
+            record['priority'] = record['priority'].lower()
+        if 'is_completed' in record:
+            record['is_completed'] = record['is_completed'].lower() in TRUE_VALUES
+        yield record
+
+
+def unfold_lines(stream):
+    """
+    Joins iCalendar content lines folded onto continuation lines (RFC 5545 3.1).
+    """
+    current = None
+    for line in stream:
+        line = line.rstrip('\r\n')
+        if line[:1] in (' ', '\t'):
+            if current is not None:
+                current += line[1:]
+            continue
+        if current:
+            yield current
+        current = line
+    if current:
+        yield current
+
+
+def parse_content_line(line):
+    """
+    Splits "NAME;PARAM=value:text" into (NAME, {PARAM: value}, text). Colons inside quoted parameters are kept.
+    """
+    quoted = False
+    for i, char in enumerate(line):
+        if char == '"':
+            quoted = not quoted
+        elif char == ':' and not quoted:
+            head, value = line[:i], line[i + 1:]
+            break
+    else:
+        return line.upper(), {}, ''
+    name, *params = head.split(';')
+    params = dict(param.split('=', 1) for param in params if '=' in param)
+    return name.upper(), {key.upper(): value.strip('"') for key, value in params.items()}, value
+
+
+def parse_ics_date(params, value, tz):
+    """
+    An iCalendar DATE or DATE-TIME as an aware datetime; dates are midnight and floating times are in tz.
+    Invalid values are returned unchanged, so the form reports them.
+    """
+    try:
+        if params.get('VALUE') == 'DATE' or len(value) == 8:
+            return timezone.make_aware(datetime.combine(datetime.strptime(value, '%Y%m%d').date(), time.min), tz)
+        if value.endswith('Z'):
+            return datetime.strptime(value, '%Y%m%dT%H%M%SZ').replace(tzinfo=ZoneInfo('UTC'))
+        if 'TZID' in params:
+            try:
+                tz = ZoneInfo(params['TZID'])
+            except (ValueError, KeyError):
+                pass
+        return timezone.make_aware(datetime.strptime(value, '%Y%m%dT%H%M%S'), tz)
+    except ValueError:
+        return value
+
+
+def ics_priority(value):
+    """
+    iCalendar PRIORITY (1 highest to 9 lowest, 0 undefined) as a task priority.
+    """
+    try:
+        level = int(value)
+    except ValueError:
+        return 'medium'
+    if 1 <= level <= 4:
+        return 'high'
+    if level >= 6:
+        return 'low'
+    return 'medium'
+
+
+def ics_record(kind, properties, tz):
+    """
+    Task fields of one VTODO or VEVENT. The deadline is DUE for to-dos, DTEND for events, or else DTSTART.
+    """
+    def text(name):
+        return ICS_ESCAPES.sub(lambda m: '\n' if m.group(1) in 'nN' else m.group(1), properties[name][1])
+
+    def date(name):
+        return parse_ics_date(*properties[name], tz)
+
+    record = {}
+    if 'SUMMARY' in properties:
+        record['title'] = text('SUMMARY').strip()
+    if 'DESCRIPTION' in properties:
+        record['description'] = text('DESCRIPTION')
+    if 'PRIORITY' in properties:
+        record['priority'] = ics_priority(properties['PRIORITY'][1])
+    end = 'DUE' if kind == 'VTODO' else 'DTEND'
+    if end in properties:
+        record['due_date'] = date(end)
+        if 'DTSTART' in properties:
+            record['start_date'] = date('DTSTART')
+    elif 'DTSTART' in properties:
+        record['due_date'] = date('DTSTART')
+    record['is_completed'] = 'COMPLETED' in properties or properties.get('STATUS', ({}, ''))[1].upper() == 'COMPLETED'
+    return record
+
+
+def read_ics(stream, tz):
+    """
+    Yields one record per VTODO or VEVENT component. Nested components such as VALARM are skipped.
+    """
+    kind = None
+    properties = None
+    nested = 0
+    for line in unfold_lines(stream):
+        name, params, value = parse_content_line(line)
+        if kind is None:
+            if name == 'BEGIN' and value.upper() in ('VTODO', 'VEVENT'):
+                kind, properties = value.upper(), {}
+        elif name == 'BEGIN':
+            nested += 1
+        elif name == 'END' and nested:
+            nested -= 1
+        elif name == 'END':
+            yield ics_record(kind, properties, tz)
+            kind = None
+        elif not nested:
+            properties.setdefault(name, (params, value))
+
+
+RECORD_READERS = {
+    'csv': read_csv,
+    'ics': read_ics,
+}
+
+
+def import_chunk(job, records):
+    """
+    Validates a chunk of records and inserts the valid ones, committing the tasks and the job progress together.
+    """
+    tasks = []
+    errors = []
+    for row, record in enumerate(records, job.rows_done + 1):
+        form = TaskImportForm(record)
+        if form.is_valid():
+            task = form.save(commit=False)
+            task.user_id = job.user_id
+            task.set_remind_at()
+            tasks.append(task)
+        else:
+            errors.append({'row': row, 'errors': {field: list(messages) for field, messages in form.errors.items()}})
+
+    with transaction.atomic():
+        Task.objects.bulk_create(tasks)
+        job.rows_done += len(records)
+        job.imported += len(tasks)
+        job.failed += len(errors)
+        job.errors = (job.errors + errors)[:MAX_IMPORT_ERRORS]
+        job.save(update_fields=['rows_done', 'imported', 'failed', 'errors', 'updated_at'])
+        if tasks:
+            bump_task_version([job.user_id])
+
+
+def run_import(job, chunk_size=None, progress=None):
+    """
+    Imports the job's file, starting after the records handled by earlier runs.
+    progress(job) is called after every committed chunk. Errors stop the import and mark the job as failed,
+    leaving the file in place so the import can be resumed; the file is deleted once the import is done.
+    """
+    chunk_size = chunk_size or IMPORT_CHUNK_SIZE
+    tz = user_timezone(job.user)
+    job.status = 'running'
+    job.message = ''
+    job.save(update_fields=['status', 'message', 'updated_at'])
+    try:
+        with job.file.open('rb'), timezone.override(tz):
+            stream = io.TextIOWrapper(job.file, encoding='utf-8-sig', newline='')
+            # Records committed by an earlier run are parsed again but not validated or inserted
+            records = islice(RECORD_READERS[job.format](stream, tz), job.rows_done, None)
+            while True:
+                chunk = list(islice(records, chunk_size))
+                if not chunk:
+                    break
+                import_chunk(job, chunk)
+                if progress:
+                    progress(job)
+    except Exception as exc:
+        logger.exception("Import %s stopped after %s records", job.pk, job.rows_done)
+        job.status = 'failed'
+        job.message = str(exc)
+        job.save(update_fields=['status', 'message', 'updated_at'])
+        return job
+    job.file.delete(save=False)
+    job.status = 'done'
+    job.save(update_fields=['file', 'status', 'updated_at'])
+    return job
+
+
+def import_job_status(job):
+    """
+    JSON summary of an import job.
+    """
+    return {
+        'id': job.pk,
+        'name': job.name,
+        'format': job.format,
+        'status': job.status,
+        'rows_done': job.rows_done,
+        'imported': job.imported,
+        'failed': job.failed,
+        'errors': job.errors,
+        'message': job.message,
+    }
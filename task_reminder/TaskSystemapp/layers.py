@@ -0,0 +1,383 @@
+"""
+Channel layer shared by the worker processes of one host, through a SQLite file instead of a broker.
+
+Group memberships and messages for channels of other processes are rows in the file (WAL mode, so readers do not block
+the writer). Messages for channels of the sending process never touch it: they go straight into the receiving channel's
+buffer, as with the in-memory layer. Each process reads the rows addressed to its own channels with one query per poll,
+a batch of up to batch_size messages for all of them, and polls only while one of its channels is being received on.
+A group_send writes the message for every member in one transaction.
+
+Queues are bounded: a send to a channel holding capacity unexpired messages raises ChannelFull (a group_send skips that
+member), and messages are dropped once expiry seconds old, removing their channel from its groups as the in-memory
+layer does, since nobody is receiving on it. Run channels_redis instead when the workers span several hosts.
+"""
+import asyncio
+import base64
+import json
+import logging
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+import uuid
+from collections import deque
+from contextlib import contextmanager
+from copy import deepcopy
+
+from channels.exceptions import ChannelFull
+from channels.layers import BaseChannelLayer
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS channel_message (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    channel TEXT NOT NULL,
+    owner TEXT NOT NULL,
+    expires REAL NOT NULL,
+    body TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS channel_message_channel_idx ON channel_message (channel, id);
+CREATE INDEX IF NOT EXISTS channel_message_owner_idx ON channel_message (owner, id);
+CREATE INDEX IF NOT EXISTS channel_message_expires_idx ON channel_message (expires);
+CREATE TABLE IF NOT EXISTS channel_group (
+    grp TEXT NOT NULL,
+    channel TEXT NOT NULL,
+    joined REAL NOT NULL,
+    PRIMARY KEY (grp, channel)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS channel_group_channel_idx ON channel_group (channel);
+"""
+# Longest time between removals of expired messages and group memberships, by whichever process gets there first
+PURGE_INTERVAL = 1.0
+
+
+def encode(message):
+    """
+    JSON text of a message; bytes values (e.g. binary WebSocket frames) are kept as base64.
+    """
+    def default(value):
+        if isinstance(value, bytes):
+            return {'__bytes__': base64.b64encode(value).decode()}
+        raise TypeError(f'{type(value).__name__} is not serializable in a channel message')
+    return json.dumps(message, default=default, separators=(',', ':'))
+
+
+def decode(body):
+    def object_hook(value):
+        if len(value) == 1 and '__bytes__' in value:
+            return base64.b64decode(value['__bytes__'])
+        return value
+    return json.loads(body, object_hook=object_hook)
+
+
+def owner_of(channel):
+    """
+    The part of a process-specific channel name before '!', which names the process; '' for a plain channel name.
+    """
+    return channel.split('!', 1)[0] if '!' in channel else ''
+
+
+class SQLiteChannelLayer(BaseChannelLayer):
+    """
+    Channel layer for the worker processes of one host, with the groups and flush extensions.
+    path is the SQLite file the processes share; poll_interval the seconds between reads while a channel of this
+    process is waiting for a message.
+    """
+
+    extensions = ['groups', 'flush']
+
+    def __init__(self, path=None, expiry=60, group_expiry=86400, capacity=100, channel_capacity=None,
+                 poll_interval=0.01, batch_size=100, **kwargs):
+        super().__init__(expiry=expiry, capacity=capacity, channel_capacity=channel_capacity, **kwargs)
+        self.path = path or os.path.join(tempfile.gettempdir(), 'channels.sqlite3')
+        self.group_expiry = group_expiry
+        self.poll_interval = poll_interval
+        self.batch_size = batch_size
+        self.client_prefix = uuid.uuid4().hex[:12]
+        # Owners of the channels made by new_channel, i.e. the messages this process reads
+        self.owners = set()
+        # Messages for this process's channels, as (expires, message), and the receivers waiting on each channel
+        self.buffers = {}
+        self.waiters = {}
+        self._lock = threading.Lock()
+        # One connection for the whole layer, used by one worker thread at a time; async_to_sync callers each run on a
+        # fresh thread, so per-thread connections would pile up
+        self._db = None
+        self._db_lock = threading.Lock()
+        self._reader = None
+        self.purge_interval = min(PURGE_INTERVAL, expiry / 2)
+        self._purged_at = 0
+
+    # Database access, run in worker threads
+
+    @contextmanager
+    def connection(self):
+        """
+        The layer's connection, opened on first use and held by the calling thread until the block ends.
+        """
+        with self._db_lock:
+            if self._db is None:
+                db = sqlite3.connect(self.path, timeout=5, isolation_level=None, check_same_thread=False)
+                db.execute('PRAGMA journal_mode=WAL')
+                db.execute('PRAGMA synchronous=NORMAL')
+                db.executescript(SCHEMA)
+                self._db = db
+            yield self._db
+
+    def write(self, operation, *args):
+        """
+        Runs operation(db, *args) in one write transaction, removing expired rows first when they are due.
+        """
+        with self.connection() as db:
+            db.execute('BEGIN IMMEDIATE')
+            try:
+                now = time.time()
+                if now - self._purged_at > self.purge_interval:
+                    self._purged_at = now
+                    self.purge(db, now)
+                result = operation(db, *args)
+            except BaseException:
+                db.execute('ROLLBACK')
+                raise
+            db.execute('COMMIT')
+        return result
+
+    def purge(self, db, now):
+        db.execute(
+            'DELETE FROM channel_group WHERE channel IN (SELECT channel FROM channel_message WHERE expires < ?)', [now]
+        )
+        db.execute('DELETE FROM channel_message WHERE expires < ?', [now])
+        db.execute('DELETE FROM channel_group WHERE joined < ?', [now - self.group_expiry])
+
+    def insert(self, db, channels, body, expires):
+        """
+        Writes the message for each channel with room for it; returns the channels that were full.
+        """
+        full = []
+        now = time.time()
+        rows = []
+        for channel in channels:
+            (pending,) = db.execute(
+                'SELECT COUNT(*) FROM channel_message WHERE channel = ? AND expires >= ?', [channel, now]
+            ).fetchone()
+            if pending >= self.get_capacity(channel):
+                full.append(channel)
+            else:
+                rows.append((channel, owner_of(channel), expires, body))
+        db.executemany('INSERT INTO channel_message (channel, owner, expires, body) VALUES (?, ?, ?, ?)', rows)
+        return full
+
+    def waiting(self, channel):
+        with self.connection() as db:
+            return db.execute('SELECT 1 FROM channel_message WHERE channel = ? LIMIT 1', [channel]).fetchone()
+
+    def take(self, db, channel):
+        """
+        Removes and returns the oldest message on a plain channel as (expires, body), or None.
+        """
+        row = db.execute(
+            'SELECT id, expires, body FROM channel_message WHERE channel = ? ORDER BY id LIMIT 1', [channel]
+        ).fetchone()
+        if row is None:
+            return None
+        db.execute('DELETE FROM channel_message WHERE id = ?', [row[0]])
+        return row[1:]
+
+    def take_batch(self):
+        """
+        Removes and returns the next batch of messages addressed to this process's channels, as
+        [(channel, expires, body), ...]. Only this process reads them, so the read needs no write lock, and an idle
+        poll does not hold up other processes' writes.
+        """
+        owners = sorted(self.owners)
+        with self.connection() as db:
+            rows = db.execute(
+                f'SELECT id, channel, expires, body FROM channel_message WHERE owner IN ({", ".join("?" * len(owners))}) '
+                f'ORDER BY id LIMIT ?', [*owners, self.batch_size]
+            ).fetchall()
+        if rows:
+            ids = [row[0] for row in rows]
+            self.write(lambda db: db.execute(f'DELETE FROM channel_message WHERE id IN ({", ".join("?" * len(ids))})', ids))
+        return [row[1:] for row in rows]
+
+    async def run(self, operation, *args):
+        return await asyncio.to_thread(self.write, operation, *args)
+
+    # Channels of this process
+
+    def is_local(self, channel):
+        return owner_of(channel) in self.owners
+
+    def deliver(self, channel, expires, message):
+        """
+        Adds a message to a local channel's buffer and wakes one receiver; returns False if the buffer is full.
+        Safe to call from any thread.
+        """
+        with self._lock:
+            buffer = self.buffers.setdefault(channel, deque())
+            while buffer and buffer[0][0] < time.time():
+                buffer.popleft()
+            if len(buffer) >= self.get_capacity(channel):
+                return False
+            buffer.append((expires, message))
+            waiters = self.waiters.get(channel)
+            waiter = waiters.popleft() if waiters else None
+        if waiter is not None:
+            try:
+                waiter.get_loop().call_soon_threadsafe(wake, waiter)
+            except RuntimeError:
+                # The receiver's event loop has been closed
+                pass
+        return True
+
+    def next_message(self, channel):
+        """
+        Takes the oldest unexpired message from a local channel's buffer, or returns None.
+        Expired messages mean nobody was receiving, so the channel is also dropped from its groups.
+        """
+        expired = False
+        with self._lock:
+            buffer = self.buffers.get(channel)
+            while buffer:
+                expires, message = buffer.popleft()
+                if expires >= time.time():
+                    return message
+                expired = True
+            self.buffers.pop(channel, None)
+        if expired:
+            self.write(lambda db: db.execute('DELETE FROM channel_group WHERE channel = ?', [channel]))
+        return None
+
+    async def read(self):
+        """
+        Moves the messages addressed to this process's channels from the file to their buffers, while anyone is
+        waiting for one. A full batch is followed by another read straight away.
+        """
+        while True:
+            with self._lock:
+                if not any(self.waiters.values()):
+                    if self._reader is asyncio.current_task():
+                        self._reader = None
+                    return
+            rows = await asyncio.to_thread(self.take_batch)
+            for channel, expires, body in rows:
+                if expires < time.time():
+                    continue
+                if not self.deliver(channel, expires, decode(body)):
+                    logger.debug("Dropped a message for %s: its buffer is full", channel)
+            if len(rows) < self.batch_size:
+                await asyncio.sleep(self.poll_interval)
+
+    def start_reader(self):
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            if self._reader is None or self._reader.done() or self._reader.get_loop() is not loop:
+                self._reader = loop.create_task(self.read())
+
+    # Channel layer API
+
+    async def send(self, channel, message):
+        assert isinstance(message, dict), 'message is not a dict'
+        self.require_valid_channel_name(channel)
+        assert '__asgi_channel__' not in message
+        expires = time.time() + self.expiry
+        if self.is_local(channel):
+            if not self.deliver(channel, expires, deepcopy(message)):
+                raise ChannelFull(channel)
+            return
+        if await self.run(self.insert, [channel], encode(message), expires):
+            raise ChannelFull(channel)
+
+    async def receive(self, channel):
+        self.require_valid_channel_name(channel)
+        if not self.is_local(channel):
+            # A plain channel name, which any process may receive on
+            while True:
+                # Checked before taking the write lock, so polling an empty channel does not hold up writers
+                row = await self.run(self.take, channel) if await asyncio.to_thread(self.waiting, channel) else None
+                if row is None:
+                    await asyncio.sleep(self.poll_interval)
+                elif row[0] >= time.time():
+                    return decode(row[1])
+        while True:
+            message = await asyncio.to_thread(self.next_message, channel) if channel in self.buffers else None
+            if message is not None:
+                return message
+            waiter = asyncio.get_running_loop().create_future()
+            with self._lock:
+                if self.buffers.get(channel):
+                    continue
+                self.waiters.setdefault(channel, deque()).append(waiter)
+            self.start_reader()
+            try:
+                await waiter
+            finally:
+                with self._lock:
+                    waiters = self.waiters.get(channel)
+                    if waiters is not None:
+                        if waiter in waiters:
+                            waiters.remove(waiter)
+                        if not waiters:
+                            del self.waiters[channel]
+
+    async def new_channel(self, prefix='specific.'):
+        owner = f'{prefix}{self.client_prefix}'
+        self.owners.add(owner)
+        return f'{owner}!{uuid.uuid4().hex}'
+
+    async def group_add(self, group, channel):
+        self.require_valid_group_name(group)
+        self.require_valid_channel_name(channel)
+        await self.run(lambda db: db.execute(
+            'INSERT OR REPLACE INTO channel_group (grp, channel, joined) VALUES (?, ?, ?)', [group, channel, time.time()]
+        ))
+
+    async def group_discard(self, group, channel):
+        self.require_valid_group_name(group)
+        self.require_valid_channel_name(channel)
+        await self.run(lambda db: db.execute('DELETE FROM channel_group WHERE grp = ? AND channel = ?', [group, channel]))
+
+    async def group_send(self, group, message):
+        """
+        Sends the message to every member of the group, skipping those whose queue is full.
+        Members in this process get it directly; the others' copies are written in one transaction.
+        """
+        assert isinstance(message, dict), 'message is not a dict'
+        self.require_valid_group_name(group)
+        expires = time.time() + self.expiry
+        body = encode(message)
+
+        def send_to_members(db):
+            members = [row[0] for row in db.execute(
+                'SELECT channel FROM channel_group WHERE grp = ? AND joined >= ?', [group, time.time() - self.group_expiry]
+            )]
+            local = [channel for channel in members if self.is_local(channel)]
+            self.insert(db, [channel for channel in members if not self.is_local(channel)], body, expires)
+            return local
+
+        for channel in await self.run(send_to_members):
+            self.deliver(channel, expires, deepcopy(message))
+
+    async def flush(self):
+        with self._lock:
+            self.buffers = {}
+        def delete_all(db):
+            db.execute('DELETE FROM channel_message')
+            db.execute('DELETE FROM channel_group')
+        await self.run(delete_all)
+
+    async def close(self):
+        def close_connection():
+            with self._db_lock:
+                if self._db is not None:
+                    self._db.close()
+                    self._db = None
+        # Waits for any operation still running in a worker thread
+        await asyncio.to_thread(close_connection)
+
+
+def wake(waiter):
+    if not waiter.done():
+        waiter.set_result(None)
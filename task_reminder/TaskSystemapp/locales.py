@@ -0,0 +1,64 @@
+"""
+Per-user time zone and language.
+
+UserLocaleMiddleware resolves a user's region (time zone name) and language from the user row the request loads
+anyway, so a profile change reaches every session of the user, in every worker process, on its next request.
+"""
+from functools import lru_cache
+from zoneinfo import ZoneInfo
+
+from django.conf import settings
+from django.utils import timezone, translation
+
+@lru_cache(maxsize=None)
+def get_zone(name):
+    """
+    The time zone named name, or None if it is blank or unknown.
+    """
+    if not name:
+        return None
+    try:
+        return ZoneInfo(name)
+    except (ValueError, KeyError):
+        return None
+
+
+def user_timezone(user):
+    """
+    The user's region as a time zone; the default time zone if it is not set or invalid.
+    """
+    return get_zone(user.region) or timezone.get_default_timezone()
+
+
+def resolve_locale(region, language):
+    """
+    (time zone name, language code) to activate for a user: the name is blank for a missing or invalid region,
+    and languages that are not in LANGUAGES fall back to LANGUAGE_CODE.
+    """
+    zone_name = region if get_zone(region) else ''
+    try:
+        language = translation.get_supported_language_variant(language or settings.LANGUAGE_CODE)
+    except LookupError:
+        language = settings.LANGUAGE_CODE
+    return zone_name, language
+
+
+def user_locale(user):
+    """
+    The resolved locale of a logged-in user; the defaults for anonymous users.
+    """
+    if not user.is_authenticated:
+        return '', settings.LANGUAGE_CODE
+    return resolve_locale(user.region, user.language)
+
+
+def activate_locale(zone_name, language):
+    """
+    Activates the time zone (or the default one, for a blank name) and language for the current request.
+    """
+    zone = get_zone(zone_name)
+    if zone:
+        timezone.activate(zone)
+    else:
+        timezone.deactivate()
+    translation.activate(language)
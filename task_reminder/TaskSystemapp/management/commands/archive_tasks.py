@@ -0,0 +1,41 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from TaskSystemapp.archive import ARCHIVE_AFTER, archivable_tasks, archive_tasks
+from TaskSystemapp.models import CustomUser
+
+
+class Command(BaseCommand):
+    help = (
+        "Move completed tasks that were due and last changed more than --days ago to the task archive, "
+        "in chunks of short transactions. Safe to run from cron while the site is up, and to interrupt."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=ARCHIVE_AFTER.days, help="Age in days of the tasks to archive")
+        parser.add_argument('--chunk-size', type=int, help="Tasks moved per transaction")
+        parser.add_argument('--pause', type=float, default=0.0, help="Seconds to sleep between chunks")
+        parser.add_argument('--user', help="Only archive this user's tasks")
+        parser.add_argument('--dry-run', action='store_true', help="Count the tasks that would be archived")
+
+    def handle(self, *args, **options):
+        user = None
+        if options['user']:
+            try:
+                user = CustomUser.objects.get(username=options['user'])
+            except CustomUser.DoesNotExist:
+                raise CommandError(f"User {options['user']} does not exist")
+        older_than = timedelta(days=options['days'])
+        if options['dry_run']:
+            count = archivable_tasks(timezone.now() - older_than, user).count()
+            self.stdout.write(f"{count} tasks would be archived")
+            return
+
+        def progress(moved):
+            if options['verbosity'] > 1:
+                self.stdout.write(f"{moved} tasks archived")
+
+        moved = archive_tasks(older_than, options['chunk_size'], user, options['pause'], progress)
+        self.stdout.write(self.style.SUCCESS(f"Archived {moved} tasks"))
@@ -0,0 +1,185 @@
+import asyncio
+import multiprocessing
+import os
+import queue
+import shutil
+import tempfile
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.module_loading import import_string
+
+LAYERS = {
+    'sqlite': 'TaskSystemapp.layers.SQLiteChannelLayer',
+    'inmemory': 'channels.layers.InMemoryChannelLayer',
+}
+BENCH_GROUP = 'bench.layer'
+
+
+def make_layer(name, path, capacity):
+    config = {'capacity': capacity}
+    if name == 'sqlite':
+        config['path'] = path
+    return import_string(LAYERS[name])(**config)
+
+
+async def receive_all(layer, channels, latencies, received, stop):
+    """
+    Receives on every channel until stop() is true, recording each message's latency and the last arrival time.
+    """
+    last = [0.0]
+
+    async def receive(channel):
+        while True:
+            message = await layer.receive(channel)
+            now = time.time()
+            latencies.append(now - message['sent'])
+            last[0] = now
+            with received.get_lock():
+                received.value += 1
+
+    tasks = [asyncio.ensure_future(receive(channel)) for channel in channels]
+    while not stop():
+        await asyncio.sleep(0.01)
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    return last[0]
+
+
+def worker(name, path, capacity, receivers, ready, results, received, stop):
+    """
+    A worker process: joins receivers channels of its own to the benchmark group and receives until told to stop.
+    """
+    async def main():
+        layer = make_layer(name, path, capacity)
+        channels = [await layer.new_channel() for _ in range(receivers)]
+        for channel in channels:
+            await layer.group_add(BENCH_GROUP, channel)
+        ready.put(os.getpid())
+        latencies = []
+        last = await receive_all(layer, channels, latencies, received, stop.is_set)
+        results.put((latencies, last))
+        await layer.close()
+    asyncio.run(main())
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark channel layers: one process sends --messages group messages, at --rate or in one burst, to a group joined "
+        "by --receivers channels in each of --workers other processes, as task updates reach the sockets held by "
+        "the other workers of a server. Reports messages delivered, throughput and latency percentiles. "
+        "Each layer is also run with the receivers in the sending process, where the in-memory layer works too."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--layers', default=','.join(LAYERS), help=f"Comma-separated subset of {', '.join(LAYERS)}")
+        parser.add_argument('--workers', type=int, default=4, help="Receiving processes")
+        parser.add_argument('--receivers', type=int, default=2, help="Channels in the group per process")
+        parser.add_argument('--messages', type=int, default=1000)
+        parser.add_argument('--rate', type=float, default=0, help="Messages sent per second; 0 sends them in one burst")
+        parser.add_argument('--capacity', type=int, default=1000, help="Channel capacity; fuller channels drop messages")
+        parser.add_argument('--drain', type=float, default=5.0, help="Seconds to wait for deliveries after the last send")
+
+    def handle(self, *args, **options):
+        names = [name.strip() for name in options['layers'].split(',') if name.strip()]
+        unknown = set(names) - set(LAYERS)
+        if unknown:
+            raise CommandError(f"Unknown layers: {', '.join(sorted(unknown))}")
+        directory = tempfile.mkdtemp()
+        try:
+            rows = []
+            for n, name in enumerate(names):
+                for workers in (0, options['workers']):
+                    path = os.path.join(directory, f'layer-{n}-{workers}.sqlite3')
+                    rows.append(self.run_layer(name, path, workers, options))
+        finally:
+            shutil.rmtree(directory, ignore_errors=True)
+        self.stdout.write(
+            f"{'layer':<10} {'processes':>9} {'expected':>9} {'delivered':>9} {'msg/s':>9} {'p50 ms':>8} {'p99 ms':>8}"
+        )
+        for row in rows:
+            self.stdout.write(
+                f"{row['layer']:<10} {row['processes']:>9} {row['expected']:>9} {row['delivered']:>9} "
+                f"{row['throughput']:>9.0f} {row['p50_ms']:>8.2f} {row['p99_ms']:>8.2f}"
+            )
+
+    def run_layer(self, name, path, workers, options):
+        """
+        One run: with workers=0 the receivers are coroutines in this process, otherwise they are spread over
+        that many processes.
+        """
+        # Imported here: the worker processes load this module without setting up Django, so it must not import models
+        from .bench_endpoints import percentile
+
+        receivers = options['receivers'] * max(workers, 1)
+        expected = options['messages'] * receivers
+        context = multiprocessing.get_context('spawn')
+        received = context.Value('i', 0)
+        stop = context.Event()
+        ready, results = context.Queue(), context.Queue()
+        processes = [
+            context.Process(
+                target=worker, args=(name, path, options['capacity'], options['receivers'], ready, results, received, stop)
+            )
+            for _ in range(workers)
+        ]
+        for process in processes:
+            process.start()
+        try:
+            for _ in processes:
+                ready.get(timeout=30)
+            latencies, started, last = asyncio.run(self.send(name, path, workers, expected, received, stop, options))
+            for _ in processes:
+                try:
+                    worker_latencies, worker_last = results.get(timeout=10)
+                except queue.Empty:
+                    continue
+                latencies += worker_latencies
+                last = max(last, worker_last)
+        finally:
+            stop.set()
+            for process in processes:
+                process.join(10)
+                if process.is_alive():
+                    process.terminate()
+        latencies.sort()
+        return {
+            'layer': name,
+            'processes': f'1+{workers}' if workers else '1',
+            'expected': expected,
+            'delivered': len(latencies),
+            'throughput': len(latencies) / (last - started) if latencies and last > started else 0.0,
+            'p50_ms': percentile(latencies, 0.50) * 1000,
+            'p99_ms': percentile(latencies, 0.99) * 1000,
+        }
+
+    async def send(self, name, path, workers, expected, received, stop, options):
+        """
+        Sends the messages, then waits until every one has arrived, none has for a second, or --drain seconds have passed.
+        Returns the in-process receivers' latencies, the start time and the time of their last delivery.
+        """
+        layer = make_layer(name, path, options['capacity'])
+        latencies = []
+        receiving = None
+        if not workers:
+            channels = [await layer.new_channel() for _ in range(options['receivers'])]
+            for channel in channels:
+                await layer.group_add(BENCH_GROUP, channel)
+            receiving = asyncio.ensure_future(receive_all(layer, channels, latencies, received, stop.is_set))
+        started = time.time()
+        for n in range(options['messages']):
+            if options['rate']:
+                await asyncio.sleep(max(0, started + n / options['rate'] - time.time()))
+            await layer.group_send(BENCH_GROUP, {'type': 'bench.message', 'sent': time.time(), 'n': n})
+        # Stop early once deliveries have stalled, e.g. when the layer cannot reach the other processes
+        deadline = time.monotonic() + options['drain']
+        count, changed = received.value, time.monotonic()
+        while received.value < expected and time.monotonic() < min(deadline, changed + 1):
+            await asyncio.sleep(0.01)
+            if received.value != count:
+                count, changed = received.value, time.monotonic()
+        stop.set()
+        last = await receiving if receiving else 0.0
+        await layer.close()
+        return latencies, started, last
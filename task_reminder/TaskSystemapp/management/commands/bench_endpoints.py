@@ -0,0 +1,255 @@
+import asyncio
+import json
+import math
+import platform
+import random
+import time
+from collections import deque
+from datetime import timedelta
+
+from asgiref.sync import async_to_sync
+from channels.testing import WebsocketCommunicator
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import AsyncClient
+from django.urls import reverse
+from django.utils import timezone
+
+from TaskSystemapp.models import CustomUser, Task
+from task_reminder.asgi import application
+
+ENDPOINTS = ['home', 'home_search', 'quick_add', 'complete', 'events', 'websocket']
+SEARCH_WORDS = ['report', 'budget', 'review', 'invoice', 'meeting', 'plan', 'release', 'slides']
+BENCH_TASK_TITLE = 'Benchmark task'
+# Requests per endpoint in the serial pass that counts SQL queries
+QUERY_SAMPLES = 5
+
+
+class QueryCounter:
+    """
+    Database execute wrapper counting the queries run through it.
+    """
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+class BenchUser:
+    """
+    A logged-in AsyncClient for one seeded user, with the open tasks it can still complete.
+    """
+
+    def __init__(self, user, host):
+        self.user = user
+        self.client = AsyncClient(raise_request_exception=False, headers={'host': host})
+        self.open_tasks = deque()
+
+    def cookie_header(self):
+        return '; '.join(f'{name}={morsel.value}' for name, morsel in self.client.cookies.items()).encode()
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark the main endpoints through the ASGI application, as users created by seed_tasks, "
+        "reporting latency percentiles, throughput and SQL queries per request. "
+        "The websocket endpoint times a full push: open a socket, quick-add a task, receive its update. "
+        "Completed tasks stay completed, so reseed with seed_tasks --clear before runs that are to be compared."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--prefix', default='bench', help="Username prefix of the seeded users")
+        parser.add_argument('--users', type=int, default=10, help="Seeded users to log in")
+        parser.add_argument('--requests', type=int, default=200, help="Requests per endpoint")
+        parser.add_argument('--concurrency', type=int, default=10)
+        parser.add_argument('--endpoints', default=','.join(ENDPOINTS), help=f"Comma-separated subset of {', '.join(ENDPOINTS)}")
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--output', help="Write the results as JSON to this file")
+        parser.add_argument('--compare', help="JSON results of an earlier run to compare against")
+
+    def handle(self, *args, **options):
+        endpoints = [name.strip() for name in options['endpoints'].split(',') if name.strip()]
+        unknown = set(endpoints) - set(ENDPOINTS)
+        if unknown:
+            raise CommandError(f"Unknown endpoints: {', '.join(sorted(unknown))}")
+        users = list(CustomUser.objects.filter(username__startswith=options['prefix']).order_by('username')[:options['users']])
+        if not users:
+            raise CommandError(f"No {options['prefix']} users, run seed_tasks first")
+
+        self.rng = random.Random(options['seed'])
+        host = next((h for h in settings.ALLOWED_HOSTS if h not in ('*', '') and not h.startswith('.')), 'localhost')
+        self.origin = f'http://{host}'.encode()
+        bench_users = [BenchUser(user, host) for user in users]
+        open_tasks = Task.objects.filter(user__in=users, is_completed=False).order_by('due_date').values_list('user_id', 'id')
+        by_user = {bench_user.user.pk: bench_user for bench_user in bench_users}
+        for user_id, task_id in open_tasks.iterator():
+            by_user[user_id].open_tasks.append(task_id)
+
+        counter = QueryCounter()
+        with connection.execute_wrapper(counter):
+            results = async_to_sync(self.run_benchmark)(bench_users, endpoints, options, counter)
+        Task.objects.filter(user__in=users, title__startswith=BENCH_TASK_TITLE).delete()
+
+        report = {
+            'meta': {
+                'timestamp': timezone.now().isoformat(),
+                'users': len(users),
+                'tasks': Task.objects.filter(user__in=users).count(),
+                'requests': options['requests'],
+                'concurrency': options['concurrency'],
+                'database': connection.vendor,
+                'python': platform.python_version(),
+            },
+            'endpoints': results,
+        }
+        self.print_report(results)
+        if options['compare']:
+            with open(options['compare']) as f:
+                self.print_comparison(json.load(f)['endpoints'], results)
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                json.dump(report, f, indent=2)
+            self.stdout.write(f"Results written to {options['output']}")
+
+    async def run_benchmark(self, bench_users, endpoints, options, counter):
+        for bench_user in bench_users:
+            await bench_user.client.aforce_login(bench_user.user)
+        results = {}
+        try:
+            for name in endpoints:
+                # Serial pass first: with nothing else running, the counter sees one request at a time
+                queries = []
+                for n in range(QUERY_SAMPLES):
+                    counter.count = 0
+                    await self.attempt(name, bench_users[n % len(bench_users)], n)
+                    queries.append(counter.count)
+                results[name] = await self.run_endpoint(name, bench_users, options['requests'], options['concurrency'])
+                results[name]['queries'] = sum(queries) / len(queries)
+        finally:
+            for bench_user in bench_users:
+                await bench_user.client.alogout()
+        return results
+
+    async def run_endpoint(self, name, bench_users, count, concurrency):
+        latencies = []
+        errors = 0
+        numbers = iter(range(count))
+
+        async def worker():
+            nonlocal errors
+            for n in numbers:
+                started = time.perf_counter()
+                if await self.attempt(name, bench_users[n % len(bench_users)], n):
+                    latencies.append(time.perf_counter() - started)
+                else:
+                    errors += 1
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        wall = time.perf_counter() - started
+        return summarize(latencies, errors, wall)
+
+    async def attempt(self, name, bench_user, n):
+        try:
+            return await self.perform(name, bench_user, n)
+        except Exception:
+            return False
+
+    async def perform(self, name, bench_user, n):
+        """
+        One request to the endpoint, with any streamed body fully read. Returns whether it succeeded.
+        """
+        client = bench_user.client
+        if name == 'home':
+            response = await client.get(reverse('home'))
+        elif name == 'home_search':
+            response = await client.get(reverse('home'), {'search': self.rng.choice(SEARCH_WORDS)})
+        elif name == 'quick_add':
+            response = await self.quick_add(client, n)
+        elif name == 'complete':
+            task_id = bench_user.open_tasks.popleft() if bench_user.open_tasks else 0
+            response = await client.post(reverse('complete_task', args=[task_id]), HTTP_X_REQUESTED_WITH='XMLHttpRequest')
+        elif name == 'events':
+            today = timezone.localdate()
+            window = {'start': (today - timedelta(days=7)).isoformat(), 'end': (today + timedelta(days=35)).isoformat()}
+            response = await client.get(reverse('task_events'), window)
+        else:
+            return await self.websocket_push(bench_user, n)
+        if response.streaming:
+            async for _ in response.streaming_content:
+                pass
+        return response.status_code < 400
+
+    async def quick_add(self, client, n):
+        due_date = timezone.localtime() + timedelta(days=1 + n % 7)
+        return await client.post(reverse('quick_add_task'), {
+            'title': f'{BENCH_TASK_TITLE} {n}', 'priority': 'medium', 'due_date': due_date.strftime('%Y-%m-%dT%H:%M')
+        })
+
+    async def websocket_push(self, bench_user, n):
+        communicator = WebsocketCommunicator(application, '/ws/tasks/', headers=[
+            (b'cookie', bench_user.cookie_header()), (b'origin', self.origin), (b'host', self.origin.split(b'//')[1]),
+        ])
+        connected, _ = await communicator.connect()
+        if not connected:
+            return False
+        try:
+            response = await self.quick_add(bench_user.client, n)
+            if response.status_code >= 400:
+                return False
+            message = await communicator.receive_json_from(timeout=5)
+            return message.get('type') == 'tasks.batch'
+        finally:
+            await communicator.disconnect()
+
+    def print_report(self, results):
+        self.stdout.write(f"{'endpoint':<12} {'requests':>8} {'errors':>6} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'req/s':>8} {'queries':>7}")
+        for name, result in results.items():
+            self.stdout.write(
+                f"{name:<12} {result['requests']:>8} {result['errors']:>6} {result['p50_ms']:>8.1f} {result['p95_ms']:>8.1f} "
+                f"{result['p99_ms']:>8.1f} {result['throughput_rps']:>8.1f} {result['queries']:>7.1f}"
+            )
+
+    def print_comparison(self, before, after):
+        self.stdout.write("Change against the earlier run (p95 latency, throughput, queries):")
+        for name, result in after.items():
+            if name not in before:
+                continue
+            old = before[name]
+            self.stdout.write(
+                f"{name:<12} p95 {percent_change(old['p95_ms'], result['p95_ms']):>8}  "
+                f"req/s {percent_change(old['throughput_rps'], result['throughput_rps']):>8}  "
+                f"queries {old['queries']:.1f} -> {result['queries']:.1f}"
+            )
+
+
+def percentile(values, fraction):
+    """
+    Nearest-rank percentile of sorted values.
+    """
+    if not values:
+        return 0.0
+    return values[max(0, math.ceil(fraction * len(values)) - 1)]
+
+
+def summarize(latencies, errors, wall):
+    latencies = sorted(latencies)
+    return {
+        'requests': len(latencies) + errors,
+        'errors': errors,
+        'p50_ms': percentile(latencies, 0.50) * 1000,
+        'p95_ms': percentile(latencies, 0.95) * 1000,
+        'p99_ms': percentile(latencies, 0.99) * 1000,
+        'mean_ms': sum(latencies) / len(latencies) * 1000 if latencies else 0.0,
+        'throughput_rps': len(latencies) / wall if wall else 0.0,
+    }
+
+
+def percent_change(old, new):
+    if not old:
+        return 'n/a'
+    return f'{(new - old) / old * 100:+.1f}%'
@@ -0,0 +1,67 @@
+import random
+import time
+
+from django.core import mail
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from TaskSystemapp import sms
+from TaskSystemapp.models import CustomUser, Notification
+from TaskSystemapp.notifications import DeliveryWorker
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark how many notifications per second the delivery worker sends, offline: the outbox is filled "
+        "inside a transaction that is rolled back, and messages go to the locmem email and SMS backends."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--count', type=int, default=20000)
+        parser.add_argument('--users', type=int, default=2000, help="Recipients the notifications are spread over")
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--batch-size', type=int, default=200)
+
+    def report(self, label, count, seconds):
+        self.stdout.write(f"{label:<28} {count:>9} in {seconds:8.3f}s  {count / seconds:12.0f} /s")
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        mail.outbox = []
+        del sms.outbox[:]
+        with transaction.atomic():
+            users = CustomUser.objects.bulk_create([
+                CustomUser(username=f'bench-notify-{i}', email=f'bench-notify-{i}@example.com', phone=f'+1{i:012d}')
+                for i in range(options['users'])
+            ])
+            now = timezone.now()
+            notifications = []
+            for i in range(options['count']):
+                user = rng.choice(users)
+                channel = rng.choice(('email', 'sms'))
+                notifications.append(Notification(
+                    user=user,
+                    channel=channel,
+                    recipient=user.email if channel == 'email' else user.phone,
+                    subject=f'Reminder: Task {i}',
+                    body=f'"Task {i}" is due soon.',
+                    next_attempt_at=now,
+                ))
+            started = time.perf_counter()
+            Notification.objects.bulk_create(notifications, batch_size=500)
+            self.report("queue", len(notifications), time.perf_counter() - started)
+
+            worker = DeliveryWorker(
+                batch_size=options['batch_size'],
+                email_backend='django.core.mail.backends.locmem.EmailBackend',
+                sms_backend='TaskSystemapp.sms.LocmemSMSBackend',
+                rate_limit=False,
+            )
+            started = time.perf_counter()
+            worker.run_once(now)
+            seconds = time.perf_counter() - started
+            worker.close()
+            self.report("deliver notifications", len(notifications), seconds)
+            self.report("deliver messages", len(mail.outbox) + len(sms.outbox), seconds)
+            transaction.set_rollback(True)
@@ -0,0 +1,68 @@
+import random
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from TaskSystemapp.models import CustomUser, Task, DEFAULT_REMINDER_OFFSET
+from TaskSystemapp.reminders import ReminderQueue, ReminderScheduler
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark how many reminders per second can be scheduled and fired. "
+        "With --db the full database path is measured inside a transaction that is rolled back."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--count', type=int, default=100000)
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--db', action='store_true', help="Also measure loading and firing reminders through the database")
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def report(self, label, count, seconds):
+        self.stdout.write(f"{label:<28} {count:>9} in {seconds:8.3f}s  {count / seconds:12.0f} reminders/s")
+
+    def handle(self, *args, **options):
+        count = options['count']
+        rng = random.Random(options['seed'])
+        now = timezone.now()
+        times = [now + timedelta(seconds=rng.randrange(3600)) for _ in range(count)]
+
+        queue = ReminderQueue()
+        started = time.perf_counter()
+        for task_id, remind_at in enumerate(times):
+            queue.schedule(task_id, remind_at)
+        self.report("heap schedule", count, time.perf_counter() - started)
+
+        # Reschedule a tenth of the reminders, as edits and completions would
+        for task_id in rng.sample(range(count), count // 10):
+            queue.schedule(task_id, times[task_id] + timedelta(seconds=1))
+        started = time.perf_counter()
+        fired = len(queue.pop_due(now + timedelta(hours=1)))
+        self.report("heap fire", fired, time.perf_counter() - started)
+
+        if options['db']:
+            self.bench_database(times, options['batch_size'])
+
+    def bench_database(self, times, batch_size):
+        with transaction.atomic():
+            user = CustomUser.objects.create(username='bench-reminders', email='bench-reminders@example.com', phone='+100000000000')
+            tasks = [Task(title=f"Reminder {i}", due_date=remind_at + DEFAULT_REMINDER_OFFSET, user=user) for i, remind_at in enumerate(times)]
+            for task in tasks:
+                task.set_remind_at()
+            Task.objects.bulk_create(tasks, batch_size=batch_size)
+
+            now = min(times)
+            scheduler = ReminderScheduler(handler=lambda fired: None, batch_size=batch_size)
+            started = time.perf_counter()
+            scheduler.load_window(now)
+            scheduler.next_poll = now + scheduler.poll_interval
+            self.report("db load window", len(scheduler.queue), time.perf_counter() - started)
+
+            started = time.perf_counter()
+            fired = scheduler.fire_due(now + timedelta(hours=1))
+            self.report("db fire", fired, time.perf_counter() - started)
+            transaction.set_rollback(True)
@@ -0,0 +1,82 @@
+import re
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.test import Client, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from TaskSystemapp.models import CustomUser, Task
+
+ACCEPT_ENCODING = 'br, gzip'
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure the static files of a cold and a warm home page load, served by StaticAssetMiddleware from the "
+        "files collectstatic wrote: bytes transferred without and with precompressed copies, and requests a warm "
+        "load makes for plain names (revalidated) and hashed names (cached as immutable). "
+        "Run collectstatic first; the page is rendered for a temporary user inside a transaction that is rolled back."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--host', default=(settings.ALLOWED_HOSTS or ['localhost'])[-1])
+
+    def fetch(self, client, url, **headers):
+        response = client.get(url, headers=headers)
+        content = b''.join(response.streaming_content) if response.streaming else response.content
+        response.close()
+        return response, len(content)
+
+    def handle(self, *args, **options):
+        if not getattr(staticfiles_storage, 'hashed_files', None):
+            raise CommandError("No static files manifest found; run python manage.py collectstatic first.")
+        originals = {hashed: name for name, hashed in staticfiles_storage.hashed_files.items()}
+        client = Client(raise_request_exception=False, headers={'host': options['host']})
+        with transaction.atomic():
+            user = CustomUser.objects.create_user(username='bench-static', email='bench-static@example.com')
+            Task.objects.create(title='Benchmark task', due_date=timezone.now() + timedelta(days=1), user=user)
+            client.force_login(user)
+            # {% static %} links the plain names while DEBUG is on
+            with override_settings(DEBUG=False):
+                page = client.get(reverse('home')).content.decode()
+            transaction.set_rollback(True)
+
+        urls = sorted(set(re.findall(rf'(?:href|src)="({re.escape(settings.STATIC_URL)}[^"]+)"', page)))
+        if not urls:
+            raise CommandError("The home page links no static files.")
+        totals = {'identity': 0, 'encoded': 0, 'plain_warm': 0, 'hashed_warm': 0}
+        self.stdout.write(f"{'asset':<40} {'identity':>10} {'encoded':>10} {'encoding':>9}  cache")
+        for url in urls:
+            name = url[len(settings.STATIC_URL):]
+            response, identity = self.fetch(client, url)
+            if response.status_code != 200:
+                raise CommandError(f"{url} answered {response.status_code}; is STATIC_ROOT collected?")
+            encoded_response, encoded = self.fetch(client, url, accept_encoding=ACCEPT_ENCODING)
+            immutable = 'immutable' in response.get('Cache-Control', '')
+            totals['identity'] += identity
+            totals['encoded'] += encoded
+            totals['hashed_warm'] += 0 if immutable else 1
+            # The same file under its plain name, as linked before the manifest: a warm load revalidates it
+            plain = originals.get(name, name)
+            revalidated, _ = self.fetch(
+                client, settings.STATIC_URL + plain, if_modified_since=response.get('Last-Modified', '')
+            )
+            totals['plain_warm'] += 1
+            self.stdout.write(
+                f"{name:<40} {identity:>10} {encoded:>10} {encoded_response.get('Content-Encoding', 'identity'):>9}  "
+                f"{'immutable' if immutable else 'revalidate'} (plain name: {revalidated.status_code})"
+            )
+
+        saved = totals['identity'] - totals['encoded']
+        self.stdout.write(
+            f"Cold load: {len(urls)} requests, {totals['identity']} bytes uncompressed, {totals['encoded']} bytes "
+            f"with {ACCEPT_ENCODING} ({saved} saved, {100 * saved / totals['identity']:.0f}%)"
+        )
+        self.stdout.write(
+            f"Warm load: {totals['plain_warm']} requests with plain names, {totals['hashed_warm']} with hashed names "
+            f"({totals['plain_warm'] - totals['hashed_warm']} saved)"
+        )
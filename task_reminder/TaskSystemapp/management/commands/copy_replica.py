@@ -0,0 +1,34 @@
+import sqlite3
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+
+class Command(BaseCommand):
+    help = (
+        "Refresh the read replica with a consistent copy of the primary SQLite database, using SQLite's online backup. "
+        "The primary stays usable while it runs."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', nargs='?', help="Replica file, by default the NAME of the replica database")
+        parser.add_argument('--database', default='default', help="Database to copy")
+
+    def handle(self, *args, **options):
+        target = options['path'] or settings.DATABASES.get('replica', {}).get('NAME')
+        if not target:
+            raise CommandError("No replica database is configured (TASK_DB_REPLICA); give the replica file path")
+        source = connections[options['database']]
+        if source.vendor != 'sqlite':
+            raise CommandError("copy_replica only copies SQLite databases")
+        source.ensure_connection()
+        started = time.perf_counter()
+        # Written in place rather than swapped in, so open replica connections never see a WAL file of another copy
+        destination = sqlite3.connect(target)
+        try:
+            source.connection.backup(destination)
+        finally:
+            destination.close()
+        self.stdout.write(self.style.SUCCESS(f"Copied {options['database']} to {target} in {time.perf_counter() - started:.2f}s"))
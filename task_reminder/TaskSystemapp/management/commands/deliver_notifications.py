@@ -0,0 +1,41 @@
+import logging
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from TaskSystemapp.models import Notification
+from TaskSystemapp.notifications import DeliveryWorker
+
+
+class Command(BaseCommand):
+    help = (
+        "Run the notification delivery worker: sends the queued reminder emails and text messages in batches. "
+        "Several workers may run at once."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, help="Notifications claimed and sent per batch")
+        parser.add_argument('--once', action='store_true', help="Send the notifications that are due now and exit")
+        parser.add_argument('--retry-dead', action='store_true', help="Queue the dead-lettered notifications again and exit")
+
+    def handle(self, *args, **options):
+        if options['retry_dead']:
+            count = Notification.objects.filter(status='dead').update(
+                status='pending', attempts=0, next_attempt_at=timezone.now(), last_error=''
+            )
+            self.stdout.write(self.style.SUCCESS(f"Queued {count} notifications again"))
+            return
+        if options['verbosity'] > 1:
+            logging.getLogger('TaskSystemapp.notifications').setLevel(logging.INFO)
+        worker = DeliveryWorker(batch_size=options['batch_size'])
+        if options['once']:
+            try:
+                worker.run_once()
+            finally:
+                worker.close()
+            return
+        self.stdout.write("Notification worker started, press Ctrl+C to stop.")
+        try:
+            worker.run()
+        except KeyboardInterrupt:
+            worker.stop()
@@ -0,0 +1,52 @@
+import os
+
+from django.core.files import File
+from django.core.management.base import BaseCommand, CommandError
+
+from TaskSystemapp.imports import import_format, run_import
+from TaskSystemapp.models import CustomUser, ImportJob
+
+
+class Command(BaseCommand):
+    help = "Import tasks for a user from a CSV or iCalendar (.ics) file, or resume a failed import."
+
+    def add_arguments(self, parser):
+        parser.add_argument('username', nargs='?')
+        parser.add_argument('path', nargs='?')
+        parser.add_argument('--format', choices=['csv', 'ics'], help="File format, by default taken from the extension")
+        parser.add_argument('--chunk-size', type=int, help="Records validated, inserted and committed together")
+        parser.add_argument('--resume', type=int, metavar='JOB_ID', help="Resume a failed import")
+
+    def handle(self, *args, **options):
+        if options['resume']:
+            try:
+                job = ImportJob.objects.select_related('user').get(pk=options['resume'])
+            except ImportJob.DoesNotExist:
+                raise CommandError(f"Import {options['resume']} does not exist")
+            if job.status == 'done':
+                raise CommandError(f"Import {job.pk} is already done")
+        else:
+            if not options['username'] or not options['path']:
+                raise CommandError("Give a username and a file, or --resume JOB_ID")
+            try:
+                user = CustomUser.objects.get(username=options['username'])
+            except CustomUser.DoesNotExist:
+                raise CommandError(f"User {options['username']} does not exist")
+            name = os.path.basename(options['path'])
+            file_format = options['format'] or import_format(name)
+            if file_format is None:
+                raise CommandError("Unknown file type, use --format")
+            job = ImportJob(user=user, name=name, format=file_format)
+            with open(options['path'], 'rb') as source:
+                job.file.save(name, File(source), save=False)
+            job.save()
+
+        def progress(job):
+            self.stdout.write(f"{job.rows_done} records: {job.imported} imported, {job.failed} invalid")
+
+        job = run_import(job, chunk_size=options['chunk_size'], progress=progress)
+        for error in job.errors:
+            self.stdout.write(f"Row {error['row']}: {error['errors']}")
+        if job.status != 'done':
+            raise CommandError(f"Import {job.pk} failed: {job.message}. Resume it with --resume {job.pk}")
+        self.stdout.write(self.style.SUCCESS(f"Import {job.pk} done: {job.imported} tasks imported, {job.failed} invalid records"))
@@ -0,0 +1,33 @@
+import logging
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+
+from TaskSystemapp.reminders import ReminderScheduler
+
+
+class Command(BaseCommand):
+    help = "Run the reminder scheduler: fires each task's reminder reminder_offset before its deadline."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--horizon', type=int, help="Seconds of upcoming reminders held in memory")
+        parser.add_argument('--poll-interval', type=int, help="Seconds between polls for changed tasks")
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument('--once', action='store_true', help="Fire the reminders that are due now and exit")
+
+    def handle(self, *args, **options):
+        if options['verbosity'] > 1:
+            logging.getLogger('TaskSystemapp.reminders').setLevel(logging.INFO)
+        scheduler = ReminderScheduler(
+            horizon=options['horizon'] and timedelta(seconds=options['horizon']),
+            poll_interval=options['poll_interval'] and timedelta(seconds=options['poll_interval']),
+            batch_size=options['batch_size'],
+        )
+        if options['once']:
+            scheduler.run_once()
+            return
+        self.stdout.write("Reminder scheduler started, press Ctrl+C to stop.")
+        try:
+            scheduler.run()
+        except KeyboardInterrupt:
+            scheduler.stop()
@@ -0,0 +1,110 @@
+import random
+import time
+import zlib
+from datetime import timedelta
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from TaskSystemapp.models import CustomUser, Task
+from TaskSystemapp.signals import batch_task_changes
+
+REGIONS = ['Asia/Shanghai', 'Asia/Tokyo', 'Asia/Singapore', 'America/New_York', 'Europe/London', 'Australia/Sydney']
+PRIORITIES = ['high', 'medium', 'low']
+PRIORITY_WEIGHTS = [2, 5, 3]
+VERBS = ['Review', 'Write', 'Plan', 'Fix', 'Call', 'Prepare', 'Update', 'Send', 'Check', 'Book']
+SUBJECTS = [
+    'report', 'budget', 'meeting notes', 'sprint backlog', 'invoice', 'slides', 'contract', 'release',
+    'dentist appointment', 'flight', 'newsletter', 'design doc', 'test plan', 'quarterly review',
+]
+DESCRIPTIONS = [
+    '', '', '', 'Follow up with the team afterwards.', 'Needs sign-off before Friday.',
+    'See the shared folder for the latest draft.', 'Low effort, do it between meetings.',
+]
+
+
+class Command(BaseCommand):
+    help = (
+        "Seed benchmark users with tasks. The same --seed always produces the same users and tasks, "
+        "with due dates relative to the current hour."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=10)
+        parser.add_argument('--tasks', type=int, default=1000, help="Tasks per user")
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--prefix', default='bench', help="Username prefix of the seeded users")
+        parser.add_argument('--password', default='bench', help="Password of every seeded user")
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--clear', action='store_true', help="Delete users with the prefix (and their tasks) first")
+
+    def handle(self, *args, **options):
+        prefix = options['prefix']
+        if options['clear']:
+            with batch_task_changes():
+                deleted, _ = CustomUser.objects.filter(username__startswith=prefix).delete()
+            self.stdout.write(f"Deleted {deleted} rows of earlier {prefix} users")
+
+        rng = random.Random(options['seed'])
+        anchor = timezone.now().replace(minute=0, second=0, microsecond=0)
+        started = time.perf_counter()
+        with transaction.atomic():
+            users = self.create_users(prefix, options['users'], options['password'], options['batch_size'])
+            count = 0
+            for user in users:
+                tasks = [self.make_task(rng, user, anchor, i) for i in range(options['tasks'])]
+                Task.objects.bulk_create(tasks, batch_size=options['batch_size'])
+                count += len(tasks)
+        seconds = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"Seeded {len(users)} users and {count} tasks in {seconds:.1f}s ({count / max(seconds, 1e-9):.0f} tasks/s)"
+        ))
+
+    def create_users(self, prefix, count, password, batch_size):
+        # Hashing is deliberately slow, so every user shares one hash
+        password_hash = make_password(password)
+        # Phone numbers are unique too: +999, five digits derived from the prefix, then the user number
+        phone_block = zlib.crc32(prefix.encode()) % 100000
+        users = [
+            CustomUser(
+                username=f'{prefix}{i:05d}',
+                email=f'{prefix}{i:05d}@example.com',
+                phone=f'+999{phone_block:05d}{i:06d}',
+                region=REGIONS[i % len(REGIONS)],
+                password=password_hash,
+            )
+            for i in range(count)
+        ]
+        users = CustomUser.objects.bulk_create(users, batch_size=batch_size)
+        if users and users[0].pk is None:
+            # Databases that cannot return ids from a bulk insert
+            users = list(CustomUser.objects.filter(username__in=[user.username for user in users]).order_by('username'))
+        return users
+
+    def make_task(self, rng, user, anchor, i):
+        """
+        A task due between 30 days ago and 180 days ahead, most of them within the next two weeks.
+        Most past tasks are completed; a few future ones are too.
+        """
+        spread = rng.random()
+        if spread < 0.15:
+            due_date = anchor - timedelta(minutes=rng.randrange(1, 30 * 24 * 60))
+        elif spread < 0.6:
+            due_date = anchor + timedelta(minutes=rng.randrange(1, 14 * 24 * 60))
+        else:
+            due_date = anchor + timedelta(minutes=rng.randrange(14 * 24 * 60, 180 * 24 * 60))
+        is_completed = rng.random() < (0.8 if due_date < anchor else 0.05)
+        start_date = due_date - timedelta(hours=rng.randrange(1, 72)) if rng.random() < 0.3 else None
+        task = Task(
+            user=user,
+            title=f'{rng.choice(VERBS)} {rng.choice(SUBJECTS)} #{i}',
+            description=rng.choice(DESCRIPTIONS),
+            priority=rng.choices(PRIORITIES, PRIORITY_WEIGHTS)[0],
+            start_date=start_date,
+            due_date=due_date,
+            is_completed=is_completed,
+        )
+        task.set_remind_at()
+        return task
@@ -0,0 +1,435 @@
+"""
+Per-request performance instrumentation, the request side of primary/replica database routing,
+activation of the user's time zone and language, and serving of the collected static files.
+
+RequestTimingMiddleware measures every request: SQL query count and time, template render time and total time.
+They are sent back in a Server-Timing header (shown in the browser's network panel) and requests slower than
+PERF_SLOW_REQUEST_MS are logged as JSON to the TaskSystemapp.performance logger.
+
+With RequestProfilerMiddleware, staff users can also profile a single request with cProfile by adding ?_profile=1
+or an "X-Profile: 1" header; the response is then replaced by the pstats report.
+
+The measurements of the current request live in a context variable, which asgiref copies into sync_to_async
+threads, so the queries of async views are counted too. Work done while a streaming response is being sent
+happens after the headers and is not included.
+"""
+import cProfile
+import io
+import json
+import logging
+import mimetypes
+import os
+import pstats
+import time
+from contextvars import ContextVar
+from urllib.parse import unquote
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.exceptions import SuspiciousFileOperation
+from django.db import connections
+from django.http import FileResponse, HttpResponse
+from django.template.base import Template
+from django.utils import timezone, translation
+from django.utils._os import safe_join
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date
+
+from .locales import activate_locale, user_locale
+from .routers import end_routing, start_routing
+
+logger = logging.getLogger('TaskSystemapp.performance')
+
+SLOW_REQUEST_MS = getattr(settings, 'PERF_SLOW_REQUEST_MS', 500)
+PROFILE_PARAM = getattr(settings, 'PERF_PROFILE_PARAM', '_profile')
+PROFILE_HEADER = getattr(settings, 'PERF_PROFILE_HEADER', 'X-Profile')
+# Directory to also save each profile to as a .prof file (e.g. for snakeviz), or None
+PROFILE_DIR = getattr(settings, 'PERF_PROFILE_DIR', None)
+# Lines of the pstats report, sorted by cumulative time
+PROFILE_LIMIT = 60
+PIN_SECONDS = getattr(settings, 'REPLICA_PIN_SECONDS', 15)
+# Precompressed copies written by collectstatic (see TaskSystemapp.storage), best first
+STATIC_ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+STATIC_IMMUTABLE = 'public, max-age=31536000, immutable'
+
+_current_metrics = ContextVar('request_metrics', default=None)
+
+
+class RequestMetrics:
+    """
+    Timings of one request, in seconds.
+    """
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.db_time = 0.0
+        self.template_time = 0.0
+        self.template_depth = 0
+        self.total_time = 0.0
+
+    def finish(self):
+        self.total_time = time.perf_counter() - self.started
+
+    def server_timing(self):
+        return ', '.join([
+            f'db;dur={self.db_time * 1000:.1f};desc="{self.queries} queries"',
+            f'tpl;dur={self.template_time * 1000:.1f};desc="templates"',
+            f'total;dur={self.total_time * 1000:.1f}',
+        ])
+
+
+def record_query(execute, sql, params, many, context):
+    """
+    Database execute wrapper adding each query's time to the current request, if there is one.
+    """
+    metrics = _current_metrics.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        metrics.db_time += time.perf_counter() - started
+        metrics.queries += 1
+
+
+def install_query_recorder(connection, **kwargs):
+    """
+    Adds record_query to a database connection; connected to connection_created, and run for open connections.
+    """
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+def install_template_timer():
+    """
+    Times Template.render. Included templates render inside their parent, so only the outermost render is counted.
+    """
+    if getattr(Template.render, 'timed', False):
+        return
+    render = Template.render
+
+    def timed_render(self, context):
+        metrics = _current_metrics.get()
+        if metrics is None:
+            return render(self, context)
+        metrics.template_depth += 1
+        started = time.perf_counter()
+        try:
+            return render(self, context)
+        finally:
+            metrics.template_depth -= 1
+            if not metrics.template_depth:
+                metrics.template_time += time.perf_counter() - started
+
+    timed_render.timed = True
+    Template.render = timed_render
+
+
+class RequestTimingMiddleware:
+    """
+    Records the performance of every request; see the module docstring. Works for sync and async stacks.
+    Goes first in MIDDLEWARE, so the total covers the other middleware as well.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+        install_template_timer()
+        for connection in connections.all(initialized_only=True):
+            install_query_recorder(connection)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        metrics = RequestMetrics()
+        token = _current_metrics.set(metrics)
+        try:
+            response = self.get_response(request)
+        finally:
+            _current_metrics.reset(token)
+        return self.finish(request, response, metrics)
+
+    async def __acall__(self, request):
+        metrics = RequestMetrics()
+        token = _current_metrics.set(metrics)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current_metrics.reset(token)
+        return self.finish(request, response, metrics)
+
+    def finish(self, request, response, metrics):
+        metrics.finish()
+        response['Server-Timing'] = metrics.server_timing()
+        if metrics.total_time * 1000 >= SLOW_REQUEST_MS:
+            user = getattr(request, '_cached_user', None) or getattr(request, '_acached_user', None)
+            record = {
+                'method': request.method,
+                'path': request.path,
+                'status': response.status_code,
+                'total_ms': round(metrics.total_time * 1000, 1),
+                'db_ms': round(metrics.db_time * 1000, 1),
+                'queries': metrics.queries,
+                'template_ms': round(metrics.template_time * 1000, 1),
+                'user_id': getattr(user, 'pk', None),
+            }
+            logger.warning("Slow request %s", json.dumps(record), extra={'request_metrics': record})
+        return response
+
+
+class RequestProfilerMiddleware:
+    """
+    Profiles a request with cProfile when a staff user asks for it, replacing the response with the pstats report.
+    Goes after AuthenticationMiddleware, which provides the user.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        if not (self.wants_profile(request) and request.user.is_staff):
+            return self.get_response(request)
+        profiler = cProfile.Profile()
+        profiler.enable()
+        try:
+            response = self.get_response(request)
+        finally:
+            profiler.disable()
+        return self.profile_response(request, response, [profiler])
+
+    async def __acall__(self, request):
+        if not (self.wants_profile(request) and (await request.auser()).is_staff):
+            return await self.get_response(request)
+        # Async requests run in two threads: the event loop, running async views, and the request's thread-sensitive
+        # worker, running sync code and the ORM. Both are profiled; requests served meanwhile are included too,
+        # so profile on a quiet server.
+        loop_profiler = cProfile.Profile()
+        sync_profiler = cProfile.Profile()
+        await sync_to_async(sync_profiler.enable)()
+        loop_profiler.enable()
+        try:
+            response = await self.get_response(request)
+        finally:
+            loop_profiler.disable()
+            await sync_to_async(sync_profiler.disable)()
+        return self.profile_response(request, response, [loop_profiler, sync_profiler])
+
+    def wants_profile(self, request):
+        return request.GET.get(PROFILE_PARAM) == '1' or request.headers.get(PROFILE_HEADER) == '1'
+
+    def profile_response(self, request, response, profilers):
+        """
+        The pstats report of the profilers, sorted by cumulative time; the raw profile is saved to PROFILE_DIR if set.
+        The body of a streaming response is never produced, so it is not profiled.
+        """
+        stats = pstats.Stats(*profilers, stream=io.StringIO())
+        stats.sort_stats('cumulative')
+        if PROFILE_DIR:
+            os.makedirs(PROFILE_DIR, exist_ok=True)
+            name = f"{timezone.now():%Y%m%d-%H%M%S-%f}-{request.path.strip('/').replace('/', '-')}.prof"
+            stats.dump_stats(os.path.join(PROFILE_DIR, name))
+        stats.print_stats(PROFILE_LIMIT)
+        report = f"{request.method} {request.path} returned {response.status_code}\n\n{stats.stream.getvalue()}"
+        return HttpResponse(report, content_type='text/plain; charset=utf-8')
+
+
+class RequestRoutingMiddleware:
+    """
+    Sets up primary/replica routing (see TaskSystemapp.routers) for each request, and pins the session to the primary
+    for REPLICA_PIN_SECONDS after a request that wrote, so the user reads their own writes. Goes after SessionMiddleware.
+    """
+    sync_capable = True
+    async_capable = True
+    session_key = '_db_primary_until'
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        state, token = start_routing(pinned=request.session.get(self.session_key, 0) > time.time())
+        try:
+            response = self.get_response(request)
+        finally:
+            end_routing(token)
+        if state.wrote:
+            request.session[self.session_key] = time.time() + PIN_SECONDS
+        return response
+
+    async def __acall__(self, request):
+        state, token = start_routing(pinned=await request.session.aget(self.session_key, 0) > time.time())
+        try:
+            response = await self.get_response(request)
+        finally:
+            end_routing(token)
+        if state.wrote:
+            await request.session.aset(self.session_key, time.time() + PIN_SECONDS)
+        return response
+
+
+class UserLocaleMiddleware:
+    """
+    Activates the logged-in user's time zone and language (see TaskSystemapp.locales) for every view, or the
+    defaults for anonymous users. They come from the user row, which is read once per request and handed to the
+    view through both request.user and request.auser(), so profile changes apply at once in every worker process.
+    Goes after AuthenticationMiddleware.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        user = request.user
+        share_user(request, user)
+        activate_locale(*user_locale(user))
+        return self.finish(self.get_response(request))
+
+    async def __acall__(self, request):
+        user = await request.auser()
+        share_user(request, user)
+        activate_locale(*user_locale(user))
+        return self.finish(await self.get_response(request))
+
+    def finish(self, response):
+        # The time zone and language stay active while a streaming response is sent, and the next request replaces them
+        response.headers.setdefault('Content-Language', translation.get_language())
+        return response
+
+
+def share_user(request, user):
+    """
+    Makes request.user and request.auser() both return user; each otherwise loads the user row again the first
+    time it is used, and views use one or the other.
+    """
+    async def auser():
+        return user
+
+    request.user = user
+    request.auser = auser
+
+
+async def read_file(filelike, block_size):
+    """
+    The contents of filelike in blocks, each read in a thread. The response closes the file.
+    """
+    read = sync_to_async(filelike.read, thread_sensitive=False)
+    while block := await read(block_size):
+        yield block
+
+
+def accepted_encodings(header):
+    """
+    The content codings an Accept-Encoding header allows, leaving out those refused with q=0.
+    """
+    accepted = set()
+    for item in header.split(','):
+        coding, _, params = item.strip().partition(';')
+        q = params.strip()
+        if q.startswith('q='):
+            try:
+                if float(q[2:]) == 0:
+                    continue
+            except ValueError:
+                continue
+        if coding:
+            accepted.add(coding.strip().lower())
+    return accepted
+
+
+class StaticAssetMiddleware:
+    """
+    Serves the files collectstatic wrote to STATIC_ROOT, ahead of sessions and authentication, using the
+    precompressed .br or .gz copy when the browser accepts it. Names with a content hash from the manifest are cached
+    for a year as immutable, so a warm page load requests no assets at all; other names are revalidated.
+    Goes right after RequestTimingMiddleware. Files that were not collected fall through, e.g. under runserver,
+    which serves them from the app directories itself.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+        self.prefix = settings.STATIC_URL if settings.STATIC_URL.startswith('/') else f'/{settings.STATIC_URL}'
+        self.root = settings.STATIC_ROOT
+        self._hashed_names = None
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        return self.serve(request) or self.get_response(request)
+
+    async def __acall__(self, request):
+        # The file checks and the open block, so they run in a thread
+        response = await sync_to_async(self.serve)(request)
+        if response is None:
+            return await self.get_response(request)
+        if response.streaming:
+            # Read the file off the event loop too, instead of having the ASGI handler consume a sync iterator
+            response.streaming_content = read_file(response.file_to_stream, response.block_size)
+        return response
+
+    def hashed_names(self):
+        if self._hashed_names is None:
+            self._hashed_names = set(getattr(staticfiles_storage, 'hashed_files', {}).values())
+        return self._hashed_names
+
+    def serve(self, request):
+        """
+        The response for a collected static file, or None to let the rest of the stack handle the request.
+        """
+        if not self.root or request.method not in ('GET', 'HEAD') or not request.path.startswith(self.prefix):
+            return None
+        name = unquote(request.path[len(self.prefix):])
+        try:
+            path = safe_join(self.root, name)
+        except (SuspiciousFileOperation, ValueError):
+            return None
+        if not os.path.isfile(path):
+            return None
+        served, encoding = path, None
+        accepted = accepted_encodings(request.headers.get('Accept-Encoding', ''))
+        for coding, suffix in STATIC_ENCODINGS:
+            if coding in accepted and os.path.isfile(path + suffix):
+                served, encoding = path + suffix, coding
+                break
+        last_modified = int(os.stat(served).st_mtime)
+        response = get_conditional_response(request, last_modified=last_modified)
+        if response is None:
+            content_type = mimetypes.guess_type(path)[0] or 'application/octet-stream'
+            if content_type.startswith('text/') or content_type in ('application/javascript', 'image/svg+xml'):
+                content_type += '; charset=utf-8'
+            response = FileResponse(open(served, 'rb'), content_type=content_type)
+            if encoding:
+                response['Content-Encoding'] = encoding
+        response['Last-Modified'] = http_date(last_modified)
+        patch_vary_headers(response, ['Accept-Encoding'])
+        response['Cache-Control'] = STATIC_IMMUTABLE if name in self.hashed_names() else 'public, no-cache'
+        return response
@@ -0,0 +1,45 @@
+# Generated by Django 5.1.7 on 2026-10-18 11:24
+
+import datetime
+from django.db import migrations, models
+from django.db.models import F
+
+
+def fill_remind_at(apps, schema_editor):
+    Task = apps.get_model('TaskSystemapp', 'Task')
+    Task.objects.update(remind_at=F('due_date') - F('reminder_offset'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('TaskSystemapp', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='task',
+            name='remind_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True, verbose_name='Reminder time'),
+        ),
+        migrations.AddField(
+            model_name='task',
+            name='reminded_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True, verbose_name='Reminder sent'),
+        ),
+        migrations.AddField(
+            model_name='task',
+            name='reminder_offset',
+            field=models.DurationField(default=datetime.timedelta(seconds=7200), help_text='How long before the deadline to send the reminder, e.g. 02:00:00', verbose_name='Reminder offset'),
+        ),
+        migrations.AddField(
+            model_name='task',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, db_index=True, verbose_name='Last modified'),
+        ),
+        migrations.RunPython(fill_remind_at, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(condition=models.Q(('is_completed', False), ('reminded_at__isnull', True)), fields=['remind_at'], name='task_pending_reminder_idx'),
+        ),
+    ]
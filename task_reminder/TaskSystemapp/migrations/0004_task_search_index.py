@@ -0,0 +1,24 @@
+# Creates the SQLite FTS5 index used by the home page search box
+
+from django.db import migrations
+
+
+def create_search_index(apps, schema_editor):
+    from TaskSystemapp.search import create_search_index
+    create_search_index(schema_editor.connection)
+
+
+def drop_search_index(apps, schema_editor):
+    from TaskSystemapp.search import drop_search_index
+    drop_search_index(schema_editor.connection)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('TaskSystemapp', '0003_task_user_due_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.1.7 on 2026-10-18 11:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('TaskSystemapp', '0004_task_search_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='customuser',
+            name='tasks_changed_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='customuser',
+            name='tasks_version',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+    ]
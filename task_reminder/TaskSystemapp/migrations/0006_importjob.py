@@ -0,0 +1,33 @@
+# Generated by Django 5.1.7 on 2026-10-18 11:41
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('TaskSystemapp', '0005_customuser_tasks_version'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImportJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('file', models.FileField(blank=True, upload_to='imports/', verbose_name='File')),
+                ('name', models.CharField(max_length=255, verbose_name='File name')),
+                ('format', models.CharField(choices=[('csv', 'CSV'), ('ics', 'iCalendar')], max_length=3, verbose_name='Format')),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('running', 'Running'), ('failed', 'Failed'), ('done', 'Done')], default='pending', max_length=10, verbose_name='Status')),
+                ('rows_done', models.PositiveIntegerField(default=0, verbose_name='Records handled')),
+                ('imported', models.PositiveIntegerField(default=0, verbose_name='Tasks imported')),
+                ('failed', models.PositiveIntegerField(default=0, verbose_name='Invalid records')),
+                ('errors', models.JSONField(blank=True, default=list, verbose_name='Record errors')),
+                ('message', models.TextField(blank=True, verbose_name='Failure')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Creation time')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Last modified')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='import_jobs', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.7 on 2026-10-18 11:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('TaskSystemapp', '0007_customuser_feed_token'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='customuser',
+            name='language',
+            field=models.CharField(blank=True, help_text='Interface language code; blank for the site default', max_length=10),
+        ),
+    ]
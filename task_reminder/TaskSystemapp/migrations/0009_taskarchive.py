@@ -0,0 +1,36 @@
+# Generated by Django 5.1.7 on 2026-10-18 12:03
+
+import datetime
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('TaskSystemapp', '0008_customuser_language'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TaskArchive',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('task_id', models.BigIntegerField(unique=True, verbose_name='Task id')),
+                ('title', models.CharField(max_length=200, verbose_name='Task name')),
+                ('description', models.TextField(blank=True, verbose_name='Mission statement')),
+                ('priority', models.CharField(choices=[('low', 'Low'), ('medium', 'Medium'), ('high', 'High')], default='medium', max_length=10, verbose_name='Priority')),
+                ('created_at', models.DateTimeField(verbose_name='Creation time')),
+                ('start_date', models.DateTimeField(blank=True, null=True, verbose_name='Start date')),
+                ('due_date', models.DateTimeField(verbose_name='Deadline')),
+                ('reminder_offset', models.DurationField(default=datetime.timedelta(seconds=7200), verbose_name='Reminder offset')),
+                ('completed_at', models.DateTimeField(verbose_name='Completed')),
+                ('archived_at', models.DateTimeField(auto_now_add=True, verbose_name='Archived')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_tasks', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['user', '-due_date'], name='archive_user_due_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,53 @@
+# Generated by Django 5.1.7 on 2026-10-18 12:06
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('TaskSystemapp', '0009_taskarchive'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TaskOccurrence',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('original_date', models.DateTimeField(verbose_name='Occurrence')),
+                ('due_date', models.DateTimeField(blank=True, null=True, verbose_name='Deadline')),
+                ('is_completed', models.BooleanField(default=False, verbose_name='Completion')),
+                ('is_skipped', models.BooleanField(default=False, verbose_name='Skipped')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Last modified')),
+            ],
+        ),
+        migrations.AddField(
+            model_name='task',
+            name='recurrence',
+            field=models.CharField(blank=True, choices=[('', 'Does not repeat'), ('daily', 'Daily'), ('weekly', 'Weekly'), ('monthly', 'Monthly')], default='', max_length=10, verbose_name='Repeats'),
+        ),
+        migrations.AddField(
+            model_name='task',
+            name='recurrence_interval',
+            field=models.PositiveSmallIntegerField(default=1, help_text='Days, weeks or months between occurrences', verbose_name='Repeat every'),
+        ),
+        migrations.AddField(
+            model_name='task',
+            name='recurrence_until',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Repeat until'),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(condition=models.Q(('recurrence__gt', '')), fields=['user', 'due_date'], name='task_user_recurring_idx'),
+        ),
+        migrations.AddField(
+            model_name='taskoccurrence',
+            name='task',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='occurrences', to='TaskSystemapp.task'),
+        ),
+        migrations.AddConstraint(
+            model_name='taskoccurrence',
+            constraint=models.UniqueConstraint(fields=('task', 'original_date'), name='occurrence_task_date_uniq'),
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 5.1.7 on 2026-10-18 12:17
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('TaskSystemapp', '0010_task_recurrence'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Notification',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('channel', models.CharField(choices=[('email', 'Email'), ('sms', 'Text message')], max_length=5, verbose_name='Channel')),
+                ('recipient', models.CharField(max_length=254, verbose_name='Recipient')),
+                ('subject', models.CharField(blank=True, max_length=200, verbose_name='Subject')),
+                ('body', models.TextField(verbose_name='Message')),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('sent', 'Sent'), ('merged', 'Sent in a digest'), ('dead', 'Failed')], default='pending', max_length=7, verbose_name='Status')),
+                ('attempts', models.PositiveSmallIntegerField(default=0, verbose_name='Failed attempts')),
+                ('next_attempt_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Next attempt')),
+                ('claimed_by', models.CharField(blank=True, max_length=32, verbose_name='Worker')),
+                ('last_error', models.TextField(blank=True, verbose_name='Last error')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Creation time')),
+                ('sent_at', models.DateTimeField(blank=True, null=True, verbose_name='Sent')),
+                ('task', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='notifications', to='TaskSystemapp.task')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='notifications', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(condition=models.Q(('status', 'pending')), fields=['next_attempt_at'], name='notification_pending_idx'), models.Index(condition=models.Q(('status', 'sent')), fields=['recipient', 'sent_at'], name='notification_recipient_idx'), models.Index(condition=models.Q(('claimed_by', ''), _negated=True), fields=['claimed_by'], name='notification_claim_idx')],
+            },
+        ),
+    ]
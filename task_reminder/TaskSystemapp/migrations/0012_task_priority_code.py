@@ -0,0 +1,92 @@
+# Stores task priorities as small integers. The names are copied into a new integer column that then replaces
+# the text one, which works on any database, unlike converting the column's type in place.
+
+import TaskSystemapp.models
+from django.db import migrations, models
+from django.db.models import Case, Value, When
+
+# The same mapping as TaskSystemapp.models.PRIORITY_CODES, frozen for this migration
+PRIORITY_CODES = {'high': 1, 'medium': 2, 'low': 3}
+
+
+def encode_priorities(apps, schema_editor):
+    """
+    Copies each priority name into the integer column, in one UPDATE per table.
+    """
+    for name in ('Task', 'TaskArchive'):
+        model = apps.get_model('TaskSystemapp', name)
+        model.objects.update(priority_code=Case(
+            *[When(priority=priority, then=Value(code)) for priority, code in PRIORITY_CODES.items()],
+            default=Value(PRIORITY_CODES['medium']),
+        ))
+
+
+def decode_priorities(apps, schema_editor):
+    for name in ('Task', 'TaskArchive'):
+        model = apps.get_model('TaskSystemapp', name)
+        model.objects.update(priority=Case(
+            *[When(priority_code=code, then=Value(priority)) for priority, code in PRIORITY_CODES.items()],
+            default=Value('medium'),
+        ))
+
+
+def repair_search_index(apps, schema_editor):
+    # SQLite rebuilds the task table to drop a column, which drops the search index triggers with it
+    from TaskSystemapp.search import create_search_index
+    create_search_index(schema_editor.connection)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('TaskSystemapp', '0011_notification'),
+    ]
+
+    operations = [
+        # Repairs the triggers when the migration is reversed
+        migrations.RunPython(migrations.RunPython.noop, repair_search_index),
+        migrations.AddField(
+            model_name='task',
+            name='priority_code',
+            field=models.PositiveSmallIntegerField(default=2),
+        ),
+        migrations.AddField(
+            model_name='taskarchive',
+            name='priority_code',
+            field=models.PositiveSmallIntegerField(default=2),
+        ),
+        migrations.RunPython(encode_priorities, decode_priorities),
+        migrations.RemoveField(
+            model_name='task',
+            name='priority',
+        ),
+        migrations.RemoveField(
+            model_name='taskarchive',
+            name='priority',
+        ),
+        migrations.RenameField(
+            model_name='task',
+            old_name='priority_code',
+            new_name='priority',
+        ),
+        migrations.RenameField(
+            model_name='taskarchive',
+            old_name='priority_code',
+            new_name='priority',
+        ),
+        migrations.AlterField(
+            model_name='task',
+            name='priority',
+            field=TaskSystemapp.models.PriorityField(choices=[('low', 'Low'), ('medium', 'Medium'), ('high', 'High')], default='medium', verbose_name='Priority'),
+        ),
+        migrations.AlterField(
+            model_name='taskarchive',
+            name='priority',
+            field=TaskSystemapp.models.PriorityField(choices=[('low', 'Low'), ('medium', 'Medium'), ('high', 'High')], default='medium', verbose_name='Priority'),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(condition=models.Q(('is_completed', False)), fields=['user', 'priority', 'due_date'], name='task_user_priority_idx'),
+        ),
+        migrations.RunPython(repair_search_index, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('TaskSystemapp', '0012_task_priority_code'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='taskarchive',
+            name='recurrence',
+            field=models.CharField(blank=True, choices=[('', 'Does not repeat'), ('daily', 'Daily'), ('weekly', 'Weekly'), ('monthly', 'Monthly')], default='', max_length=10, verbose_name='Repeats'),
+        ),
+        migrations.AddField(
+            model_name='taskarchive',
+            name='recurrence_interval',
+            field=models.PositiveSmallIntegerField(default=1, verbose_name='Repeat every'),
+        ),
+        migrations.AddField(
+            model_name='taskarchive',
+            name='recurrence_until',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Repeat until'),
+        ),
+    ]
@@ -1,14 +1,34 @@
 from django.contrib.auth.models import AbstractUser
+from django.core.exceptions import ValidationError
 from django.db import models
 from django.core.validators import RegexValidator
 from django.utils import timezone
+from django.utils.functional import cached_property
 from datetime import timedelta
+import secrets
 from django.conf import settings
 
+from .locales import user_timezone
+from .recurrence import next_reminder
+
+# Default time between a task's reminder and its deadline
+DEFAULT_REMINDER_OFFSET = timedelta(hours=2)
+# Fields remind_at is computed from
+REMINDER_FIELDS = ('due_date', 'reminder_offset', 'recurrence', 'recurrence_interval', 'recurrence_until')
+# Stored codes of the task priorities, in the order lists show them: high first
+PRIORITY_CODES = {'high': 1, 'medium': 2, 'low': 3}
+PRIORITY_NAMES = {code: name for name, code in PRIORITY_CODES.items()}
+# Open tasks due within this time from now are about to expire
+SOON_EXPIRING = timedelta(days=7)
+# Status flags of a task, in the order they are checked
+TASK_STATUSES = ('completed', 'overdue', 'expiring', 'normal')
+
 class CustomUser(AbstractUser):
     """
     Custom user model, extended from Django's built-in AbstractUser.
-    Added fields for mobile number, email and region (time zone).
+    Added fields for mobile number, email, region (time zone) and interface language,
+    and a task version counter used to invalidate the user's cached task lists.
+    feed_token is the secret in the user's calendar subscription URL.
     """
     phone = models.CharField(
         max_length=15,
@@ -18,52 +38,357 @@ class CustomUser(AbstractUser):
     )
     email = models.EmailField(unique=True)
     region = models.CharField(max_length=50, blank=True, help_text="User region/timezone")
+    language = models.CharField(max_length=10, blank=True, help_text="Interface language code; blank for the site default")
+    # Bumped whenever one of the user's tasks is created, changed or deleted; keys the cached task views
+    tasks_version = models.PositiveIntegerField(default=0, editable=False)
+    tasks_changed_at = models.DateTimeField(null=True, blank=True, editable=False)
+    feed_token = models.CharField(max_length=64, unique=True, null=True, blank=True, editable=False)
 
     def __str__(self):
         return self.username
 
+    def get_feed_token(self):
+        """
+        The calendar feed token, created on first use.
+        """
+        if not self.feed_token:
+            self.reset_feed_token()
+        return self.feed_token
+
+    def reset_feed_token(self):
+        """
+        Replaces the calendar feed token, so links shared with the old one stop working.
+        """
+        self.feed_token = secrets.token_urlsafe(32)
+        self.save(update_fields=['feed_token'])
+
+
+class PriorityField(models.PositiveSmallIntegerField):
+    """
+    A task priority. It is 'low', 'medium' or 'high' in Python, forms, templates and JSON, and the small integer from
+    PRIORITY_CODES in the database, so tasks can be ordered and indexed by priority in SQL.
+    """
+
+    @cached_property
+    def validators(self):
+        # The choices validate the value; the integer range validators would compare it with numbers
+        return [*self.default_validators, *self._validators]
+
+    def from_db_value(self, value, expression, connection):
+        return PRIORITY_NAMES.get(value, value)
+
+    def to_python(self, value):
+        if value is None or value in PRIORITY_CODES:
+            return value
+        try:
+            return PRIORITY_NAMES[int(value)]
+        except (KeyError, TypeError, ValueError):
+            raise ValidationError(self.error_messages['invalid_choice'], code='invalid_choice', params={'value': value})
+
+    def get_prep_value(self, value):
+        if isinstance(value, str):
+            value = PRIORITY_CODES.get(value, value)
+        return super().get_prep_value(value)
+
+
+def task_status(task, now):
+    """
+    Status flag of a task or occurrence at now: 'completed', 'overdue', 'expiring' (due within SOON_EXPIRING) or 'normal'.
+    TaskQuerySet.with_status computes the same in SQL.
+    """
+    if task.is_completed:
+        return 'completed'
+    if task.due_date < now:
+        return 'overdue'
+    if task.due_date < now + SOON_EXPIRING:
+        return 'expiring'
+    return 'normal'
+
+
+class TaskQuerySet(models.QuerySet):
+    def with_status(self, now=None):
+        """
+        Annotates each task with its status flag (see task_status), computed in SQL against the one reference time now.
+        """
+        now = now or timezone.now()
+        return self.annotate(status=models.Case(
+            models.When(is_completed=True, then=models.Value('completed')),
+            models.When(due_date__lt=now, then=models.Value('overdue')),
+            models.When(due_date__lt=now + SOON_EXPIRING, then=models.Value('expiring')),
+            default=models.Value('normal'),
+            output_field=models.CharField(),
+        ))
+
+    def status_counts(self, now=None):
+        """
+        {"total": 12, "open": 9, "status": {"overdue": 1, ...}, "priority": {"high": {"overdue": 1, ...}, ...}} for the
+        tasks, from one GROUP BY query. Every status and priority is present, with 0 when there are none.
+        """
+        rows = self.with_status(now).values('status', 'priority').annotate(count=models.Count('id')).order_by()
+        counts = {
+            'total': 0,
+            'open': 0,
+            'status': dict.fromkeys(TASK_STATUSES, 0),
+            'priority': {name: dict.fromkeys(TASK_STATUSES, 0) for name in PRIORITY_CODES},
+        }
+        for row in rows:
+            counts['total'] += row['count']
+            if row['status'] != 'completed':
+                counts['open'] += row['count']
+            counts['status'][row['status']] += row['count']
+            counts['priority'][row['priority']][row['status']] += row['count']
+        return counts
+
 
 class Task(models.Model):
     """
     Task Model: Record user's task information, including task name, description, priority, start date, deadline and completion status.
-    It also provides some auxiliary attributes, such as whether the task is about to expire, whether it has expired and the reminder time (2 hours before the deadline).
+    It also provides some auxiliary attributes, such as whether the task is about to expire, whether it has expired and the reminder time
+    (reminder_offset before the deadline, 2 hours by default).
+    remind_at stores the reminder time so the reminder scheduler can find pending reminders with an index range scan.
+    A task with a recurrence rule repeats from its deadline; see recurrence.py.
     """
     PRIORITY_CHOICES = (
         ('low', 'Low'),
         ('medium', 'Medium'),
         ('high', 'High'),
     )
+    RECURRENCE_CHOICES = (
+        ('', 'Does not repeat'),
+        ('daily', 'Daily'),
+        ('weekly', 'Weekly'),
+        ('monthly', 'Monthly'),
+    )
 
     title = models.CharField("Task name", max_length=200)
     description = models.TextField("Mission statement", blank=True)
-    priority = models.CharField("Priority", max_length=10, choices=PRIORITY_CHOICES, default='medium')
+    priority = PriorityField("Priority", choices=PRIORITY_CHOICES, default='medium')
     created_at = models.DateTimeField("Creation time", auto_now_add=True)
     start_date = models.DateTimeField("Start date", null=True, blank=True)
     due_date = models.DateTimeField("Deadline")
     is_completed = models.BooleanField("Completion", default=False)
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="tasks")
+    reminder_offset = models.DurationField(
+        "Reminder offset",
+        default=DEFAULT_REMINDER_OFFSET,
+        help_text="How long before the deadline to send the reminder, e.g. 02:00:00"
+    )
+    remind_at = models.DateTimeField("Reminder time", null=True, blank=True, editable=False)
+    reminded_at = models.DateTimeField("Reminder sent", null=True, blank=True, editable=False)
+    updated_at = models.DateTimeField("Last modified", auto_now=True, db_index=True)
+    recurrence = models.CharField("Repeats", max_length=10, choices=RECURRENCE_CHOICES, blank=True, default='')
+    recurrence_interval = models.PositiveSmallIntegerField(
+        "Repeat every", default=1, help_text="Days, weeks or months between occurrences"
+    )
+    recurrence_until = models.DateTimeField("Repeat until", null=True, blank=True)
+
+    objects = TaskQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            # Per-user date-window lists and the "soon expiring" list are range scans on these.
+            # The open-task index is partial because Django filters is_completed=False as NOT "is_completed",
+            # which SQLite cannot match against an is_completed key column.
+            models.Index(fields=['user', 'due_date'], name='task_user_due_idx'),
+            models.Index(fields=['user', 'due_date'], name='task_user_open_due_idx', condition=models.Q(is_completed=False)),
+            # Only reminders that may still fire are indexed, so the scheduler's range query stays small
+            models.Index(
+                fields=['remind_at'],
+                name='task_pending_reminder_idx',
+                condition=models.Q(is_completed=False, reminded_at__isnull=True),
+            ),
+            # Recurring tasks are found by the start of their series, however long ago it was
+            models.Index(fields=['user', 'due_date'], name='task_user_recurring_idx', condition=models.Q(recurrence__gt='')),
+            # Open tasks listed most urgent first come out of this in order, so such lists need no sort
+            models.Index(
+                fields=['user', 'priority', 'due_date'], name='task_user_priority_idx', condition=models.Q(is_completed=False)
+            ),
+        ]
 
     def __str__(self):
         return self.title
 
+    def save(self, *args, **kwargs):
+        """
+        Keep remind_at in step with the deadline and the reminder offset.
+        """
+        self.set_remind_at()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and set(REMINDER_FIELDS) & set(update_fields):
+            kwargs['update_fields'] = {*update_fields, 'remind_at'}
+        super().save(*args, **kwargs)
+
+    def set_remind_at(self, after=None):
+        """
+        Computes remind_at; bulk_create bypasses save(), so bulk paths must call this themselves.
+        A recurring task is reminded of one occurrence at a time: the first whose reminder is not before after (now).
+        """
+        if not self.recurrence:
+            self.remind_at = self.due_date - self.reminder_offset
+            return
+        self.remind_at = next_reminder(self, after or timezone.now(), user_timezone(self.user))
+
     @property
     def is_expiring_soon(self):
         """
-        Determines if the task is about to expire: within 7 days of the deadline (and not expired).
+        Determines if the task is about to expire: open and due within SOON_EXPIRING from now.
+        Uses the status annotated by TaskQuerySet.with_status when there is one.
         """
-        delta = self.due_date - timezone.now()
-        return 0 <= delta.days <= 7
+        return self.current_status() == 'expiring'
 
     @property
     def is_overdue(self):
         """
-        Determine if the task has expired: the deadline is earlier than the current time.
+        Determine if the task has expired: open and the deadline is earlier than the current time.
         """
-        return self.due_date < timezone.now()
+        return self.current_status() == 'overdue'
+
+    def current_status(self):
+        return getattr(self, 'status', None) or task_status(self, timezone.now())
 
     @property
     def reminder_time(self):
         """
-        Reminder: 2 hours before the task is due.
+        Reminder: reminder_offset (2 hours by default) before the task is due.
         """
-        return self.due_date - timedelta(hours=2)
+        return self.due_date - self.reminder_offset
+
+
+
+class TaskOccurrence(models.Model):
+    """
+    Task Occurrence Model: one occurrence of a recurring task that differs from its rule, because it was completed,
+    skipped or moved to another deadline. Occurrences that follow the rule are not stored.
+    """
+    task = models.ForeignKey(Task, on_delete=models.CASCADE, related_name="occurrences")
+    # The deadline the rule gives this occurrence
+    original_date = models.DateTimeField("Occurrence")
+    # The deadline it was moved to, if any
+    due_date = models.DateTimeField("Deadline", null=True, blank=True)
+    is_completed = models.BooleanField("Completion", default=False)
+    is_skipped = models.BooleanField("Skipped", default=False)
+    updated_at = models.DateTimeField("Last modified", auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['task', 'original_date'], name='occurrence_task_date_uniq'),
+        ]
+
+    def __str__(self):
+        return f'{self.task_id} @ {self.original_date}'
+
+
+class ImportJob(models.Model):
+    """
+    Import Job Model: one CSV or iCalendar file of tasks being imported for a user.
+    rows_done counts the records already handled and is committed together with each chunk of tasks,
+    so an import that failed partway resumes after the last committed chunk.
+    """
+    FORMAT_CHOICES = (
+        ('csv', 'CSV'),
+        ('ics', 'iCalendar'),
+    )
+    STATUS_CHOICES = (
+        ('pending', 'Pending'),
+        ('running', 'Running'),
+        ('failed', 'Failed'),
+        ('done', 'Done'),
+    )
+
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="import_jobs")
+    # Kept until the import is done, so a failed import can be resumed
+    file = models.FileField("File", upload_to='imports/', blank=True)
+    name = models.CharField("File name", max_length=255)
+    format = models.CharField("Format", max_length=3, choices=FORMAT_CHOICES)
+    status = models.CharField("Status", max_length=10, choices=STATUS_CHOICES, default='pending')
+    rows_done = models.PositiveIntegerField("Records handled", default=0)
+    imported = models.PositiveIntegerField("Tasks imported", default=0)
+    failed = models.PositiveIntegerField("Invalid records", default=0)
+    # The first few invalid records: [{"row": 12, "errors": {"due_date": ["..."]}}, ...]
+    errors = models.JSONField("Record errors", default=list, blank=True)
+    message = models.TextField("Failure", blank=True)
+    created_at = models.DateTimeField("Creation time", auto_now_add=True)
+    updated_at = models.DateTimeField("Last modified", auto_now=True)
+
+    def __str__(self):
+        return self.name
+
+
+class TaskArchive(models.Model):
+    """
+    Task Archive Model: completed tasks moved out of Task by the archiver (see archive.py), so the task table and
+    its indexes only hold recent and open work. task_id is the id the task had, kept so a restored task gets it back.
+    The archive is only read by the archive view, never by the home page, calendar feeds or reminders.
+    """
+    task_id = models.BigIntegerField("Task id", unique=True)
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="archived_tasks")
+    title = models.CharField("Task name", max_length=200)
+    description = models.TextField("Mission statement", blank=True)
+    priority = PriorityField("Priority", choices=Task.PRIORITY_CHOICES, default='medium')
+    created_at = models.DateTimeField("Creation time")
+    start_date = models.DateTimeField("Start date", null=True, blank=True)
+    due_date = models.DateTimeField("Deadline")
+    reminder_offset = models.DurationField("Reminder offset", default=DEFAULT_REMINDER_OFFSET)
+    recurrence = models.CharField("Repeats", max_length=10, choices=Task.RECURRENCE_CHOICES, blank=True, default='')
+    recurrence_interval = models.PositiveSmallIntegerField("Repeat every", default=1)
+    recurrence_until = models.DateTimeField("Repeat until", null=True, blank=True)
+    # The task's last modification, normally when it was completed
+    completed_at = models.DateTimeField("Completed")
+    archived_at = models.DateTimeField("Archived", auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            # The archive view lists a user's archive newest deadline first
+            models.Index(fields=['user', '-due_date'], name='archive_user_due_idx'),
+        ]
+
+    def __str__(self):
+        return self.title
+
+
+class Notification(models.Model):
+    """
+    Notification Model: one email or text message waiting in the outbox, or already handled by the delivery worker
+    (see notifications.py). Reminders are written here instead of being sent while the scheduler waits, and a message
+    that fails is retried with backoff until it is sent or, after too many attempts, dead-lettered.
+    """
+    CHANNEL_CHOICES = (
+        ('email', 'Email'),
+        ('sms', 'Text message'),
+    )
+    STATUS_CHOICES = (
+        ('pending', 'Pending'),
+        ('sent', 'Sent'),
+        ('merged', 'Sent in a digest'),
+        ('dead', 'Failed'),
+    )
+
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="notifications")
+    # The task reminded of, if it still exists
+    task = models.ForeignKey(Task, on_delete=models.SET_NULL, null=True, blank=True, related_name="notifications")
+    channel = models.CharField("Channel", max_length=5, choices=CHANNEL_CHOICES)
+    # Email address or phone number, as it was when the notification was queued
+    recipient = models.CharField("Recipient", max_length=254)
+    subject = models.CharField("Subject", max_length=200, blank=True)
+    body = models.TextField("Message")
+    status = models.CharField("Status", max_length=7, choices=STATUS_CHOICES, default='pending')
+    attempts = models.PositiveSmallIntegerField("Failed attempts", default=0)
+    # When the worker should next try to send it; moved on by backoff and rate limiting
+    next_attempt_at = models.DateTimeField("Next attempt", default=timezone.now)
+    # Set while a worker holds the notification, so two workers never send it twice
+    claimed_by = models.CharField("Worker", max_length=32, blank=True)
+    last_error = models.TextField("Last error", blank=True)
+    created_at = models.DateTimeField("Creation time", auto_now_add=True)
+    sent_at = models.DateTimeField("Sent", null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            # The worker takes the due pending notifications; sent ones are not indexed
+            models.Index(fields=['next_attempt_at'], name='notification_pending_idx', condition=models.Q(status='pending')),
+            # Rate limiting counts what each recipient was sent recently
+            models.Index(fields=['recipient', 'sent_at'], name='notification_recipient_idx', condition=models.Q(status='sent')),
+            models.Index(fields=['claimed_by'], name='notification_claim_idx', condition=~models.Q(claimed_by='')),
+        ]
+
+    def __str__(self):
+        return f'{self.channel} to {self.recipient}: {self.subject or self.body[:40]}'
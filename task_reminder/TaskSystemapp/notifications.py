@@ -0,0 +1,237 @@
+"""
+Notification outbox and delivery worker.
+
+Reminders are not sent by the reminder scheduler itself: queue_reminders, its handler, writes one Notification row per
+message in the same transaction that marks the reminders as fired, and the delivery worker (deliver_notifications)
+sends them. The worker claims a batch of due notifications at a time and sends it over one email connection and one
+SMS connection, kept open across batches. Notifications for the same recipient in a batch are merged into one digest,
+recipients over NOTIFICATION_RATE_LIMIT wait (and are merged with whatever arrives meanwhile), and failures are retried
+with exponential backoff until NOTIFICATION_MAX_ATTEMPTS, after which the notification is dead-lettered.
+"""
+import logging
+import random
+import threading
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.core import mail
+from django.db.models import Count, Min
+from django.utils import timezone
+
+from . import sms
+from .locales import user_timezone
+from .models import Notification
+
+logger = logging.getLogger(__name__)
+
+# Reminders listed in a text message digest; the rest are only counted
+SMS_DIGEST_LINES = 5
+
+
+def queue_reminders(tasks):
+    """
+    Reminder handler: queues an email and, when the user has a phone number, a text message for each task.
+    """
+    channels = getattr(settings, 'NOTIFICATION_CHANNELS', ['email', 'sms'])
+    now = timezone.now()
+    notifications = []
+    for task in tasks:
+        due = timezone.localtime(task.due_date, user_timezone(task.user)).strftime('%Y-%m-%d %H:%M')
+        for channel, recipient in (('email', task.user.email), ('sms', task.user.phone)):
+            if channel in channels and recipient:
+                notifications.append(Notification(
+                    user=task.user,
+                    task_id=task.pk,
+                    channel=channel,
+                    recipient=recipient,
+                    subject=f'Reminder: {task.title}'[:200],
+                    body=f'"{task.title}" is due {due}.',
+                    next_attempt_at=now,
+                ))
+    Notification.objects.bulk_create(notifications, batch_size=500)
+
+
+def digest(notifications, channel):
+    """
+    Subject and body of the one message sent for notifications to the same recipient.
+    """
+    if len(notifications) == 1:
+        return notifications[0].subject, notifications[0].body
+    subject = f'{len(notifications)} task reminders'
+    lines = [notification.body for notification in notifications]
+    if channel == 'sms' and len(lines) > SMS_DIGEST_LINES:
+        lines = lines[:SMS_DIGEST_LINES] + [f'and {len(lines) - SMS_DIGEST_LINES} more.']
+    return subject, '\n'.join(lines)
+
+
+def backoff(attempts):
+    """
+    Delay before retrying a notification that has failed attempts times: NOTIFICATION_RETRY_DELAY doubled after each
+    failure, up to NOTIFICATION_RETRY_MAX_DELAY. Half of it is random, so a failed batch does not retry in lockstep.
+    """
+    delay = min(
+        getattr(settings, 'NOTIFICATION_RETRY_DELAY', 30) * 2 ** (attempts - 1),
+        getattr(settings, 'NOTIFICATION_RETRY_MAX_DELAY', 3600),
+    )
+    return timedelta(seconds=delay / 2 + random.uniform(0, delay / 2))
+
+
+class DeliveryWorker:
+    """
+    Sends the notification outbox, driven by the deliver_notifications management command.
+    Several workers may run at once: each claims its batches, and a batch left by a worker that died is claimed
+    again when its lease runs out.
+    """
+
+    def __init__(self, batch_size=None, email_backend=None, sms_backend=None, rate_limit=None, max_attempts=None,
+                 lease=None, poll_interval=None, clock=timezone.now):
+        self.batch_size = batch_size or getattr(settings, 'NOTIFICATION_BATCH_SIZE', 200)
+        # (messages, seconds): at most that many messages per recipient in any such period; False for no limit
+        if rate_limit is None:
+            rate_limit = getattr(settings, 'NOTIFICATION_RATE_LIMIT', (5, 3600))
+        self.rate_limit = rate_limit and (rate_limit[0], timedelta(seconds=rate_limit[1]))
+        self.max_attempts = max_attempts or getattr(settings, 'NOTIFICATION_MAX_ATTEMPTS', 6)
+        self.lease = lease or timedelta(seconds=getattr(settings, 'NOTIFICATION_LEASE', 300))
+        self.poll_interval = poll_interval or timedelta(seconds=getattr(settings, 'NOTIFICATION_POLL_INTERVAL', 10))
+        self.clock = clock
+        self.worker_id = uuid.uuid4().hex
+        self.connections = {
+            'email': mail.get_connection(email_backend),
+            'sms': sms.get_connection(sms_backend),
+        }
+        self._wakeup = threading.Event()
+        self._stopped = False
+
+    def close(self):
+        for connection in self.connections.values():
+            connection.close()
+
+    def claim(self, now):
+        """
+        Takes up to batch_size due notifications, oldest first, by moving them out of reach of other workers for
+        the lease, and returns them.
+        """
+        due = Notification.objects.filter(status='pending', next_attempt_at__lte=now)
+        Notification.objects.filter(
+            pk__in=due.order_by('next_attempt_at').values('pk')[:self.batch_size]
+        ).filter(status='pending', next_attempt_at__lte=now).update(claimed_by=self.worker_id, next_attempt_at=now + self.lease)
+        return list(Notification.objects.filter(claimed_by=self.worker_id, status='pending').order_by('pk'))
+
+    def rate_limited(self, notifications, now):
+        """
+        {(channel, recipient): when the next message may be sent} for the recipients that have reached the rate limit.
+        """
+        if not self.rate_limit:
+            return {}
+        limit, period = self.rate_limit
+        rows = (
+            Notification.objects.filter(
+                status='sent', recipient__in={notification.recipient for notification in notifications}, sent_at__gt=now - period
+            )
+            .values('channel', 'recipient')
+            .annotate(sent=Count('id'), first=Min('sent_at'))
+            .order_by()
+        )
+        return {(row['channel'], row['recipient']): row['first'] + period for row in rows if row['sent'] >= limit}
+
+    def send(self, channel, recipient, subject, body):
+        """
+        Sends one message over the channel's open connection, reopening it if an earlier failure closed it.
+        """
+        connection = self.connections[channel]
+        connection.open()
+        try:
+            if channel == 'email':
+                sent = connection.send_messages([mail.EmailMessage(subject, body, to=[recipient], connection=connection)])
+            else:
+                sent = connection.send_messages([sms.TextMessage(recipient, body)])
+        except Exception:
+            # The connection may be left broken; the next message opens a new one
+            connection.close()
+            raise
+        if not sent:
+            raise RuntimeError('The message was not accepted')
+
+    def failed(self, notifications, error, now):
+        for notification in notifications:
+            notification.attempts += 1
+            notification.last_error = f'{type(error).__name__}: {error}'[:1000]
+            if notification.attempts >= self.max_attempts:
+                notification.status = 'dead'
+                logger.warning("Giving up on notification %s to %s: %s", notification.pk, notification.recipient, error)
+            else:
+                notification.next_attempt_at = now + backoff(notification.attempts)
+
+    def deliver(self, now=None):
+        """
+        Sends one batch of due notifications and returns how many were taken from the outbox.
+        Each recipient is sent at most one message per batch: a digest when it has several notifications.
+        """
+        now = now or self.clock()
+        claimed = self.claim(now)
+        if not claimed:
+            return 0
+        limited = self.rate_limited(claimed, now)
+        recipients = {}
+        for notification in claimed:
+            recipients.setdefault((notification.channel, notification.recipient), []).append(notification)
+        for (channel, recipient), notifications in recipients.items():
+            if (channel, recipient) in limited:
+                for notification in notifications:
+                    notification.next_attempt_at = limited[channel, recipient]
+                continue
+            try:
+                self.send(channel, recipient, *digest(notifications, channel))
+            except Exception as error:
+                logger.info("Sending %s to %s failed: %s", channel, recipient, error)
+                self.failed(notifications, error, now)
+                continue
+            for notification in notifications:
+                notification.status = 'merged'
+                notification.sent_at = now
+            # The first one stands for the message, so the rate limit counts a digest once
+            notifications[0].status = 'sent'
+        for notification in claimed:
+            notification.claimed_by = ''
+        Notification.objects.bulk_update(
+            claimed, ['status', 'attempts', 'next_attempt_at', 'claimed_by', 'last_error', 'sent_at'], batch_size=500
+        )
+        return len(claimed)
+
+    def run_once(self, now=None):
+        """
+        Sends batches until the due notifications are used up.
+        Returns the number of seconds until the next notification is due, at most the poll interval.
+        """
+        now = now or self.clock()
+        while self.deliver(now) == self.batch_size:
+            pass
+        next_time = Notification.objects.filter(status='pending').aggregate(next_time=Min('next_attempt_at'))['next_time']
+        wait = self.poll_interval.total_seconds()
+        if next_time is not None:
+            wait = min(wait, (next_time - now).total_seconds())
+        return max(wait, 0)
+
+    def wake(self):
+        """
+        Interrupt the current sleep, e.g. after notifications were queued in the same process.
+        """
+        self._wakeup.set()
+
+    def stop(self):
+        self._stopped = True
+        self._wakeup.set()
+
+    def run(self):
+        """
+        Deliver notifications as they become due, until stop() is called.
+        """
+        self._stopped = False
+        try:
+            while not self._stopped:
+                timeout = self.run_once()
+                self._wakeup.wait(timeout)
+                self._wakeup.clear()
+        finally:
+            self.close()
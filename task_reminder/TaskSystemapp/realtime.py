@@ -0,0 +1,50 @@
+"""
+Live task updates: the task write paths publish compact diffs to the owner's channel group,
+and TaskConsumer (task_reminder/consumers.py) pushes them to that user's open pages.
+"""
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.db import transaction
+
+
+def user_group(user_id):
+    """
+    Channel group holding every socket of one user.
+    """
+    return f'tasks.user.{user_id}'
+
+
+def task_diff(op, task):
+    """
+    Compact description of a change: op is 'create', 'update', 'complete' or 'delete'.
+    A change to one occurrence of a recurring task also carries the occurrence's date by the rule.
+    """
+    if op == 'delete':
+        diff = {'op': op, 'id': task.pk}
+        if getattr(task, 'occurrence', None):
+            # A skipped occurrence
+            diff['occurrence'] = task.occurrence.isoformat()
+        return diff
+    diff = {
+        'op': op,
+        'id': task.pk,
+        'title': task.title,
+        'priority': task.priority,
+        'due_date': task.due_date.isoformat(),
+        'is_completed': task.is_completed,
+    }
+    if getattr(task, 'occurrence', None):
+        diff['occurrence'] = task.occurrence.isoformat()
+    return diff
+
+
+def publish_task_changes(user_id, changes):
+    """
+    Sends the diffs to the user's sockets once the current transaction commits.
+    Does nothing when no channel layer is configured.
+    """
+    channel_layer = get_channel_layer()
+    if channel_layer is None or not changes:
+        return
+    message = {'type': 'task.update', 'changes': list(changes)}
+    transaction.on_commit(lambda: async_to_sync(channel_layer.group_send)(user_group(user_id), message))
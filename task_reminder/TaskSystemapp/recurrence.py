@@ -0,0 +1,157 @@
+"""
+Recurring tasks.
+
+A recurring task is one Task row holding the rule: its due_date is the first occurrence, repeated every
+recurrence_interval days, weeks or months until recurrence_until. Occurrences are never stored up front; they are
+expanded from the rule only inside the date window being shown, in the owner's time zone so a daily 09:00 task stays
+at 09:00 across daylight saving changes. Only occurrences that differ from the rule (completed, skipped or moved) are
+stored, as TaskOccurrence rows, so a daily task over five years is one row plus the days that were actually done.
+"""
+import copy
+import heapq
+from calendar import monthrange
+from datetime import timedelta
+
+from django.db.models import Q
+from django.utils import timezone
+
+# Shortest step of each frequency, used to jump close to the start of a window without expanding every occurrence
+FREQUENCY_DAYS = {'daily': 1, 'weekly': 7, 'monthly': 31}
+
+
+def shift(wall, frequency, steps, day):
+    """
+    The naive local time wall moved by steps days, weeks or months. Months keep day, or the month's last day.
+    """
+    if frequency == 'daily':
+        return wall + timedelta(days=steps)
+    if frequency == 'weekly':
+        return wall + timedelta(weeks=steps)
+    month = wall.month - 1 + steps
+    year = wall.year + month // 12
+    month = month % 12 + 1
+    return wall.replace(year=year, month=month, day=min(day, monthrange(year, month)[1]))
+
+
+def occurrences(task, start, end, tz):
+    """
+    Yields the due dates the rule gives the task in [start, end), in order; end may be None for no end.
+    Every occurrence is computed from the first one, so month-end clamping never drifts.
+    """
+    anchor = timezone.localtime(task.due_date, tz).replace(tzinfo=None)
+    interval = task.recurrence_interval or 1
+    period = timedelta(days=FREQUENCY_DAYS[task.recurrence] * interval)
+    # Start one step early: the estimate ignores daylight saving and month lengths
+    n = max(0, (start - task.due_date) // period - 1)
+    while True:
+        when = timezone.make_aware(shift(anchor, task.recurrence, n * interval, anchor.day), tz)
+        if task.recurrence_until and when > task.recurrence_until:
+            return
+        if end is not None and when >= end:
+            return
+        if when >= start:
+            yield when
+        n += 1
+
+
+def is_occurrence(task, when, tz):
+    return next(occurrences(task, when, when + timedelta(microseconds=1), tz), None) == when
+
+
+def next_reminder(task, after, tz):
+    """
+    The first reminder time of the task's occurrences at or after after, or None when the rule has ended.
+    """
+    when = next(occurrences(task, max(after + task.reminder_offset, task.due_date), None, tz), None)
+    return when - task.reminder_offset if when else None
+
+
+def load_overrides(tasks, start, end):
+    """
+    {(task id, original date): TaskOccurrence} for the tasks' occurrences that fall in [start, end) by rule or after a move.
+    """
+    from .models import TaskOccurrence  # models imports this module
+    rows = TaskOccurrence.objects.filter(task__in=[task.pk for task in tasks]).filter(
+        Q(original_date__gte=start, original_date__lt=end) | Q(due_date__gte=start, due_date__lt=end)
+    )
+    return {(row.task_id, row.original_date): row for row in rows}
+
+
+def occurrence_of(task, original, override):
+    """
+    An unsaved copy of the recurring task standing for its occurrence at original, with any override applied.
+    """
+    occurrence = copy.copy(task)
+    occurrence.occurrence = original
+    occurrence.due_date = override.due_date if override and override.due_date else original
+    occurrence.is_completed = task.is_completed or bool(override and override.is_completed)
+    return occurrence
+
+
+def expand(tasks, start, end, tz, limit=None, after=None):
+    """
+    The occurrences of recurring tasks due in [start, end), as unsaved copies of their task with due_date,
+    is_completed and occurrence (the date the rule gives it) set. Skipped occurrences are left out.
+    With limit, each task stops after its first limit occurrences, e.g. to fill one page of a list; with after,
+    a (due_date, id) keyset cursor, only the occurrences that come after it are kept and counted.
+    """
+    tasks = [task for task in tasks if task.recurrence]
+    if not tasks:
+        return []
+    overrides = load_overrides(tasks, start, end)
+    by_id = {task.pk: task for task in tasks}
+    expanded = []
+
+    def instance(task, original, override):
+        due_date = override.due_date if override and override.due_date else original
+        if (override and override.is_skipped) or not start <= due_date < end:
+            return False
+        if after and (due_date, task.pk) <= after:
+            return False
+        expanded.append(occurrence_of(task, original, override))
+        return True
+
+    for task in tasks:
+        count = 0
+        for original in occurrences(task, start, end, tz):
+            count += instance(task, original, overrides.pop((task.pk, original), None))
+            if count == limit:
+                break
+    # Occurrences moved into the window from outside it
+    for (task_id, original), override in overrides.items():
+        if not start <= original < end:
+            instance(by_id[task_id], original, override)
+    return expanded
+
+
+def iter_expand(tasks, start, end, tz):
+    """
+    The occurrences expand would return, as an iterator in (due_date, id) order that computes them as it goes,
+    so a long window is never held in memory. The stored overrides are read straight away, so the iterator
+    itself does not touch the database.
+    """
+    tasks = [task for task in tasks if task.recurrence]
+    if not tasks:
+        return iter(())
+    overrides = load_overrides(tasks, start, end)
+    by_id = {task.pk: task for task in tasks}
+    # Moved occurrences leave the rule's order, so they are merged in from their own sorted list
+    moved = sorted(
+        (
+            occurrence_of(by_id[task_id], original, override) for (task_id, original), override in overrides.items()
+            if override.due_date and not override.is_skipped and start <= override.due_date < end
+        ),
+        key=occurrence_key,
+    )
+
+    def by_rule(task):
+        for original in occurrences(task, start, end, tz):
+            override = overrides.get((task.pk, original))
+            if not (override and (override.is_skipped or override.due_date)):
+                yield occurrence_of(task, original, override)
+
+    return heapq.merge(*(by_rule(task) for task in tasks), moved, key=occurrence_key)
+
+
+def occurrence_key(occurrence):
+    return occurrence.due_date, occurrence.pk
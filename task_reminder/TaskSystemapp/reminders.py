@@ -0,0 +1,244 @@
+"""
+Reminder scheduler: keeps the upcoming reminders in a min-heap and fires them when they are due.
+
+Only reminders inside a sliding window (now - REMINDER_GRACE, now + REMINDER_HORIZON) are held in memory.
+The window is loaded with a range query on the partial remind_at index, and task changes are picked up
+incrementally through the indexed updated_at column, so the Task table is never rescanned.
+A recurring task's remind_at is its next occurrence's reminder, moved on to the following one each time it fires.
+"""
+import copy
+import heapq
+import logging
+import threading
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .models import Task, TaskOccurrence
+
+logger = logging.getLogger(__name__)
+
+
+def log_reminders(tasks):
+    """
+    Default reminder handler: write one log line per task.
+    """
+    for task in tasks:
+        logger.info("Reminder for task %s (%s) of user %s, due %s", task.pk, task.title, task.user_id, task.due_date)
+
+
+class ReminderQueue:
+    """
+    Min-heap of (remind_at, task_id).
+    Rescheduling or cancelling a task does not search the heap: the current reminder time of every task is kept
+    in a dict, and heap entries that no longer match it are dropped when they reach the top.
+    """
+
+    def __init__(self):
+        self._heap = []
+        self._entries = {}
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, task_id):
+        return task_id in self._entries
+
+    def schedule(self, task_id, remind_at):
+        if self._entries.get(task_id) == remind_at:
+            return
+        self._entries[task_id] = remind_at
+        heapq.heappush(self._heap, (remind_at, task_id))
+        # Rebuild once stale entries dominate, so frequent rescheduling cannot grow the heap without bound
+        if len(self._heap) > 2 * len(self._entries) + 1024:
+            self._heap = [(when, pk) for pk, when in self._entries.items()]
+            heapq.heapify(self._heap)
+
+    def cancel(self, task_id):
+        self._entries.pop(task_id, None)
+
+    def _drop_stale(self):
+        heap = self._heap
+        while heap and self._entries.get(heap[0][1]) != heap[0][0]:
+            heapq.heappop(heap)
+
+    def next_time(self):
+        """
+        Time of the earliest scheduled reminder, or None when the queue is empty.
+        """
+        self._drop_stale()
+        return self._heap[0][0] if self._heap else None
+
+    def pop_due(self, now):
+        """
+        Remove and return [(task_id, remind_at), ...] for every reminder due at or before now.
+        """
+        due = []
+        heap = self._heap
+        while True:
+            self._drop_stale()
+            if not heap or heap[0][0] > now:
+                return due
+            remind_at, task_id = heapq.heappop(heap)
+            del self._entries[task_id]
+            due.append((task_id, remind_at))
+
+
+class ReminderScheduler:
+    """
+    Long-running reminder scheduler, driven by the run_reminders management command.
+    The handler receives a list of tasks (with user loaded) whose reminders have just fired.
+    """
+
+    def __init__(self, handler=None, horizon=None, grace=None, poll_interval=None, batch_size=500, clock=timezone.now):
+        if handler is None:
+            handler = getattr(settings, 'REMINDER_HANDLER', 'TaskSystemapp.reminders.log_reminders')
+        if isinstance(handler, str):
+            handler = import_string(handler)
+        self.handler = handler
+        self.horizon = horizon or timedelta(seconds=getattr(settings, 'REMINDER_HORIZON', 3600))
+        self.grace = grace or timedelta(seconds=getattr(settings, 'REMINDER_GRACE', 86400))
+        self.poll_interval = poll_interval or timedelta(seconds=getattr(settings, 'REMINDER_POLL_INTERVAL', 30))
+        self.batch_size = batch_size
+        self.clock = clock
+        self.queue = ReminderQueue()
+        self.window_end = None
+        self.changes_since = None
+        self.next_poll = None
+        self._wakeup = threading.Event()
+        self._stopped = False
+
+    def _pending(self):
+        return Task.objects.filter(is_completed=False, reminded_at__isnull=True)
+
+    def load_window(self, now):
+        """
+        Load the reminders between the end of the current window (or now - grace on start) and now + horizon.
+        """
+        start = self.window_end or now - self.grace
+        end = now + self.horizon
+        rows = self._pending().filter(remind_at__gte=start, remind_at__lt=end).values_list('id', 'remind_at')
+        for task_id, remind_at in rows.iterator(chunk_size=self.batch_size):
+            self.queue.schedule(task_id, remind_at)
+        self.window_end = end
+        if self.changes_since is None:
+            self.changes_since = now
+
+    def poll_changes(self, now):
+        """
+        Apply tasks created or modified since the last poll. Deleted tasks are dropped when their reminder fires.
+        """
+        # Overlap the previous poll slightly so rows committed with an older updated_at are not missed
+        since = self.changes_since - timedelta(seconds=2)
+        rows = Task.objects.filter(updated_at__gte=since).values_list('id', 'remind_at', 'is_completed', 'reminded_at')
+        for task_id, remind_at, is_completed, reminded_at in rows.iterator(chunk_size=self.batch_size):
+            if is_completed or reminded_at is not None or remind_at is None:
+                self.queue.cancel(task_id)
+            elif now - self.grace <= remind_at < self.window_end:
+                self.queue.schedule(task_id, remind_at)
+            else:
+                # Outside the window: the next window load picks it up if it is still pending
+                self.queue.cancel(task_id)
+        self.changes_since = now
+        self.next_poll = now + self.poll_interval
+
+    def fire_due(self, now):
+        """
+        Fire every reminder due at or before now and return how many were sent.
+        Each batch is re-checked against the database, so completed or deleted tasks are skipped.
+        """
+        due = self.queue.pop_due(now)
+        fired = 0
+        for i in range(0, len(due), self.batch_size):
+            batch = due[i:i + self.batch_size]
+            try:
+                with transaction.atomic():
+                    tasks = [
+                        task for task in self._pending().filter(pk__in=[task_id for task_id, _ in batch]).select_related('user')
+                        if task.remind_at is not None and task.remind_at <= now
+                    ]
+                    single = [task for task in tasks if not task.recurrence]
+                    Task.objects.filter(pk__in=[task.pk for task in single]).update(reminded_at=now)
+                    tasks = single + self.advance_recurring([task for task in tasks if task.recurrence], now)
+                    if tasks:
+                        self.handler(tasks)
+            except Exception:
+                logger.exception("Reminder batch failed, retrying at the next poll")
+                for task_id, _ in batch:
+                    self.queue.schedule(task_id, now + self.poll_interval)
+                continue
+            fired += len(tasks)
+        return fired
+
+    def advance_recurring(self, tasks, now):
+        """
+        Moves each recurring task's remind_at on to its next occurrence, and returns copies of the tasks due at the
+        occurrences just reminded of, leaving out occurrences that were completed or skipped.
+        """
+        if not tasks:
+            return []
+        occurrences = {task.pk: task.remind_at + task.reminder_offset for task in tasks}
+        done = set()
+        moved = {}
+        rows = TaskOccurrence.objects.filter(task__in=tasks, original_date__in=set(occurrences.values())).values_list(
+            'task_id', 'original_date', 'due_date', 'is_completed', 'is_skipped'
+        )
+        for task_id, original_date, due_date, is_completed, is_skipped in rows:
+            if is_completed or is_skipped:
+                done.add((task_id, original_date))
+            elif due_date:
+                moved[task_id, original_date] = due_date
+        fired = []
+        for task in tasks:
+            occurrence = occurrences[task.pk]
+            if (task.pk, occurrence) not in done:
+                reminded = copy.copy(task)
+                reminded.occurrence = occurrence
+                # A rescheduled occurrence is still reminded of by the rule, with its new deadline
+                reminded.due_date = moved.get((task.pk, occurrence), occurrence)
+                fired.append(reminded)
+            task.set_remind_at(after=task.remind_at + timedelta(microseconds=1))
+            Task.objects.filter(pk=task.pk).update(remind_at=task.remind_at)
+            if task.remind_at is not None and task.remind_at < self.window_end:
+                self.queue.schedule(task.pk, task.remind_at)
+        return fired
+
+    def run_once(self, now=None):
+        """
+        One scheduler step: refresh the window and changes when they are due, then fire due reminders.
+        Returns the number of seconds until the next step is needed.
+        """
+        now = now or self.clock()
+        if self.window_end is None or now >= self.window_end - self.poll_interval:
+            self.load_window(now)
+        if self.next_poll is None or now >= self.next_poll:
+            self.poll_changes(now)
+        self.fire_due(now)
+        wake_at = min(self.next_poll, self.window_end - self.poll_interval)
+        next_time = self.queue.next_time()
+        if next_time is not None:
+            wake_at = min(wake_at, next_time)
+        return max((wake_at - now).total_seconds(), 0)
+
+    def wake(self):
+        """
+        Interrupt the current sleep, e.g. after a change made in the same process.
+        """
+        self._wakeup.set()
+
+    def stop(self):
+        self._stopped = True
+        self._wakeup.set()
+
+    def run(self):
+        """
+        Sleep until the next reminder, poll or window refresh is due, until stop() is called.
+        """
+        self._stopped = False
+        while not self._stopped:
+            timeout = self.run_once()
+            self._wakeup.wait(timeout)
+            self._wakeup.clear()
@@ -0,0 +1,90 @@
+"""
+Primary/replica database routing.
+
+Writes always go to the primary ("default"). Reads go to the "replica" database, when one is configured, only inside
+views decorated with read_from_replica, and only while the session has not written recently: after a write,
+RequestRoutingMiddleware pins the session to the primary for REPLICA_PIN_SECONDS so it reads its own writes.
+"""
+from contextvars import ContextVar
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction
+from django.db import connections
+
+REPLICA = 'replica'
+
+_routing = ContextVar('database_routing', default=None)
+
+
+class RoutingState:
+    """
+    Routing of the current request. Mutable, so changes made in sync_to_async threads are seen by the request.
+    """
+
+    def __init__(self, pinned=False):
+        self.pinned = pinned
+        self.use_replica = False
+        self.wrote = False
+
+
+def current_routing():
+    return _routing.get()
+
+
+def start_routing(pinned=False):
+    """
+    Starts routing a request; returns the state and a token for end_routing.
+    """
+    state = RoutingState(pinned)
+    return state, _routing.set(state)
+
+
+def end_routing(token):
+    _routing.reset(token)
+
+
+def read_from_replica(view):
+    """
+    Lets the view's reads go to the replica. The view must not write, or the rest of the request reads the primary.
+    """
+    if iscoroutinefunction(view):
+        @wraps(view)
+        async def wrapper(request, *args, **kwargs):
+            state = _routing.get()
+            if state is not None:
+                state.use_replica = True
+            return await view(request, *args, **kwargs)
+    else:
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            state = _routing.get()
+            if state is not None:
+                state.use_replica = True
+            return view(request, *args, **kwargs)
+    return wrapper
+
+
+class PrimaryReplicaRouter:
+    def db_for_read(self, model, **hints):
+        state = _routing.get()
+        if (
+            state is not None and state.use_replica and not state.pinned and not state.wrote
+            # Sessions are written on every login and must never be stale
+            and model._meta.app_label != 'sessions'
+            and REPLICA in connections
+        ):
+            return REPLICA
+        return 'default'
+
+    def db_for_write(self, model, **hints):
+        state = _routing.get()
+        if state is not None:
+            state.wrote = True
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # The replica is a copy of the primary, so objects from either can be related
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == 'default'
@@ -0,0 +1,147 @@
+"""
+Full-text task search.
+
+On SQLite the title and description of every task are indexed in an external-content FTS5 table,
+kept in sync with TaskSystemapp_task by triggers, so saves, deletes and bulk updates are all covered.
+Matching, ranking, the per-user filter and pagination all happen inside the database.
+"""
+import re
+
+from django.db import connection, connections, router
+from django.db.models import Q
+
+from .models import Task
+
+TASK_TABLE = 'TaskSystemapp_task'
+FTS_TABLE = 'TaskSystemapp_task_fts'
+
+# Title matches weigh more than description matches in the bm25 ranking
+TITLE_WEIGHT = 10.0
+DESCRIPTION_WEIGHT = 1.0
+
+SEARCH_INDEX_TRIGGERS = {
+    'task_fts_insert': f'''
+        CREATE TRIGGER IF NOT EXISTS task_fts_insert AFTER INSERT ON "{TASK_TABLE}" BEGIN
+            INSERT INTO "{FTS_TABLE}" (rowid, title, description) VALUES (new.id, new.title, new.description);
+        END''',
+    'task_fts_delete': f'''
+        CREATE TRIGGER IF NOT EXISTS task_fts_delete AFTER DELETE ON "{TASK_TABLE}" BEGIN
+            INSERT INTO "{FTS_TABLE}" ("{FTS_TABLE}", rowid, title, description)
+            VALUES ('delete', old.id, old.title, old.description);
+        END''',
+    'task_fts_update': f'''
+        CREATE TRIGGER IF NOT EXISTS task_fts_update AFTER UPDATE OF title, description ON "{TASK_TABLE}" BEGIN
+            INSERT INTO "{FTS_TABLE}" ("{FTS_TABLE}", rowid, title, description)
+            VALUES ('delete', old.id, old.title, old.description);
+            INSERT INTO "{FTS_TABLE}" (rowid, title, description) VALUES (new.id, new.title, new.description);
+        END''',
+}
+
+
+def create_search_index(conn=connection):
+    """
+    Creates the FTS table and its triggers if they are missing, rebuilding the index when anything had to be created.
+    Safe to call repeatedly: it also repairs the triggers after SQLite migrations that rebuild the task table.
+    """
+    if conn.vendor != 'sqlite':
+        return
+    with conn.cursor() as cursor:
+        cursor.execute(
+            "SELECT name FROM sqlite_master WHERE name = %s OR (type = 'trigger' AND tbl_name = %s)",
+            [FTS_TABLE, TASK_TABLE]
+        )
+        existing = {row[0] for row in cursor.fetchall()}
+        missing = ({FTS_TABLE} | set(SEARCH_INDEX_TRIGGERS)) - existing
+        if not missing:
+            return
+        cursor.execute(
+            f'''CREATE VIRTUAL TABLE IF NOT EXISTS "{FTS_TABLE}" USING fts5(
+                title, description,
+                content='{TASK_TABLE}', content_rowid='id',
+                tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+            )'''
+        )
+        for sql in SEARCH_INDEX_TRIGGERS.values():
+            cursor.execute(sql)
+        cursor.execute(f'''INSERT INTO "{FTS_TABLE}" ("{FTS_TABLE}") VALUES ('rebuild')''')
+
+
+def drop_search_index(conn=connection):
+    if conn.vendor != 'sqlite':
+        return
+    with conn.cursor() as cursor:
+        for name in SEARCH_INDEX_TRIGGERS:
+            cursor.execute(f'DROP TRIGGER IF EXISTS {name}')
+        cursor.execute(f'DROP TABLE IF EXISTS "{FTS_TABLE}"')
+
+
+def build_match_query(text):
+    """
+    Turns free text into an FTS5 query: every word must match, as a prefix, in the title or description.
+    Words are quoted, so FTS5 operators typed by the user are treated as plain text.
+    """
+    words = re.findall(r'\w+', text.lower())
+    return ' '.join(f'"{word}"*' for word in words)
+
+
+def search_tasks(user, text, start=None, end=None, limit=20, offset=0):
+    """
+    Returns up to limit of the user's tasks matching text, most relevant first, then by priority and deadline.
+    start/end optionally restrict the deadline to the half-open range [start, end).
+    The database is the one the router reads tasks from, so the replica's engine decides between FTS5 and LIKE.
+    """
+    alias = router.db_for_read(Task)
+    conn = connections[alias]
+    if conn.vendor != 'sqlite':
+        return list(like_matches(alias, user, text, start, end).order_by('priority', 'due_date')[offset:offset + limit])
+
+    match = build_match_query(text)
+    if not match:
+        return []
+    where, params = fts_conditions(conn, user, match, start, end)
+    sql = f'''
+        SELECT t.* FROM "{FTS_TABLE}"
+        JOIN "{TASK_TABLE}" t ON t.id = "{FTS_TABLE}".rowid
+        WHERE {where}
+        ORDER BY bm25("{FTS_TABLE}", {TITLE_WEIGHT}, {DESCRIPTION_WEIGHT}),
+                 t.priority,
+                 t.due_date
+        LIMIT %s OFFSET %s
+    '''
+    return list(Task.objects.db_manager(alias).raw(sql, params + [limit, offset]))
+
+
+def count_search_results(user, text, start=None, end=None):
+    """
+    The number of tasks search_tasks finds for the same arguments, without a limit.
+    """
+    alias = router.db_for_read(Task)
+    conn = connections[alias]
+    if conn.vendor != 'sqlite':
+        return like_matches(alias, user, text, start, end).count()
+
+    match = build_match_query(text)
+    if not match:
+        return 0
+    where, params = fts_conditions(conn, user, match, start, end)
+    with conn.cursor() as cursor:
+        cursor.execute(
+            f'SELECT COUNT(*) FROM "{FTS_TABLE}" JOIN "{TASK_TABLE}" t ON t.id = "{FTS_TABLE}".rowid WHERE {where}', params
+        )
+        return cursor.fetchone()[0]
+
+
+def like_matches(alias, user, text, start, end):
+    tasks = Task.objects.using(alias).filter(user=user).filter(Q(title__icontains=text) | Q(description__icontains=text))
+    if start and end:
+        tasks = tasks.filter(due_date__gte=start, due_date__lt=end)
+    return tasks
+
+
+def fts_conditions(conn, user, match, start, end):
+    where = [f'"{FTS_TABLE}" MATCH %s', 't.user_id = %s']
+    params = [match, user.pk]
+    if start and end:
+        where.append('t.due_date >= %s AND t.due_date < %s')
+        params += [conn.ops.adapt_datetimefield_value(start), conn.ops.adapt_datetimefield_value(end)]
+    return ' AND '.join(where), params
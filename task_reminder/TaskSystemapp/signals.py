@@ -0,0 +1,63 @@
+"""
+Task change tracking: every create, update or delete of a task, or of a stored occurrence of a recurring task,
+bumps its owner's tasks_version, which keys the cached task views (see cache.py).
+"""
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.db.models import F
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .models import CustomUser, Task, TaskOccurrence
+
+# User ids collected while inside batch_task_changes(), or None outside it
+_pending_bumps = ContextVar('pending_task_version_bumps', default=None)
+
+
+def bump_task_version(user_ids):
+    """
+    Marks the task lists of the given users as changed. Bulk paths that bypass model signals
+    (bulk_create, QuerySet.update) must call this themselves.
+    """
+    user_ids = set(user_ids)
+    if not user_ids:
+        return
+    pending = _pending_bumps.get()
+    if pending is not None:
+        pending.update(user_ids)
+        return
+    CustomUser.objects.filter(pk__in=user_ids).update(
+        tasks_version=F('tasks_version') + 1, tasks_changed_at=timezone.now()
+    )
+
+
+@contextmanager
+def batch_task_changes():
+    """
+    Collects the version bumps of every task change inside the block and applies them once at the end,
+    e.g. around a QuerySet.delete() that sends post_delete for each row.
+    """
+    if _pending_bumps.get() is not None:
+        yield
+        return
+    pending = set()
+    token = _pending_bumps.set(pending)
+    try:
+        yield
+    finally:
+        _pending_bumps.reset(token)
+    bump_task_version(pending)
+
+
+@receiver(post_save, sender=Task)
+@receiver(post_delete, sender=Task)
+def task_changed(sender, instance, **kwargs):
+    bump_task_version([instance.user_id])
+
+
+@receiver(post_save, sender=TaskOccurrence)
+@receiver(post_delete, sender=TaskOccurrence)
+def occurrence_changed(sender, instance, **kwargs):
+    bump_task_version([instance.task.user_id])
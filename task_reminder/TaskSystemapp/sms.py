@@ -0,0 +1,81 @@
+"""
+Text message backends, modelled on Django's email backends: SMS_BACKEND names the class, get_connection() builds one,
+and send_messages() sends a list of TextMessage over one open connection and returns how many were sent.
+
+A provider integration subclasses BaseSMSBackend, opening its HTTP session or socket in open() so the delivery worker
+reuses it for a whole batch. The console and locmem backends stand in for a provider in development and tests.
+"""
+import sys
+import threading
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+# Messages sent through the locmem backend, like django.core.mail.outbox
+outbox = []
+
+
+class TextMessage:
+    def __init__(self, to, body):
+        self.to = to
+        self.body = body
+
+
+class BaseSMSBackend:
+    def __init__(self, fail_silently=False, **kwargs):
+        self.fail_silently = fail_silently
+
+    def open(self):
+        """
+        Opens the connection to the provider; returns True if a new one was opened.
+        """
+        return False
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        try:
+            self.open()
+        except Exception:
+            self.close()
+            raise
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def send_messages(self, messages):
+        raise NotImplementedError('subclasses of BaseSMSBackend must override send_messages()')
+
+
+class ConsoleSMSBackend(BaseSMSBackend):
+    """
+    Writes each message to stdout.
+    """
+
+    def __init__(self, *args, stream=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.stream = stream or sys.stdout
+        self._lock = threading.RLock()
+
+    def send_messages(self, messages):
+        with self._lock:
+            for message in messages:
+                self.stream.write(f'SMS to {message.to}:\n{message.body}\n{"-" * 79}\n')
+            self.stream.flush()
+        return len(messages)
+
+
+class LocmemSMSBackend(BaseSMSBackend):
+    """
+    Keeps the messages in sms.outbox.
+    """
+
+    def send_messages(self, messages):
+        outbox.extend(messages)
+        return len(messages)
+
+
+def get_connection(backend=None, fail_silently=False, **kwargs):
+    return import_string(backend or getattr(settings, 'SMS_BACKEND', 'TaskSystemapp.sms.ConsoleSMSBackend'))(fail_silently=fail_silently, **kwargs)
@@ -1,7 +1,7 @@
 // Modify the FullCalendar initialisation configuration
 const calendar = new FullCalendar.Calendar(calendarEl, {
     events: function(fetchInfo, successCallback) {
-        fetch(`/api/tasks/?start=${fetchInfo.startStr}&end=${fetchInfo.endStr}`)
+        fetch(`/TaskSystemapp/events/?start=${encodeURIComponent(fetchInfo.startStr)}&end=${encodeURIComponent(fetchInfo.endStr)}`)
             .then(res => res.json())
             .then(successCallback);
     }
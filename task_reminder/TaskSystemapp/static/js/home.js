@@ -15,6 +15,11 @@ document.addEventListener("DOMContentLoaded", function() {
             .then(response => response.json())
             .then(data => {
                 if (data.success) {
+                    // With a live connection the new task arrives as a pushed update, no reload needed
+                    if (taskSocketIsOpen()) {
+                        closeAddModal('quickAddModal', form);
+                        return;
+                    }
                     // After successful addition, the page is refreshed by constructing a new URL parameter based on the deadline date returned.
                     const newDeadline = data.task_deadline;  
                     const deadlineDateStr = newDeadline.split(' ')[0];
@@ -50,6 +55,10 @@ document.addEventListener("DOMContentLoaded", function() {
             .then(response => response.json())
             .then(data => {
                 if (data.success) {
+                    if (taskSocketIsOpen()) {
+                        closeAddModal('detailedAddModal', form);
+                        return;
+                    }
                     const newDeadline = data.task_deadline;
                     const deadlineDateStr = newDeadline.split(' ')[0];
                     const now = new Date();
@@ -69,6 +78,9 @@ document.addEventListener("DOMContentLoaded", function() {
         });
     }
 
+    connectTaskSocket();
+    setupSidebarScroll();
+
     const calendarInput = document.getElementById("calendarTrigger");
     const params = new URLSearchParams(window.location.search);
     // If end_date is not specified in the URL, it is set to the current date + 7 days by default.
@@ -151,7 +163,7 @@ function clearSearch() {
 }
 
 // Deleting tasks (calling back-end views via AJAX)
-function deleteTask(deleteUrl) {
+function deleteTask(deleteUrl, taskId) {
     if (confirm('Sure you want to delete this task?')) {
         fetch(deleteUrl, {
             method: 'POST',
@@ -163,9 +175,8 @@ function deleteTask(deleteUrl) {
         .then(response => response.json())
         .then(data => {
             if (data.success) {
-                const url = new URL(window.location.href);
-                url.searchParams.delete('task_id');
-                window.location.href = url.pathname + "?" + url.searchParams.toString();
+                // Update the page in place instead of reloading it
+                applyTaskChange({op: 'delete', id: taskId});
             } else {
                 alert('Failed to delete task');
             }
@@ -177,6 +188,317 @@ function deleteTask(deleteUrl) {
     }
 }
 
+// Mark a task as completed (AJAX), updating the page in place
+function completeTask(completeUrl, taskId, occurrence) {
+    fetch(completeUrl, {
+        headers: { 'X-Requested-With': 'XMLHttpRequest' }
+    })
+    .then(response => response.json())
+    .then(data => {
+        if (data.success) {
+            markTaskCompleted(taskId, occurrence);
+        }
+    })
+    .catch(error => console.error('Complete task error:', error));
+    return false;
+}
+
+// Skip one occurrence of a recurring task (AJAX)
+function skipOccurrence(skipUrl, taskId, occurrence) {
+    postOccurrence(skipUrl, occurrence, {})
+    .then(data => {
+        if (data.success) {
+            applyTaskChange({op: 'delete', id: taskId, occurrence: occurrence});
+        }
+    })
+    .catch(error => console.error('Skip occurrence error:', error));
+}
+
+// Move one occurrence of a recurring task to the deadline in the input next to the button (AJAX)
+function rescheduleOccurrence(rescheduleUrl, occurrence, input) {
+    if (!input.value) {
+        return;
+    }
+    postOccurrence(rescheduleUrl, occurrence, {due_date: input.value})
+    .then(data => {
+        if (data.success) {
+            applyTaskChange({op: 'update', ...data.task});
+        } else {
+            alert('Failed to reschedule: ' + JSON.stringify(data.errors || data.error));
+        }
+    })
+    .catch(error => console.error('Reschedule occurrence error:', error));
+}
+
+function postOccurrence(url, occurrence, fields) {
+    const body = new URLSearchParams({occurrence: occurrence, ...fields});
+    return fetch(url, {
+        method: 'POST',
+        headers: {
+            'X-Requested-With': 'XMLHttpRequest',
+            'X-CSRFToken': getCookie('csrftoken')
+        },
+        body: body
+    }).then(response => response.json());
+}
+
+// ----- Live updates: the server pushes batches of task changes over a WebSocket -----
+let taskSocket = null;
+
+function connectTaskSocket() {
+    if (!document.getElementById('taskSidebarList')) {
+        return;
+    }
+    const scheme = window.location.protocol === 'https:' ? 'wss' : 'ws';
+    taskSocket = new WebSocket(`${scheme}://${window.location.host}/ws/tasks/`);
+    taskSocket.onmessage = function(e) {
+        const data = JSON.parse(e.data);
+        if (data.type === 'tasks.batch') {
+            data.changes.forEach(applyTaskChange);
+            refreshTaskCounts();
+        }
+    };
+    taskSocket.onclose = function() {
+        taskSocket = null;
+        setTimeout(connectTaskSocket, 5000);
+    };
+}
+
+// Header counts by status, reloaded after the tasks change
+function refreshTaskCounts() {
+    const counts = document.getElementById('taskCounts');
+    if (!counts) {
+        return;
+    }
+    fetch(counts.dataset.url, { headers: { 'X-Requested-With': 'XMLHttpRequest' } })
+    .then(response => response.json())
+    .then(data => {
+        counts.querySelectorAll('[data-count]').forEach(element => {
+            const name = element.dataset.count;
+            element.textContent = name === 'open' ? data.open : data.status[name];
+        });
+    })
+    .catch(error => console.error('Task counts error:', error));
+}
+
+function taskSocketIsOpen() {
+    return taskSocket !== null && taskSocket.readyState === WebSocket.OPEN;
+}
+
+function closeAddModal(modalId, form) {
+    form.reset();
+    const modal = bootstrap.Modal.getInstance(document.getElementById(modalId));
+    if (modal) {
+        modal.hide();
+    }
+}
+
+// Date window shown in the sidebar: the URL's start_date/end_date, or today + 7 days
+function sidebarWindow() {
+    const params = new URLSearchParams(window.location.search);
+    let start = params.get('start_date');
+    let end = params.get('end_date');
+    if (!start || !end) {
+        const today = new Date();
+        start = localDateString(today);
+        today.setDate(today.getDate() + 7);
+        end = localDateString(today);
+    }
+    return [start, end];
+}
+
+function localDateString(date) {
+    const month = (date.getMonth() + 1).toString().padStart(2, '0');
+    const day = date.getDate().toString().padStart(2, '0');
+    return `${date.getFullYear()}-${month}-${day}`;
+}
+
+function applyTaskChange(change) {
+    const list = document.getElementById('taskSidebarList');
+    if (!list) {
+        return;
+    }
+    if (change.occurrence && change.op === 'complete') {
+        // One occurrence of a recurring task was completed: only its card changes
+        if (change.is_completed) {
+            markTaskCompleted(change.id, change.occurrence);
+        }
+        return;
+    }
+    // A change to one occurrence (skipped or rescheduled) only touches that occurrence's card
+    const cards = Array.from(list.querySelectorAll(`[data-task-id="${change.id}"]`));
+    const card = cards.find(element => sameOccurrence(element, change.occurrence));
+    const detail = document.getElementById('taskDetail');
+    const isSelected = detail && detail.dataset.taskId === String(change.id)
+        && (!change.occurrence || sameOccurrence(detail, change.occurrence));
+
+    if (change.op === 'delete') {
+        // Deleting the whole task also removes the cards of its occurrences
+        (change.occurrence ? [card] : cards).forEach(element => element && element.remove());
+        if (isSelected) {
+            detail.innerHTML = change.occurrence
+                ? '<p class="text-muted p-5">This occurrence has been skipped.</p>'
+                : '<p class="text-muted p-5">The task has been deleted.</p>';
+            const url = new URL(window.location.href);
+            url.searchParams.delete('task_id');
+            url.searchParams.delete('occurrence');
+            window.history.replaceState(null, '', url.pathname + "?" + url.searchParams.toString());
+        }
+        return;
+    }
+    if (change.is_completed && isSelected) {
+        markTaskCompleted(change.id);
+    }
+
+    const [start, end] = sidebarWindow();
+    const dueDay = localDateString(new Date(change.due_date));
+    const inWindow = dueDay >= start && dueDay <= end;
+    const searching = new URLSearchParams(window.location.search).has('search');
+    if (!inWindow || (searching && !card)) {
+        if (card && !searching) {
+            card.remove();
+        }
+        return;
+    }
+    const newCard = buildTaskCard(change);
+    if (card) {
+        if (new Date(card.dataset.due).getTime() === new Date(change.due_date).getTime()) {
+            card.replaceWith(newCard);
+            return;
+        }
+        // A new deadline moves the card to its place in the list
+        card.remove();
+    }
+    list.querySelector('.no-tasks')?.remove();
+    const next = Array.from(list.querySelectorAll('[data-task-id]'))
+        .find(other => new Date(other.dataset.due) > new Date(change.due_date));
+    const more = list.querySelector('.sidebar-more');
+    if (!next && more) {
+        // Due after the pages loaded so far: it arrives with a later page
+        return;
+    }
+    list.insertBefore(newCard, next || null);
+}
+
+// ----- Infinite scrolling: the sidebar's date window is loaded one keyset page at a time -----
+function setupSidebarScroll() {
+    const list = document.getElementById('taskSidebarList');
+    if (!list || !('IntersectionObserver' in window)) {
+        return;
+    }
+    let loading = false;
+    const observer = new IntersectionObserver(entries => {
+        const more = list.querySelector('.sidebar-more');
+        if (!more || loading || !entries.some(entry => entry.isIntersecting)) {
+            return;
+        }
+        loading = true;
+        const url = `${more.dataset.url}&cursor=${encodeURIComponent(more.dataset.cursor)}`;
+        fetch(url, { headers: { 'X-Requested-With': 'XMLHttpRequest' } })
+        .then(response => response.json())
+        .then(data => {
+            if (!data.success) {
+                return;
+            }
+            data.tasks.forEach(task => list.insertBefore(buildTaskCard(task), more));
+            if (data.next_cursor) {
+                more.dataset.cursor = data.next_cursor;
+            } else {
+                observer.disconnect();
+                more.remove();
+            }
+        })
+        .catch(error => console.error('Load more tasks error:', error))
+        .finally(() => {
+            loading = false;
+        });
+    });
+    const more = list.querySelector('.sidebar-more');
+    if (more) {
+        observer.observe(more);
+    }
+}
+
+// Occurrences of recurring tasks are told apart by data-occurrence, compared as times since offsets may differ
+function sameOccurrence(element, occurrence) {
+    if (!occurrence) {
+        return !element.dataset.occurrence;
+    }
+    return Boolean(element.dataset.occurrence) && new Date(element.dataset.occurrence).getTime() === new Date(occurrence).getTime();
+}
+
+function markTaskCompleted(taskId, occurrence) {
+    const detail = document.getElementById('taskDetail');
+    if (detail && detail.dataset.taskId === String(taskId) && sameOccurrence(detail, occurrence)) {
+        const button = detail.querySelector('a.btn-success');
+        if (button) {
+            button.outerHTML = '<span class="badge bg-success">Done</span>';
+        }
+    }
+    const card = Array.from(document.querySelectorAll(`#taskSidebarList [data-task-id="${taskId}"]`))
+        .find(element => sameOccurrence(element, occurrence));
+    const status = card && card.querySelector('.task-status');
+    if (status) {
+        status.className = 'badge bg-success task-status';
+        status.textContent = 'Done';
+    }
+}
+
+// Same markup as templates/TaskSystemapp/sidebar_tasks.html
+function buildTaskCard(task) {
+    const due = new Date(task.due_date);
+    const card = document.createElement('div');
+    card.className = 'card mb-2';
+    card.dataset.taskId = task.id;
+    card.dataset.due = task.due_date;
+    if (task.occurrence) {
+        card.dataset.occurrence = task.occurrence;
+    }
+    card.innerHTML = `
+        <div class="card-body">
+            <div class="d-flex justify-content-between align-items-center">
+                <a><h5></h5></a>
+                <span class="badge"></span>
+            </div>
+            <small class="text-muted"></small><br>
+            <span class="task-status"></span>
+        </div>`;
+    const url = new URL(window.location.href);
+    url.searchParams.set('task_id', task.id);
+    if (task.occurrence) {
+        url.searchParams.set('occurrence', task.occurrence);
+    } else {
+        url.searchParams.delete('occurrence');
+    }
+    card.querySelector('a').href = url.pathname + "?" + url.searchParams.toString();
+    card.querySelector('h5').textContent = task.title;
+
+    const priority = card.querySelector('.badge');
+    const priorityStyles = {high: ['badge', 'red', 'High'], low: ['badge', 'green', 'Low'], medium: ['badge bg-info', '', 'Medium']};
+    const [priorityClass, priorityColor, priorityLabel] = priorityStyles[task.priority] || priorityStyles.medium;
+    priority.className = priorityClass;
+    priority.style.backgroundColor = priorityColor;
+    priority.textContent = priorityLabel;
+
+    const pad = n => n.toString().padStart(2, '0');
+    card.querySelector('small').textContent =
+        `Deadline：${localDateString(due)} ${pad(due.getHours())}:${pad(due.getMinutes())}`;
+
+    const status = card.querySelector('.task-status');
+    const untilDue = due - new Date();
+    if (task.is_completed) {
+        status.className = 'badge bg-success task-status';
+        status.textContent = 'Done';
+    } else if (untilDue >= 0 && untilDue < 7 * 24 * 3600 * 1000) {
+        status.className = 'badge bg-warning text-dark task-status';
+        status.textContent = 'Expiring';
+    } else {
+        status.className = 'badge bg-secondary task-status';
+        status.textContent = 'Unfinished';
+    }
+    return card;
+}
+
 // Clock update and time zone setting
 function onTimezoneChange(tz) {
     document.cookie = "user_timezone=" + tz + ";path=/;max-age=31536000";
@@ -208,5 +530,5 @@ document.addEventListener('click', function(e) {
 
 // Widget toggle button event (opens widget mode window)
 document.getElementById('widgetToggle')?.addEventListener('click', function() {
-    window.open(window.location.pathname + "?widget_mode=1", "widgetWindow", "width=300,height=400,top=100,left=100,toolbar=no,scrollbars=no,resizable=yes");
+    window.open(this.dataset.url, "widgetWindow", "width=300,height=400,top=100,left=100,toolbar=no,scrollbars=no,resizable=yes");
 });
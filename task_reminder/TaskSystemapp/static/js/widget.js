@@ -2,11 +2,71 @@
  * Click on the widget area to return to the home page
  */
 function returnToHomepage() {
+    const homeUrl = window.location.origin + document.getElementById('widgetContainer').dataset.homeUrl;
     if (window.opener && !window.opener.closed) {
         window.opener.close();
-        window.open(window.location.origin + window.location.pathname, '_blank');
-    } else {
-        window.open(window.location.origin + window.location.pathname, '_blank');
     }
+    window.open(homeUrl, '_blank');
     window.close();
 }
+
+/**
+ * Escape text for insertion into HTML
+ */
+function escapeHtml(text) {
+    const div = document.createElement('div');
+    div.textContent = text;
+    return div.innerHTML;
+}
+
+/**
+ * Format an ISO 8601 deadline as "YYYY-MM-DD HH:MM" in local time
+ */
+function formatDeadline(value) {
+    const date = new Date(value);
+    const pad = n => String(n).padStart(2, '0');
+    return `${date.getFullYear()}-${pad(date.getMonth() + 1)}-${pad(date.getDate())} ${pad(date.getHours())}:${pad(date.getMinutes())}`;
+}
+
+/**
+ * Redraw the task list from the widget endpoint's JSON
+ */
+function renderWidgetTasks(tasks) {
+    const container = document.getElementById('widgetTasks');
+    if (!tasks.length) {
+        container.innerHTML = '<p>No expiring tasks</p>';
+        return;
+    }
+    container.innerHTML = '<ul class="list-unstyled">' + tasks.map(task =>
+        `<li><strong>${escapeHtml(task.title)}</strong><br>Deadline：${formatDeadline(task.due_date)}</li>`
+    ).join('') + '</ul>';
+}
+
+/**
+ * Keep the list up to date with long polls: the server holds each request until the user's tasks change
+ * (or about 25 seconds pass) and answers 304 when nothing did, so the widget never polls in a tight loop.
+ */
+async function pollWidgetTasks() {
+    const url = document.getElementById('widgetContainer').dataset.url + '?format=json&wait=25';
+    let etag = null;
+    while (true) {
+        try {
+            const response = await fetch(url, {
+                headers: etag ? {'If-None-Match': etag} : {},
+                cache: 'no-store',
+                credentials: 'same-origin'
+            });
+            if (response.status === 200) {
+                etag = response.headers.get('ETag');
+                renderWidgetTasks((await response.json()).tasks);
+            } else if (response.status !== 304) {
+                throw new Error(`HTTP ${response.status}`);
+            }
+        } catch (error) {
+            // Server unreachable or signed out: wait before trying again
+            await new Promise(resolve => setTimeout(resolve, 30000));
+        }
+    }
+}
+
+document.addEventListener('DOMContentLoaded', pollWidgetTasks);
@@ -0,0 +1,65 @@
+"""
+Static file storage for deployment.
+
+collectstatic copies every static file under a name holding a hash of its content (css/home.3f2a1b9c0d4e.css),
+records the names in staticfiles.json so {% static %} links to them, and writes a precompressed .gz copy, and a .br
+copy when the optional brotli package is installed, next to each compressible file. A hashed name never changes
+content, so StaticAssetMiddleware can let browsers cache it for a year and serve the smallest encoding they accept
+without compressing anything per request.
+"""
+import gzip
+import os
+
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+from django.core.files.base import ContentFile
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Text formats worth compressing; images and woff fonts are compressed already
+COMPRESSIBLE_EXTENSIONS = {'.css', '.js', '.map', '.svg', '.json', '.txt', '.html', '.xml', '.ico', '.eot', '.ttf', '.otf'}
+# Smaller files gain less than the extra headers cost
+MIN_COMPRESS_SIZE = 512
+
+
+def compressed_versions(content):
+    """
+    [(suffix, data), ...] of the precompressed copies worth keeping: those at least 5% smaller than content.
+    """
+    versions = [('.gz', gzip.compress(content, compresslevel=9, mtime=0))]
+    if brotli is not None:
+        versions.append(('.br', brotli.compress(content, quality=11)))
+    return [(suffix, data) for suffix, data in versions if len(data) < len(content) * 0.95]
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    """
+    ManifestStaticFilesStorage that also writes the precompressed copies, for the original and the hashed name.
+    """
+
+    def post_process(self, paths, dry_run=False, **options):
+        yield from super().post_process(paths, dry_run, **options)
+        if dry_run:
+            return
+        names = set(paths) | set(self.hashed_files.values())
+        for name in sorted(names):
+            if os.path.splitext(name)[1].lower() in COMPRESSIBLE_EXTENSIONS:
+                self.compress(name)
+
+    def compress(self, name):
+        with self.open(name) as original:
+            content = original.read()
+        if len(content) < MIN_COMPRESS_SIZE:
+            return
+        for suffix, data in compressed_versions(content):
+            if self.exists(name + suffix):
+                self.delete(name + suffix)
+            self._save(name + suffix, ContentFile(data))
+
+    def stored_name(self, name):
+        # Until collectstatic has written the manifest (in development and tests) files keep their own names
+        if not self.hashed_files:
+            return name
+        return super().stored_name(name)
@@ -0,0 +1,86 @@
+"""
+How busy each day (or week) is: task counts by priority and completion, for calendar month and year views.
+
+The counts come from one GROUP BY over the user's local date of due_date, a range scan on (user, due_date), so
+the browser receives at most one small entry per day instead of every task. Occurrences of recurring tasks are
+expanded for the range and counted in as well. Responses are cached per task version like the events feed.
+
+task_counts gives the totals by status for the home header in the same way: one GROUP BY for the one-off tasks, with
+the status computed in SQL, plus the occurrences of recurring tasks about to expire.
+"""
+from datetime import timedelta
+
+from django.db.models import Count
+from django.db.models.functions import TruncDate
+
+from .models import SOON_EXPIRING, Task
+from .recurrence import expand
+
+PRIORITIES = [value for value, _ in Task.PRIORITY_CHOICES]
+
+
+def bucket_of(day, by):
+    """
+    The day itself, or the Monday of its week.
+    """
+    return day - timedelta(days=day.weekday()) if by == 'week' else day
+
+
+def task_summary(user, start, end, by, tz):
+    """
+    [{"date": "2030-03-25", "total": 3, "completed": 1, "by_priority": {"high": {"open": 1, "completed": 0}, ...}}, ...]
+    for the user's tasks due in [start, end), one entry per local day (or week starting on Monday) with tasks, in order.
+    """
+    rows = (
+        Task.objects.filter(user=user, recurrence='', due_date__gte=start, due_date__lt=end)
+        .annotate(day=TruncDate('due_date', tzinfo=tz))
+        .values('day', 'priority', 'is_completed')
+        .annotate(count=Count('id'))
+        .order_by()
+    )
+    counts = {}
+    for row in rows:
+        key = (bucket_of(row['day'], by), row['priority'], row['is_completed'])
+        counts[key] = counts.get(key, 0) + row['count']
+
+    recurring = Task.objects.filter(user=user, recurrence__gt='', is_completed=False, due_date__lt=end).only(
+        'id', 'priority', 'due_date', 'is_completed', 'recurrence', 'recurrence_interval', 'recurrence_until'
+    )
+    for occurrence in expand(list(recurring), start, end, tz):
+        key = (bucket_of(occurrence.due_date.astimezone(tz).date(), by), occurrence.priority, occurrence.is_completed)
+        counts[key] = counts.get(key, 0) + 1
+
+    buckets = {}
+    for (day, priority, is_completed), count in counts.items():
+        bucket = buckets.setdefault(day, {
+            'date': day.isoformat(),
+            'total': 0,
+            'completed': 0,
+            'by_priority': {value: {'open': 0, 'completed': 0} for value in PRIORITIES},
+        })
+        bucket['total'] += count
+        if is_completed:
+            bucket['completed'] += count
+        bucket['by_priority'].setdefault(priority, {'open': 0, 'completed': 0})['completed' if is_completed else 'open'] += count
+    return [buckets[day] for day in sorted(buckets)]
+
+
+def task_counts(user, now, tz, occurrences=None):
+    """
+    The user's tasks counted by status and priority at now, as TaskQuerySet.status_counts gives them.
+    A recurring task counts as its open occurrences due within SOON_EXPIRING, all 'expiring'; occurrences may pass
+    those in when they have been expanded already.
+    """
+    counts = Task.objects.filter(user=user, recurrence='').status_counts(now)
+    if occurrences is None:
+        recurring = Task.objects.filter(user=user, recurrence__gt='', is_completed=False, due_date__lt=now + SOON_EXPIRING).only(
+            'id', 'priority', 'due_date', 'is_completed', 'recurrence', 'recurrence_interval', 'recurrence_until'
+        )
+        occurrences = expand(list(recurring), now, now + SOON_EXPIRING, tz)
+    for occurrence in occurrences:
+        if not occurrence.is_completed:
+            counts['total'] += 1
+            counts['open'] += 1
+            counts['status']['expiring'] += 1
+            counts['priority'][occurrence.priority]['expiring'] += 1
+    return counts
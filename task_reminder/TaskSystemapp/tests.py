@@ -1,8 +1,70 @@
-from django.test import TestCase, Client
+import asyncio
+import gzip
+import json
+import os
+import re
+import shutil
+import sqlite3
+import tempfile
+import time
+import unittest
+from io import StringIO
+from unittest import mock
+from asgiref.sync import async_to_sync
+from channels.exceptions import ChannelFull
+from channels.layers import get_channel_layer
+from channels.testing import HttpCommunicator, WebsocketCommunicator
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.core import mail
+from django.core.management import call_command
+from django.db import connection, connections
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, TransactionTestCase, Client, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from django.utils import timezone
-from datetime import timedelta
-from .models import CustomUser, Task
+from datetime import datetime, timedelta, timezone as dt_timezone
+from . import sms
+from .archive import restore_task
+from .layers import SQLiteChannelLayer
+from .models import CustomUser, ImportJob, Notification, Task, TaskOccurrence
+from .feed import format_trigger
+from .imports import run_import
+from .notifications import DeliveryWorker, queue_reminders
+from .recurrence import occurrences
+from .reminders import ReminderQueue, ReminderScheduler
+from .search import search_tasks
+from .realtime import user_group
+from .signals import batch_task_changes
+from .views import BATCH_LIMIT, encode_cursor
+from task_reminder.asgi import application as asgi_application
+from task_reminder.consumers import TaskConsumer
+
+def setUpModule():
+    # Task changes are published through the channel layer; keep its file out of the project directory
+    directory = tempfile.mkdtemp()
+    layers = override_settings(CHANNEL_LAYERS={'default': {
+        'BACKEND': 'TaskSystemapp.layers.SQLiteChannelLayer',
+        'CONFIG': {'path': os.path.join(directory, 'channels.sqlite3'), 'poll_interval': 0.005},
+    }})
+    layers.enable()
+
+    def restore():
+        async_to_sync(get_channel_layer().close)()
+        layers.disable()
+        shutil.rmtree(directory, ignore_errors=True)
+    unittest.addModuleCleanup(restore)
+
+
+def streamed_content(response):
+    """
+    Body of a streaming response; async views stream from async iterators.
+    """
+    async def collect():
+        return b''.join([chunk async for chunk in response.streaming_content])
+    return async_to_sync(collect)() if response.is_async else b''.join(response.streaming_content)
+
 
 class TaskSystemTest(TestCase):
     def setUp(self):
@@ -133,3 +195,1642 @@ class TaskSystemTest(TestCase):
         # Redirect to login page after successful registration
         self.assertEqual(response.status_code, 302)
         self.assertEqual(response.url, reverse('login'))
+
+
+
+class ReminderSchedulerTest(TestCase):
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(
+            username='reminduser',
+            email='remind@example.com',
+            phone='+123456789013',
+            password='testpass'
+        )
+        self.now = timezone.now()
+        self.fired = []
+        self.scheduler = ReminderScheduler(handler=self.fired.extend, horizon=timedelta(hours=1))
+
+    def test_reminder_offset(self):
+        """
+        The reminder time follows the per-task offset and is stored for the scheduler's range query.
+        """
+        task = Task.objects.create(
+            title='Offset', due_date=self.now + timedelta(days=1), reminder_offset=timedelta(minutes=30), user=self.user
+        )
+        self.assertEqual(task.reminder_time, task.due_date - timedelta(minutes=30))
+        self.assertEqual(Task.objects.get(pk=task.pk).remind_at, task.reminder_time)
+
+    def test_queue_reschedule_and_cancel(self):
+        """
+        Rescheduled and cancelled reminders are skipped without searching the heap.
+        """
+        queue = ReminderQueue()
+        queue.schedule(1, self.now)
+        queue.schedule(2, self.now + timedelta(minutes=1))
+        queue.schedule(1, self.now + timedelta(minutes=2))
+        queue.cancel(2)
+        self.assertEqual(queue.next_time(), self.now + timedelta(minutes=2))
+        self.assertEqual(queue.pop_due(self.now + timedelta(minutes=5)), [(1, self.now + timedelta(minutes=2))])
+        self.assertEqual(len(queue), 0)
+
+    def test_fires_each_reminder_once(self):
+        """
+        Due reminders fire once; completed and deleted tasks are skipped.
+        """
+        due_soon = Task.objects.create(title='Due soon', due_date=self.now + timedelta(hours=2, minutes=10), user=self.user)
+        completed = Task.objects.create(title='Completed', due_date=self.now + timedelta(hours=2, minutes=10), user=self.user)
+        deleted = Task.objects.create(title='Deleted', due_date=self.now + timedelta(hours=2, minutes=10), user=self.user)
+        Task.objects.create(title='Later', due_date=self.now + timedelta(days=2), user=self.user)
+
+        self.scheduler.run_once(self.now)
+        self.assertEqual(len(self.scheduler.queue), 3)
+        completed.is_completed = True
+        completed.save()
+        deleted.delete()
+
+        self.scheduler.run_once(self.now + timedelta(minutes=20))
+        self.assertEqual([task.pk for task in self.fired], [due_soon.pk])
+        self.assertIsNotNone(Task.objects.get(pk=due_soon.pk).reminded_at)
+
+        self.scheduler.run_once(self.now + timedelta(minutes=40))
+        self.assertEqual(len(self.fired), 1)
+
+    def test_picks_up_new_tasks(self):
+        """
+        Tasks created after the scheduler started are picked up by the incremental poll.
+        """
+        self.scheduler.run_once(self.now)
+        task = Task.objects.create(title='New', due_date=self.now + timedelta(hours=2, minutes=5), user=self.user)
+        self.scheduler.run_once(self.now + timedelta(minutes=1))
+        self.assertIn(task.pk, self.scheduler.queue)
+
+
+class HomeQueryPlanTest(TestCase):
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(
+            username='planuser',
+            email='plan@example.com',
+            phone='+123456789014',
+            password='testpass',
+            region='Asia/Tokyo'
+        )
+        self.client.login(username='planuser', password='testpass')
+        now = timezone.now()
+        Task.objects.bulk_create([
+            Task(title=f'Task {i}', due_date=now + timedelta(hours=i), user=self.user) for i in range(1, 51)
+        ])
+
+    def task_query_plans(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(url)
+        plans = []
+        with connection.cursor() as cursor:
+            for query in queries.captured_queries:
+                sql = query['sql']
+                # The header's counts read all of the user's tasks
+                if 'FROM "TaskSystemapp_task"' in sql and 'GROUP BY' not in sql:
+                    cursor.execute('EXPLAIN QUERY PLAN ' + sql)
+                    plans.append(' '.join(row[-1] for row in cursor.fetchall()))
+        return plans
+
+    def test_home_queries_use_due_date_indexes(self):
+        """
+        The date-window and soon-expiring lookups are index range scans on the composite indexes.
+        """
+        if connection.vendor != 'sqlite':
+            self.skipTest('EXPLAIN QUERY PLAN is SQLite specific')
+        plans = self.task_query_plans(reverse('home') + '?start_date=2030-01-01&end_date=2030-01-31')
+        self.assertTrue(plans)
+        for plan in plans:
+            self.assertRegex(plan, r'USING (COVERING )?INDEX task_user_(open_)?due_idx \(.*due_date>\? AND due_date<\?\)')
+        self.assertTrue(any('task_user_open_due_idx' in plan for plan in plans))
+
+    def test_home_query_budget(self):
+        """
+        Home needs the session, the user, a single query for the upcoming and selected tasks, one for the
+        first page of the date window and one counting the tasks by status, whatever panels are shown.
+        """
+        selected = Task.objects.create(
+            title='Selected', description='Details', due_date=timezone.now() + timedelta(days=30), user=self.user
+        )
+        with self.assertNumQueries(5):
+            response = self.client.get(reverse('home'), {'task_id': selected.pk})
+        self.assertEqual(response.context['selected_task'], selected)
+        self.assertContains(response, 'Details')
+        self.assertEqual(len(response.context['soon_expiring_tasks']), 50)
+        sidebar = response.context['sidebar_tasks']
+        self.assertEqual(sidebar, sorted(sidebar, key=lambda task: task.due_date))
+        self.assertNotIn(selected, sidebar)
+
+    def test_local_day_range_is_half_open(self):
+        """
+        The end_date day is included in full, in the user's time zone.
+        """
+        response = self.client.get(reverse('home') + '?start_date=2030-01-01&end_date=2030-01-01')
+        self.assertEqual(list(response.context['all_tasks']), [])
+        # 23:30 on 2030-01-01 in Tokyo is 14:30 UTC on the same day
+        late = Task.objects.create(
+            title='Late', due_date=datetime(2030, 1, 1, 14, 30, tzinfo=dt_timezone.utc), user=self.user
+        )
+        Task.objects.create(title='Next day', due_date=datetime(2030, 1, 1, 15, 0, tzinfo=dt_timezone.utc), user=self.user)
+        response = self.client.get(reverse('home') + '?start_date=2030-01-01&end_date=2030-01-01')
+        self.assertEqual(list(response.context['all_tasks']), [late])
+
+    def test_date_window_reaches_the_last_date(self):
+        task = Task.objects.create(title='Far', due_date=datetime(9999, 12, 31, 12, 0, tzinfo=dt_timezone.utc), user=self.user)
+        response = self.client.get(reverse('home') + '?start_date=9999-12-01&end_date=9999-12-31')
+        self.assertEqual(list(response.context['all_tasks']), [task])
+        response = self.client.get(reverse('home') + '?start_date=0001-01-01&end_date=9999-12-31')
+        self.assertEqual(response.status_code, 200)
+        response = self.client.get(reverse('sidebar_tasks'), {
+            'start_date': '9999-12-01', 'end_date': '9999-12-31', 'cursor': encode_cursor(Task(pk=0, due_date=task.due_date))
+        })
+        self.assertEqual(response.status_code, 200)
+
+
+class TaskSearchTest(TestCase):
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(
+            username='searchuser',
+            email='search@example.com',
+            phone='+123456789015',
+            password='testpass'
+        )
+        self.other = CustomUser.objects.create_user(
+            username='otheruser',
+            email='other@example.com',
+            phone='+123456789016',
+            password='testpass'
+        )
+        self.due = timezone.now() + timedelta(days=1)
+
+    def create(self, title, description='', priority='medium', user=None):
+        return Task.objects.create(
+            title=title, description=description, priority=priority, due_date=self.due, user=user or self.user
+        )
+
+    def test_matches_title_and_description_by_prefix(self):
+        """
+        Search covers title and description, and a word prefix is enough to match.
+        """
+        in_title = self.create('Quarterly report')
+        in_description = self.create('Call', description='Discuss the report draft')
+        self.create('Groceries')
+        self.create('Report for someone else', user=self.other)
+        self.assertEqual({task.pk for task in search_tasks(self.user, 'repo')}, {in_title.pk, in_description.pk})
+
+    def test_rank_then_priority(self):
+        """
+        Title matches outrank description matches; equal relevance is ordered by priority.
+        """
+        description = self.create('Call', description='budget', priority='high')
+        low = self.create('Budget', priority='low')
+        high = self.create('Budget', priority='high')
+        self.assertEqual([task.pk for task in search_tasks(self.user, 'budget')], [high.pk, low.pk, description.pk])
+
+    def test_index_follows_updates_and_deletes(self):
+        """
+        Renamed and deleted tasks are reflected in the index.
+        """
+        task = self.create('Old name')
+        task.title = 'New name'
+        task.save()
+        self.assertEqual(search_tasks(self.user, 'old'), [])
+        self.assertEqual([t.pk for t in search_tasks(self.user, 'new')], [task.pk])
+        task.delete()
+        self.assertEqual(search_tasks(self.user, 'new'), [])
+
+    def test_home_search_is_paginated(self):
+        """
+        The home page shows one page of search results at a time.
+        """
+        for i in range(25):
+            self.create(f'Meeting {i}')
+        self.client.login(username='searchuser', password='testpass')
+        response = self.client.get(reverse('home'), {'search': 'meet'})
+        self.assertEqual(len(response.context['all_tasks']), 20)
+        self.assertTrue(response.context['search_has_more'])
+        response = self.client.get(reverse('home'), {'search': 'meet', 'page': 2})
+        self.assertEqual(len(response.context['all_tasks']), 5)
+        self.assertFalse(response.context['search_has_more'])
+        # Pages past the end, however far, show the last one
+        response = self.client.get(reverse('home'), {'search': 'meet', 'page': 99999999999999999999})
+        self.assertEqual((response.context['search_page'], len(response.context['all_tasks'])), (2, 5))
+        response = self.client.get(reverse('home'), {'search': 'nothing', 'page': 3})
+        self.assertEqual((response.context['search_page'], list(response.context['all_tasks'])), (1, []))
+
+
+class TaskEventsTest(TestCase):
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(
+            username='eventsuser',
+            email='events@example.com',
+            phone='+123456789017',
+            password='testpass'
+        )
+        self.client.login(username='eventsuser', password='testpass')
+        self.inside = Task.objects.create(
+            title='Inside', due_date=datetime(2030, 3, 10, 12, 0, tzinfo=dt_timezone.utc), user=self.user
+        )
+        Task.objects.create(title='Outside', due_date=datetime(2030, 5, 1, 12, 0, tzinfo=dt_timezone.utc), user=self.user)
+        self.url = reverse('task_events')
+        self.window = {'start': '2030-03-01T00:00:00Z', 'end': '2030-04-01T00:00:00Z'}
+
+    def test_streams_tasks_in_window(self):
+        """
+        Only tasks due inside the window are streamed, as a JSON array.
+        """
+        response = self.client.get(self.url, self.window)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        events = json.loads(streamed_content(response))
+        self.assertEqual([event['id'] for event in events], [self.inside.pk])
+        self.assertEqual(events[0]['title'], 'Inside')
+
+    def test_requires_window(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 400)
+
+    def test_conditional_get(self):
+        """
+        An unchanged window returns 304; a change in the window returns the new list.
+        """
+        response = self.client.get(self.url, self.window)
+        etag = response['ETag']
+        response = self.client.get(self.url, self.window, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.inside.delete()
+        response = self.client.get(self.url, self.window, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(json.loads(streamed_content(response)), [])
+
+
+class TaskCacheTest(TestCase):
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(
+            username='cacheuser',
+            email='cache@example.com',
+            phone='+123456789018',
+            password='testpass'
+        )
+        self.client.login(username='cacheuser', password='testpass')
+        self.task = Task.objects.create(title='Cached', due_date=timezone.now() + timedelta(days=2), user=self.user)
+
+    def task_queries(self, url, data=None):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, data)
+            if response.streaming:
+                streamed_content(response)
+        return response, [q['sql'] for q in queries.captured_queries if '"TaskSystemapp_task"' in q['sql']]
+
+    def test_repeat_home_load_skips_task_queries(self):
+        """
+        An unchanged task list is served from the cache; a task change invalidates it.
+        """
+        _, queries = self.task_queries(reverse('home'))
+        # Upcoming tasks, the first page of the date window and the header counts
+        self.assertEqual(len(queries), 3)
+        response, queries = self.task_queries(reverse('home'))
+        self.assertEqual(queries, [])
+        self.assertContains(response, 'Cached')
+
+        Task.objects.create(title='Fresh', due_date=timezone.now() + timedelta(days=1), user=self.user)
+        response, queries = self.task_queries(reverse('home'))
+        self.assertEqual(len(queries), 3)
+        self.assertContains(response, 'Fresh')
+
+    def test_events_served_from_cache(self):
+        url = reverse('task_events')
+        today = timezone.localdate()
+        window = {'start': today.isoformat(), 'end': (today + timedelta(days=30)).isoformat()}
+        _, queries = self.task_queries(url, window)
+        # The window's tasks, and the recurring tasks to expand
+        self.assertEqual(len(queries), 2)
+        response, queries = self.task_queries(url, window)
+        self.assertEqual(queries, [])
+        self.assertEqual([event['id'] for event in json.loads(response.content)], [self.task.pk])
+
+    def test_bulk_changes_bump_version_once(self):
+        """
+        Row-by-row signals inside batch_task_changes() bump the version once.
+        """
+        Task.objects.create(title='Second', due_date=timezone.now(), user=self.user)
+        version = CustomUser.objects.get(pk=self.user.pk).tasks_version
+        with batch_task_changes():
+            Task.objects.filter(user=self.user).delete()
+        user = CustomUser.objects.get(pk=self.user.pk)
+        self.assertEqual(user.tasks_version, version + 1)
+        self.assertIsNotNone(user.tasks_changed_at)
+
+
+class TaskRealtimeTest(TestCase):
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(
+            username='liveuser',
+            email='live@example.com',
+            phone='+123456789019',
+            password='testpass'
+        )
+        self.layer = get_channel_layer()
+
+    async def test_rejects_anonymous_socket(self):
+        communicator = WebsocketCommunicator(TaskConsumer.as_asgi(), '/ws/tasks/')
+        communicator.scope['user'] = AnonymousUser()
+        connected, _ = await communicator.connect()
+        self.assertFalse(connected)
+
+    async def test_burst_is_coalesced(self):
+        """
+        Changes sent to the user's group within the coalescing interval arrive as one batch,
+        keeping only the latest state of each task.
+        """
+        communicator = WebsocketCommunicator(TaskConsumer.as_asgi(), '/ws/tasks/')
+        communicator.scope['user'] = self.user
+        connected, _ = await communicator.connect()
+        self.assertTrue(connected)
+        group = user_group(self.user.pk)
+        created = {'op': 'create', 'id': 1, 'title': 'New', 'priority': 'low', 'due_date': '2030-01-01T00:00:00+00:00', 'is_completed': False}
+        await self.layer.group_send(group, {'type': 'task.update', 'changes': [created]})
+        await self.layer.group_send(group, {'type': 'task.update', 'changes': [{**created, 'op': 'complete', 'is_completed': True}]})
+        await self.layer.group_send(group, {'type': 'task.update', 'changes': [{'op': 'delete', 'id': 2}]})
+        await self.layer.group_send(user_group(self.user.pk + 1), {'type': 'task.update', 'changes': [{'op': 'delete', 'id': 3}]})
+
+        message = await communicator.receive_json_from(timeout=2)
+        self.assertEqual(message['type'], 'tasks.batch')
+        self.assertEqual(message['changes'], [{**created, 'is_completed': True}, {'op': 'delete', 'id': 2}])
+        self.assertTrue(await communicator.receive_nothing(timeout=0.5))
+        await communicator.disconnect()
+
+    async def test_occurrence_changes_are_kept_apart(self):
+        communicator = WebsocketCommunicator(TaskConsumer.as_asgi(), '/ws/tasks/')
+        communicator.scope['user'] = self.user
+        connected, _ = await communicator.connect()
+        self.assertTrue(connected)
+        group = user_group(self.user.pk)
+        first = {'op': 'complete', 'id': 1, 'occurrence': '2030-01-01T09:00:00+00:00', 'is_completed': True}
+        second = {**first, 'occurrence': '2030-01-02T09:00:00+00:00'}
+        other = {'op': 'complete', 'id': 2, 'occurrence': '2030-01-01T09:00:00+00:00', 'is_completed': True}
+        await self.layer.group_send(group, {'type': 'task.update', 'changes': [first, second, other]})
+        await self.layer.group_send(group, {'type': 'task.update', 'changes': [{'op': 'delete', 'id': 2}]})
+
+        message = await communicator.receive_json_from(timeout=2)
+        self.assertEqual(message['changes'], [first, second, {'op': 'delete', 'id': 2}])
+        await communicator.disconnect()
+
+    def test_write_paths_publish_diffs(self):
+        channel = async_to_sync(self.layer.new_channel)()
+        async_to_sync(self.layer.group_add)(user_group(self.user.pk), channel)
+        self.client.login(username='liveuser', password='testpass')
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(reverse('quick_add_task'), {
+                'title': 'Pushed', 'priority': 'high', 'due_date': '2030-01-01 09:00'
+            })
+        task_id = response.json()['task_id']
+        message = async_to_sync(self.layer.receive)(channel)
+        self.assertEqual(message['changes'][0]['op'], 'create')
+        self.assertEqual(message['changes'][0]['title'], 'Pushed')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('delete_task', args=[task_id]), HTTP_X_REQUESTED_WITH='XMLHttpRequest')
+        message = async_to_sync(self.layer.receive)(channel)
+        self.assertEqual(message['changes'], [{'op': 'delete', 'id': task_id}])
+
+
+class BatchTaskTest(TestCase):
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(
+            username='batchuser',
+            email='batch@example.com',
+            password='testpass',
+            phone='+123456789020',
+            region='New York'
+        )
+        self.other = CustomUser.objects.create_user(
+            username='batchother',
+            email='batchother@example.com',
+            password='testpass',
+            phone='+123456789021',
+            region='New York'
+        )
+        self.client.login(username='batchuser', password='testpass')
+
+    def post_json(self, name, data):
+        return self.client.post(reverse(name), json.dumps(data), content_type='application/json')
+
+    def test_batch_add_uses_bulk_insert(self):
+        tasks = [{'title': f'Batch {i}', 'priority': 'low', 'due_date': '2030-01-01 09:00'} for i in range(200)]
+        tasks.append({'title': 'Detailed', 'priority': 'high', 'due_date': '2030-01-02 09:00', 'description': 'More'})
+        tasks.append({'title': '', 'priority': 'urgent', 'due_date': 'never'})
+        version = self.user.tasks_version
+        with CaptureQueriesContext(connection) as queries:
+            response = self.post_json('batch_add_tasks', {'tasks': tasks})
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(data['created'], 201)
+        self.assertTrue(all(result['success'] for result in data['results'][:201]))
+        self.assertEqual(set(data['results'][201]['errors']), {'title', 'priority', 'due_date'})
+        inserts = [q for q in queries.captured_queries if q['sql'].startswith('INSERT INTO "TaskSystemapp_task"')]
+        # One multi-row INSERT per chunk (SQLite caps the number of parameters per statement), not one per task
+        self.assertLessEqual(len(inserts), 5)
+
+        self.assertEqual(Task.objects.filter(user=self.user).count(), 201)
+        detailed = Task.objects.get(pk=data['results'][200]['id'])
+        self.assertEqual(detailed.description, 'More')
+        self.assertEqual(detailed.remind_at, detailed.due_date - detailed.reminder_offset)
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.tasks_version, version + 1)
+
+    def test_batch_add_checks_value_types_and_keeps_recurrence(self):
+        response = self.post_json('batch_add_tasks', {'tasks': [
+            {'title': 'Numbers', 'priority': 'low', 'due_date': 12345},
+            {'title': ['a'], 'priority': 'low', 'due_date': '2030-01-01 09:00', 'recurrence_interval': '2'},
+            {'title': 'Weekly', 'priority': 'low', 'due_date': '2030-01-01 09:00', 'recurrence': 'weekly',
+             'recurrence_interval': 2},
+        ]})
+        self.assertEqual(response.status_code, 200)
+        results = response.json()['results']
+        self.assertEqual(results[0]['errors'], {'due_date': ['Expected a string']})
+        self.assertEqual(results[1]['errors'], {'title': ['Expected a string']})
+        task = Task.objects.get(pk=results[2]['id'])
+        self.assertEqual((task.recurrence, task.recurrence_interval), ('weekly', 2))
+
+    def test_batch_complete_and_delete(self):
+        due = timezone.now() + timedelta(days=1)
+        mine = [Task.objects.create(user=self.user, title=f'Mine {i}', priority='low', due_date=due) for i in range(3)]
+        theirs = Task.objects.create(user=self.other, title='Theirs', priority='low', due_date=due)
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.post_json('batch_complete_tasks', {'ids': [mine[0].pk, 'x', mine[1].pk, theirs.pk]})
+        data = response.json()
+        self.assertEqual(data['completed'], 2)
+        # One result per item, in request order
+        self.assertEqual(
+            [(r['id'], r['success']) for r in data['results']],
+            [(mine[0].pk, True), ('x', False), (mine[1].pk, True), (theirs.pk, False)],
+        )
+        self.assertEqual(data['results'][1]['error'], 'Invalid task id')
+        updates = [q for q in queries.captured_queries if q['sql'].startswith('UPDATE "TaskSystemapp_task"')]
+        self.assertEqual(len(updates), 1)
+        self.assertEqual(Task.objects.filter(user=self.user, is_completed=True).count(), 2)
+        theirs.refresh_from_db()
+        self.assertFalse(theirs.is_completed)
+
+        response = self.post_json('batch_delete_tasks', {'ids': [mine[0].pk, mine[2].pk, theirs.pk]})
+        self.assertEqual(response.json()['deleted'], 2)
+        self.assertEqual(list(Task.objects.filter(user=self.user)), [mine[1]])
+        self.assertTrue(Task.objects.filter(pk=theirs.pk).exists())
+
+    def test_invalid_batches_are_rejected(self):
+        response = self.client.post(reverse('batch_add_tasks'), 'not json', content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+        response = self.post_json('batch_delete_tasks', {'ids': list(range(BATCH_LIMIT + 1))})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.client.get(reverse('batch_complete_tasks')).status_code, 405)
+
+
+ICS_IMPORT = """BEGIN:VCALENDAR\r
+VERSION:2.0\r
+BEGIN:VTODO\r
+SUMMARY:Write report\\, part 1\r
+DESCRIPTION:First line\\nsecond\r
+  line\r
+PRIORITY:1\r
+DTSTART;TZID=Europe/London:20300101T090000\r
+DUE:20300102T170000Z\r
+BEGIN:VALARM\r
+DESCRIPTION:Alarm text\r
+END:VALARM\r
+END:VTODO\r
+BEGIN:VEVENT\r
+SUMMARY:Meeting\r
+DTSTART;VALUE=DATE:20300105\r
+STATUS:COMPLETED\r
+END:VEVENT\r
+BEGIN:VTODO\r
+SUMMARY:No deadline\r
+END:VTODO\r
+END:VCALENDAR\r
+"""
+
+
+class TaskImportTest(TestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root)
+        settings_override = override_settings(MEDIA_ROOT=self.media_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.user = CustomUser.objects.create_user(
+            username='importuser',
+            email='import@example.com',
+            phone='+123456789022',
+            password='testpass',
+            region='America/New_York'
+        )
+        self.client.login(username='importuser', password='testpass')
+
+    def test_csv_import_in_chunks(self):
+        rows = ['Title,Priority,Due,Notes,Unused']
+        rows += [f'Task {i},{"High" if i % 2 else "low"},2030-01-01 09:00,Row {i},x' for i in range(25)]
+        rows.append('Broken,urgent,,,')
+        upload = SimpleUploadedFile('tasks.csv', '\n'.join(rows).encode())
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(reverse('import_tasks'), {'file': upload})
+        job = response.json()['job']
+        self.assertEqual(job['status'], 'done')
+        self.assertEqual((job['rows_done'], job['imported'], job['failed']), (26, 25, 1))
+        self.assertEqual(job['errors'][0]['row'], 26)
+        self.assertEqual(set(job['errors'][0]['errors']), {'priority', 'due_date'})
+        inserts = [q for q in queries.captured_queries if q['sql'].startswith('INSERT INTO "TaskSystemapp_task"')]
+        self.assertEqual(len(inserts), 1)
+
+        task = Task.objects.get(user=self.user, title='Task 1')
+        self.assertEqual(task.priority, 'high')
+        self.assertEqual(task.description, 'Row 1')
+        # Naive times are in the user's region
+        self.assertEqual(task.due_date, datetime(2030, 1, 1, 14, 0, tzinfo=dt_timezone.utc))
+        self.assertEqual(task.remind_at, task.due_date - task.reminder_offset)
+        self.assertFalse(ImportJob.objects.get(pk=job['id']).file)
+
+    def test_ics_import(self):
+        upload = SimpleUploadedFile('calendar.ics', ICS_IMPORT.encode())
+        job = self.client.post(reverse('import_tasks'), {'file': upload}).json()['job']
+        self.assertEqual((job['imported'], job['failed']), (2, 1))
+        self.assertEqual(job['errors'][0]['row'], 3)
+
+        todo = Task.objects.get(user=self.user, title='Write report, part 1')
+        self.assertEqual(todo.description, 'First line\nsecond line')
+        self.assertEqual(todo.priority, 'high')
+        self.assertEqual(todo.start_date, datetime(2030, 1, 1, 9, 0, tzinfo=dt_timezone.utc))
+        self.assertEqual(todo.due_date, datetime(2030, 1, 2, 17, 0, tzinfo=dt_timezone.utc))
+        event = Task.objects.get(user=self.user, title='Meeting')
+        self.assertTrue(event.is_completed)
+        self.assertEqual(event.priority, 'medium')
+        self.assertEqual(event.due_date, datetime(2030, 1, 5, 5, 0, tzinfo=dt_timezone.utc))
+
+    def test_failed_import_resumes_after_last_chunk(self):
+        rows = ['title,priority,due_date'] + [f'Task {i},low,2030-01-01 09:00' for i in range(10)]
+        job = ImportJob.objects.create(
+            user=self.user, name='tasks.csv', format='csv',
+            file=SimpleUploadedFile('tasks.csv', '\n'.join(rows).encode())
+        )
+
+        def crash(job):
+            if job.rows_done == 4:
+                raise RuntimeError("Connection lost")
+
+        with self.assertLogs('TaskSystemapp.imports', 'ERROR'):
+            run_import(job, chunk_size=2, progress=crash)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.rows_done, job.message), ('failed', 4, 'Connection lost'))
+        self.assertEqual(Task.objects.filter(user=self.user).count(), 4)
+
+        response = self.client.post(reverse('resume_import', args=[job.pk]))
+        self.assertEqual(response.json()['job']['status'], 'done')
+        titles = sorted(Task.objects.filter(user=self.user).values_list('title', flat=True))
+        self.assertEqual(titles, sorted(f'Task {i}' for i in range(10)))
+
+
+class TaskFeedTest(TestCase):
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(
+            username='feeduser',
+            email='feed@example.com',
+            phone='+123456789023',
+            password='testpass'
+        )
+        self.due = datetime(2030, 1, 2, 17, 0, tzinfo=dt_timezone.utc)
+        self.task = Task.objects.create(
+            user=self.user, title='Plan, review; ship', description='Line one\nline two',
+            priority='high', due_date=self.due
+        )
+        Task.objects.create(user=self.user, title='Done', priority='low', due_date=self.due, is_completed=True)
+        self.url = reverse('task_feed', args=[self.user.get_feed_token()])
+
+    def test_feed_renders_todos_with_alarms(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        self.assertTrue(response['Content-Type'].startswith('text/calendar'))
+        body = streamed_content(response).decode()
+        self.assertTrue(body.startswith('BEGIN:VCALENDAR\r\n'))
+        self.assertTrue(body.endswith('END:VCALENDAR\r\n'))
+        self.assertEqual(body.count('BEGIN:VTODO'), 2)
+        self.assertIn('SUMMARY:Plan\\, review\\; ship\r\n', body)
+        self.assertIn('DESCRIPTION:Line one\\nline two\r\n', body)
+        self.assertIn('DUE:20300102T170000Z\r\n', body)
+        self.assertIn('PRIORITY:1\r\n', body)
+        self.assertIn('STATUS:COMPLETED\r\n', body)
+        # Only the open task has an alarm, its reminder offset before the deadline
+        self.assertEqual(body.count('BEGIN:VALARM'), 1)
+        self.assertIn('TRIGGER;RELATED=END:-PT2H\r\n', body)
+        self.assertTrue(all(len(line.encode()) <= 75 for line in body.split('\r\n')))
+
+        events = streamed_content(self.client.get(self.url, {'as': 'events'})).decode()
+        self.assertEqual(events.count('BEGIN:VEVENT'), 2)
+        self.assertIn('DTEND:20300102T170000Z\r\n', events)
+
+    def test_recurring_task_in_local_time(self):
+        self.user.region = 'Europe/London'
+        self.user.save()
+        task = Task.objects.create(
+            user=self.user, title='Rent', due_date=datetime(2030, 1, 31, 9, 0, tzinfo=dt_timezone.utc),
+            recurrence='monthly', recurrence_interval=1
+        )
+        # February is completed, March (in summer time) skipped and April moved to 2 May
+        TaskOccurrence.objects.create(task=task, original_date=datetime(2030, 2, 28, 9, 0, tzinfo=dt_timezone.utc), is_completed=True)
+        TaskOccurrence.objects.create(task=task, original_date=datetime(2030, 3, 31, 8, 0, tzinfo=dt_timezone.utc), is_skipped=True)
+        TaskOccurrence.objects.create(
+            task=task, original_date=datetime(2030, 4, 30, 8, 0, tzinfo=dt_timezone.utc),
+            due_date=datetime(2030, 5, 2, 8, 0, tzinfo=dt_timezone.utc)
+        )
+        body = streamed_content(self.client.get(self.url)).decode().replace('\r\n ', '')
+        self.assertIn('X-WR-TIMEZONE:Europe/London\r\n', body)
+        self.assertIn('TZID:Europe/London\r\n', body)
+        self.assertIn('RRULE:FREQ=YEARLY;BYMONTH=3;BYDAY=-1SU\r\n', body)
+        self.assertIn('RRULE:FREQ=YEARLY;BYMONTH=10;BYDAY=-1SU\r\n', body)
+        self.assertIn('DTSTART;TZID=Europe/London:20300131T090000\r\nDUE;TZID=Europe/London:20300131T090000\r\n', body)
+        self.assertIn('RRULE:FREQ=MONTHLY;INTERVAL=1;BYMONTHDAY=28,29,30,31;BYSETPOS=-1\r\n', body)
+        self.assertIn('EXDATE;TZID=Europe/London:20300228T090000,20300331T090000\r\n', body)
+        self.assertIn('RECURRENCE-ID;TZID=Europe/London:20300430T090000\r\n', body)
+        self.assertIn('DUE;TZID=Europe/London:20300502T090000\r\n', body)
+        self.assertEqual(body.count(f'UID:task-{task.pk}@'), 2)
+        # Times of one-off tasks are local too
+        self.assertIn('DUE;TZID=Europe/London:20300102T170000\r\n', body)
+
+    def test_alarm_triggers(self):
+        self.assertEqual(format_trigger(timedelta(hours=2)), '-PT2H')
+        self.assertEqual(format_trigger(timedelta(days=1, minutes=30)), '-P1DT30M')
+        self.assertEqual(format_trigger(timedelta(days=2)), '-P2D')
+        self.assertEqual(format_trigger(timedelta(minutes=-15)), 'PT15M')
+        self.assertEqual(format_trigger(timedelta(0)), 'PT0S')
+
+    def test_unchanged_feed_is_not_modified(self):
+        response = self.client.get(self.url)
+        streamed_content(response)
+        with self.assertNumQueries(1):
+            response = self.client.get(self.url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)
+
+        response = self.client.get(self.url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+        self.assertEqual(response.status_code, 304)
+
+        self.task.title = 'Renamed'
+        self.task.save()
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 200)
+
+    def test_reset_token_revokes_old_link(self):
+        self.client.login(username='feeduser', password='testpass')
+        self.client.post(reverse('reset_feed_token'))
+        self.assertEqual(self.client.get(self.url).status_code, 404)
+        self.user.refresh_from_db()
+        self.assertEqual(self.client.get(reverse('task_feed', args=[self.user.feed_token])).status_code, 200)
+
+
+class AsgiApplicationTest(TestCase):
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(
+            username='asgiuser',
+            email='asgi@example.com',
+            phone='+123456789024',
+            password='testpass'
+        )
+        Task.objects.create(title='Async task', due_date=timezone.now() + timedelta(days=1), user=self.user)
+
+    async def test_http_is_routed_to_django(self):
+        communicator = HttpCommunicator(asgi_application, 'GET', '/TaskSystemapp/login/', headers=[(b'host', b'127.0.0.1')])
+        response = await communicator.get_response()
+        self.assertEqual(response['status'], 200)
+        self.assertIn(b'<form', response['body'])
+
+    async def test_async_views(self):
+        await self.async_client.aforce_login(self.user)
+        response = await self.async_client.get(reverse('home'))
+        self.assertContains(response, 'Async task')
+
+        today = timezone.localdate()
+        window = {'start': today.isoformat(), 'end': (today + timedelta(days=30)).isoformat()}
+        response = await self.async_client.get(reverse('task_events'), window)
+        self.assertTrue(response.is_async)
+        body = b''.join([chunk async for chunk in response.streaming_content])
+        self.assertEqual([event['title'] for event in json.loads(body)], ['Async task'])
+
+
+
+class BenchmarkCommandTest(TransactionTestCase):
+    # Live updates are published on commit, so the benchmark needs real commits
+    def seeded(self, prefix):
+        tasks = Task.objects.filter(user__username__startswith=prefix).order_by('user__username', 'id')
+        return list(tasks.values_list('title', 'priority', 'due_date', 'is_completed'))
+
+    def test_seed_is_deterministic(self):
+        call_command('seed_tasks', users=3, tasks=40, seed=7, prefix='seeda', stdout=StringIO())
+        call_command('seed_tasks', users=3, tasks=40, seed=7, prefix='seedb', stdout=StringIO())
+        first, second = self.seeded('seeda'), self.seeded('seedb')
+        self.assertEqual(len(first), 120)
+        # Same titles, priorities and completion; due dates only move if the hour changed in between
+        self.assertEqual([row[:2] + row[3:] for row in first], [row[:2] + row[3:] for row in second])
+        self.assertEqual({row[1] for row in first}, {'high', 'medium', 'low'})
+        user = CustomUser.objects.get(username='seeda00001')
+        self.assertTrue(user.check_password('bench'))
+
+        call_command('seed_tasks', users=2, tasks=5, prefix='seeda', clear=True, stdout=StringIO())
+        self.assertEqual(len(self.seeded('seeda')), 10)
+
+    def test_bench_endpoints_writes_results(self):
+        call_command('seed_tasks', users=2, tasks=50, stdout=StringIO())
+        output = tempfile.NamedTemporaryFile(suffix='.json', delete=False)
+        output.close()
+        self.addCleanup(os.unlink, output.name)
+        out = StringIO()
+        call_command('bench_endpoints', users=2, requests=6, concurrency=3, output=output.name, stdout=out)
+        with open(output.name) as f:
+            results = json.load(f)
+        self.assertEqual(set(results['endpoints']), {'home', 'home_search', 'quick_add', 'complete', 'events', 'websocket'})
+        for name, result in results['endpoints'].items():
+            self.assertEqual(result['errors'], 0, name)
+            self.assertEqual(result['requests'], 6)
+            self.assertGreater(result['queries'], 0)
+            self.assertLessEqual(result['p50_ms'], result['p99_ms'])
+        # Tasks added by the benchmark are removed again
+        self.assertEqual(Task.objects.filter(user__username__startswith='bench').count(), 100)
+
+        call_command('bench_endpoints', users=2, requests=2, endpoints='home', compare=output.name, stdout=out)
+        self.assertIn('Change against the earlier run', out.getvalue())
+
+
+class RequestTimingTest(TestCase):
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(
+            username='timinguser',
+            email='timing@example.com',
+            phone='+123456789025',
+            password='testpass'
+        )
+        Task.objects.create(title='Timed', due_date=timezone.now() + timedelta(days=1), user=self.user)
+        self.client.force_login(self.user)
+
+    def timings(self, response):
+        timings = {}
+        for entry in response['Server-Timing'].split(', '):
+            name, duration, *desc = entry.split(';')
+            timings[name] = (float(duration[len('dur='):]), desc)
+        return timings
+
+    def test_server_timing_header(self):
+        timings = self.timings(self.client.get(reverse('home')))
+        self.assertEqual(set(timings), {'db', 'tpl', 'total'})
+        queries = int(timings['db'][1][0].split('"')[1].split()[0])
+        self.assertGreater(queries, 0)
+        self.assertGreater(timings['tpl'][0], 0)
+        self.assertGreaterEqual(timings['total'][0], timings['db'][0] + timings['tpl'][0])
+
+    async def test_async_requests_count_queries(self):
+        await self.async_client.aforce_login(self.user)
+        response = await self.async_client.get(reverse('home'))
+        self.assertNotIn('desc="0 queries"', response['Server-Timing'])
+
+    def test_slow_requests_are_logged(self):
+        with mock.patch('TaskSystemapp.middleware.SLOW_REQUEST_MS', 0), \
+                self.assertLogs('TaskSystemapp.performance', 'WARNING') as logs:
+            self.client.get(reverse('home'))
+        record = logs.records[0].request_metrics
+        self.assertEqual((record['path'], record['status'], record['user_id']), (reverse('home'), 200, self.user.pk))
+        self.assertGreater(record['queries'], 0)
+
+    def test_profile_is_staff_only(self):
+        response = self.client.get(reverse('home'), {'_profile': '1'})
+        self.assertContains(response, 'Timed')
+        self.user.is_staff = True
+        self.user.save()
+        response = self.client.get(reverse('home'), HTTP_X_PROFILE='1')
+        self.assertEqual(response['Content-Type'], 'text/plain; charset=utf-8')
+        self.assertContains(response, 'function calls')
+        self.assertContains(response, 'cumulative')
+
+
+class DatabaseRoutingTest(TransactionTestCase):
+    @classmethod
+    def setUpClass(cls):
+        # A file copy of the test database stands in as the replica. As a test mirror it is not flushed between tests.
+        cls.replica_dir = tempfile.mkdtemp()
+        cls.replica_path = os.path.join(cls.replica_dir, 'replica.sqlite3')
+        connections.settings['replica'] = {
+            **connections['default'].settings_dict,
+            'NAME': cls.replica_path,
+            'TEST': {**connections['default'].settings_dict['TEST'], 'MIRROR': 'default'},
+        }
+        # Declared here rather than on the class: the test runner checks declared databases before this runs
+        cls.databases = {'default', 'replica'}
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        connections['replica'].close()
+        del connections['replica']
+        del connections.settings['replica']
+        shutil.rmtree(cls.replica_dir)
+
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(
+            username='replicauser',
+            email='replica@example.com',
+            phone='+123456789026',
+            password='testpass'
+        )
+        self.due = timezone.now() + timedelta(days=1)
+        Task.objects.create(title='Copied', due_date=self.due, user=self.user)
+        call_command('copy_replica', self.replica_path, stdout=StringIO())
+        self.client.force_login(self.user)
+
+    def test_sqlite_pragmas(self):
+        with connections['replica'].cursor() as cursor:
+            cursor.execute('PRAGMA journal_mode')
+            self.assertEqual(cursor.fetchone()[0], 'wal')
+            cursor.execute('PRAGMA synchronous')
+            self.assertEqual(cursor.fetchone()[0], 1)
+            cursor.execute('PRAGMA query_only')
+            self.assertEqual(cursor.fetchone()[0], 1)
+
+    def test_reads_use_replica_until_session_writes(self):
+        Task.objects.create(title='Only on primary', due_date=self.due, user=self.user)
+        with CaptureQueriesContext(connections['replica']) as replica_queries:
+            response = self.client.get(reverse('home'))
+        self.assertContains(response, 'Copied')
+        self.assertNotContains(response, 'Only on primary')
+        self.assertTrue(replica_queries.captured_queries)
+
+        # After a write the session reads its own writes from the primary
+        self.client.post(reverse('quick_add_task'), {'title': 'Just added', 'priority': 'low', 'due_date': '2030-01-01 09:00'})
+        with CaptureQueriesContext(connections['replica']) as replica_queries:
+            response = self.client.get(reverse('home'), {'start_date': '2029-12-31', 'end_date': '2030-01-02'})
+        self.assertContains(response, 'Just added')
+        self.assertEqual(replica_queries.captured_queries, [])
+
+    def test_writes_and_other_views_use_primary(self):
+        with CaptureQueriesContext(connections['replica']) as replica_queries:
+            self.client.post(reverse('quick_add_task'), {'title': 'Written', 'priority': 'low', 'due_date': '2030-01-01 09:00'})
+            self.client.get(reverse('profile'))
+        self.assertEqual(replica_queries.captured_queries, [])
+        self.assertTrue(Task.objects.filter(title='Written').exists())
+
+    def test_search_checks_the_replica_engine(self):
+        with CaptureQueriesContext(connections['replica']) as replica_queries:
+            with mock.patch.object(connections['default'], 'vendor', 'postgresql'):
+                response = self.client.get(reverse('home'), {'search': 'Copied'})
+        self.assertEqual(response.context['all_tasks'][0].title, 'Copied')
+        self.assertTrue(any(' MATCH ' in query['sql'] for query in replica_queries.captured_queries))
+
+
+class UserLocaleTest(TestCase):
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(
+            username='localeuser',
+            email='locale@example.com',
+            phone='+123456789027',
+            password='testpass',
+            region='Asia/Tokyo',
+            language='zh-hans'
+        )
+        # 00:30 on 1 March in Tokyo is still 28 February in UTC
+        Task.objects.create(
+            title='Tokyo morning', due_date=datetime(2025, 2, 28, 15, 30, tzinfo=dt_timezone.utc), user=self.user
+        )
+        self.client.force_login(self.user)
+
+    def march_first_events(self):
+        response = self.client.get(reverse('task_events'), {'start': '2025-03-01', 'end': '2025-03-02'})
+        return [event['title'] for event in json.loads(streamed_content(response))]
+
+    def test_user_locale_is_active_in_every_view(self):
+        self.assertEqual(self.march_first_events(), ['Tokyo morning'])
+        response = self.client.get(reverse('profile'))
+        self.assertEqual(response['Content-Language'], 'zh-hans')
+
+    def test_user_row_is_read_once(self):
+        for name in ('profile', 'home'):
+            with CaptureQueriesContext(connection) as queries:
+                self.client.get(reverse(name))
+            user_queries = [query for query in queries if 'FROM "TaskSystemapp_customuser"' in query['sql']]
+            self.assertEqual(len(user_queries), 1, name)
+
+    def test_locale_change_from_another_process_applies(self):
+        self.assertEqual(self.march_first_events(), ['Tokyo morning'])
+        # As another worker process would save it, without this process hearing of it
+        CustomUser.objects.filter(pk=self.user.pk).update(region='Europe/London', language='en')
+        self.assertEqual(self.march_first_events(), [])
+        self.assertEqual(self.client.get(reverse('profile'))['Content-Language'], 'en')
+
+    def test_profile_update_changes_locale(self):
+        self.assertEqual(self.march_first_events(), ['Tokyo morning'])
+        response = self.client.post(reverse('profile'), {
+            'username': 'localeuser', 'email': 'locale@example.com', 'phone': '+123456789027',
+            'region': 'Europe/London', 'language': 'en'
+        })
+        self.assertRedirects(response, reverse('profile'))
+        self.assertEqual(self.march_first_events(), [])
+        self.assertEqual(self.client.get(reverse('profile'))['Content-Language'], 'en')
+
+    def test_invalid_region_falls_back(self):
+        CustomUser.objects.filter(pk=self.user.pk).update(region='Mars/Olympus_Mons', language='xx')
+        self.client.post(reverse('profile'), {
+            'username': 'localeuser', 'email': 'locale@example.com', 'phone': '+123456789027',
+            'region': 'Mars/Olympus_Mons', 'language': ''
+        })
+        response = self.client.get(reverse('home'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Language'], 'en')
+        self.assertEqual(self.march_first_events(), [])
+
+
+class TaskArchiveTest(TestCase):
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(
+            username='archiveuser',
+            email='archive@example.com',
+            phone='+123456789028',
+            password='testpass'
+        )
+        self.client.force_login(self.user)
+        now = timezone.now()
+        old = now - timedelta(days=200)
+        self.old_done = [
+            Task.objects.create(title=f'Old report {i}', due_date=old, is_completed=True, user=self.user) for i in range(5)
+        ]
+        self.old_open = Task.objects.create(title='Old open report', due_date=old, user=self.user)
+        self.recent_done = Task.objects.create(
+            title='Recent report', due_date=now - timedelta(days=1), is_completed=True, user=self.user
+        )
+        Task.objects.filter(user=self.user).update(updated_at=old)
+        Task.objects.filter(pk=self.recent_done.pk).update(updated_at=now)
+
+    def test_archiver_moves_old_completed_tasks_in_chunks(self):
+        version = CustomUser.objects.get(pk=self.user.pk).tasks_version
+        with CaptureQueriesContext(connection) as queries:
+            call_command('archive_tasks', '--chunk-size', '2', stdout=StringIO())
+        inserts = [query for query in queries if query['sql'].startswith('INSERT INTO "TaskSystemapp_taskarchive"')]
+        self.assertEqual(len(inserts), 3)
+        self.assertEqual(
+            set(Task.objects.filter(user=self.user).values_list('pk', flat=True)), {self.old_open.pk, self.recent_done.pk}
+        )
+        self.assertEqual(
+            set(self.user.archived_tasks.values_list('task_id', flat=True)), {task.pk for task in self.old_done}
+        )
+        self.assertGreater(CustomUser.objects.get(pk=self.user.pk).tasks_version, version)
+
+    def test_archive_is_only_read_when_asked(self):
+        call_command('archive_tasks', stdout=StringIO())
+        response = self.client.get(reverse('home'), {'search': 'report'})
+        self.assertNotIn('Old report', response.content.decode())
+        response = self.client.get(reverse('task_archive'), {'search': 'report 3'})
+        self.assertEqual([task.title for task in response.context['archived_tasks']], ['Old report 3'])
+        response = self.client.get(reverse('task_archive'), {'page': 99999999999999999999})
+        self.assertEqual(response.context['page'], 1)
+        self.assertEqual(len(response.context['archived_tasks']), 5)
+
+    def test_restore_archived_task(self):
+        call_command('archive_tasks', stdout=StringIO())
+        task = self.old_done[0]
+        response = self.client.post(
+            reverse('restore_archived_task', args=[task.pk]), HTTP_X_REQUESTED_WITH='XMLHttpRequest'
+        )
+        self.assertEqual(response.json(), {'success': True, 'task_id': task.pk})
+        restored = Task.objects.get(pk=task.pk)
+        self.assertEqual((restored.title, restored.created_at, restored.is_completed), (task.title, task.created_at, True))
+        self.assertFalse(self.user.archived_tasks.filter(task_id=task.pk).exists())
+
+    def test_recurring_task_keeps_its_rule(self):
+        until = timezone.now() - timedelta(days=150)
+        task = self.old_done[1]
+        Task.objects.filter(pk=task.pk).update(recurrence='weekly', recurrence_interval=2, recurrence_until=until)
+        call_command('archive_tasks', stdout=StringIO())
+        restore_task(self.user.archived_tasks.get(task_id=task.pk))
+        restored = Task.objects.get(pk=task.pk)
+        self.assertEqual(
+            (restored.recurrence, restored.recurrence_interval, restored.recurrence_until), ('weekly', 2, until)
+        )
+
+
+class RecurringTaskTest(TestCase):
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(
+            username='recurringuser',
+            email='recurring@example.com',
+            phone='+123456789029',
+            password='testpass',
+            region='Europe/London'
+        )
+        self.client.force_login(self.user)
+        # 09:00 every day for five years, across the switch to summer time on 31 March 2030
+        self.task = Task.objects.create(
+            title='Stand-up', due_date=datetime(2030, 3, 28, 9, 0, tzinfo=dt_timezone.utc), user=self.user,
+            recurrence='daily', recurrence_until=datetime(2035, 3, 28, 9, 0, tzinfo=dt_timezone.utc)
+        )
+
+    def events(self):
+        response = self.client.get(reverse('task_events'), {'start': '2030-03-28', 'end': '2030-04-04'})
+        return json.loads(streamed_content(response))
+
+    def test_occurrences_are_expanded_in_the_window(self):
+        self.assertEqual(Task.objects.filter(user=self.user).count(), 1)
+        starts = [event['start'] for event in self.events()]
+        self.assertEqual(len(starts), 7)
+        self.assertEqual(starts[0], '2030-03-28T09:00:00+00:00')
+        self.assertEqual(starts[-1], '2030-04-03T09:00:00+01:00')
+        response = self.client.get(reverse('home'), {'start_date': '2030-03-28', 'end_date': '2030-04-03'})
+        self.assertEqual([task.pk for task in response.context['all_tasks']], [self.task.pk] * 7)
+
+    def test_events_merge_occurrences_by_deadline(self):
+        one_off = Task.objects.create(title='One-off', due_date=datetime(2030, 3, 30, 12, 0, tzinfo=dt_timezone.utc), user=self.user)
+        events = self.events()
+        self.assertEqual(len(events), 8)
+        self.assertEqual(events[3]['id'], one_off.pk)
+        self.assertEqual([event['start'] for event in events], sorted(event['start'] for event in events))
+        # A year of daily occurrences (279 of them from 28 March) is within the limit; longer windows are refused
+        response = self.client.get(reverse('task_events'), {'start': '2030-01-01', 'end': '2031-01-01'})
+        self.assertEqual(len(json.loads(streamed_content(response))), 279 + 1)
+        response = self.client.get(reverse('task_events'), {'start': '2030-01-01', 'end': '9999-12-31'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_complete_one_occurrence(self):
+        url = reverse('complete_task', args=[self.task.pk])
+        response = self.client.get(url, {'occurrence': '2030-03-30T09:00:00+00:00'}, HTTP_X_REQUESTED_WITH='XMLHttpRequest')
+        self.assertEqual(response.json(), {'success': True})
+        response = self.client.get(url, {'occurrence': '2030-03-30T10:00:00+00:00'}, HTTP_X_REQUESTED_WITH='XMLHttpRequest')
+        self.assertEqual(response.status_code, 400)
+        # An occurrence that cannot be read never completes the whole series
+        for value in ('garbage', '', '2030-03-30T09:00:00'):
+            response = self.client.get(url, {'occurrence': value}, HTTP_X_REQUESTED_WITH='XMLHttpRequest')
+            self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.task.occurrences.count(), 1)
+        self.assertFalse(Task.objects.get(pk=self.task.pk).is_completed)
+        colors = [event['color'] for event in self.events()]
+        self.assertEqual(colors.count('#4CAF50'), 1)
+        self.assertEqual(colors[2], '#4CAF50')
+
+    def test_skip_one_occurrence(self):
+        url = reverse('skip_occurrence', args=[self.task.pk])
+        self.assertEqual(self.client.get(url, {'occurrence': '2030-03-30T09:00:00+00:00'}).status_code, 405)
+        self.assertEqual(self.client.post(url).status_code, 400)
+        self.assertEqual(self.client.post(url, {'occurrence': '2030-03-30T10:00:00+00:00'}).status_code, 400)
+        response = self.client.post(url, {'occurrence': '2030-03-30T09:00:00+00:00'})
+        self.assertEqual(response.json(), {'success': True})
+        self.assertTrue(self.task.occurrences.get().is_skipped)
+        starts = [event['start'] for event in self.events()]
+        self.assertEqual(len(starts), 6)
+        self.assertNotIn('2030-03-30T09:00:00+00:00', starts)
+        response = self.client.get(reverse('home'), {'start_date': '2030-03-28', 'end_date': '2030-04-03'})
+        self.assertEqual(len(response.context['all_tasks']), 6)
+        self.assertFalse(Task.objects.get(pk=self.task.pk).is_completed)
+
+    def test_reschedule_one_occurrence(self):
+        url = reverse('reschedule_occurrence', args=[self.task.pk])
+        occurrence = '2030-03-30T09:00:00+00:00'
+        self.assertEqual(self.client.get(url, {'occurrence': occurrence}).status_code, 405)
+        self.assertEqual(self.client.post(url, {'due_date': '2030-04-02T20:00'}).status_code, 400)
+        response = self.client.post(url, {'occurrence': occurrence, 'due_date': 'soon'})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('due_date', response.json()['errors'])
+        self.assertFalse(self.task.occurrences.exists())
+        # The new deadline is read in the user's time zone, and the occurrence moves to its place among the others
+        response = self.client.post(url, {'occurrence': occurrence, 'due_date': '2030-04-02T20:00'})
+        self.assertTrue(response.json()['success'])
+        self.assertEqual(response.json()['task']['occurrence'], occurrence)
+        starts = [event['start'] for event in self.events()]
+        self.assertEqual(len(starts), 7)
+        self.assertNotIn(occurrence, starts)
+        self.assertEqual(starts[4:6], ['2030-04-02T09:00:00+01:00', '2030-04-02T19:00:00+00:00'])
+        response = self.client.get(reverse('home'), {'start_date': '2030-03-28', 'end_date': '2030-04-03'})
+        dues = [task.due_date for task in response.context['all_tasks']]
+        self.assertEqual(dues, sorted(dues))
+        self.assertIn(datetime(2030, 4, 2, 19, 0, tzinfo=dt_timezone.utc), dues)
+        # Rescheduling a skipped occurrence brings it back
+        self.client.post(reverse('skip_occurrence', args=[self.task.pk]), {'occurrence': occurrence})
+        self.assertEqual(len(self.events()), 6)
+        self.client.post(url, {'occurrence': occurrence, 'due_date': '2030-03-30T18:00'})
+        self.assertIn('2030-03-30T18:00:00+00:00', [event['start'] for event in self.events()])
+
+    def test_monthly_occurrences_keep_the_day(self):
+        task = Task(due_date=datetime(2030, 1, 31, 12, 0, tzinfo=dt_timezone.utc), recurrence='monthly', recurrence_interval=1)
+        start = datetime(2030, 1, 1, tzinfo=dt_timezone.utc)
+        days = [when.date().isoformat() for when in occurrences(task, start, start + timedelta(days=120), dt_timezone.utc)]
+        self.assertEqual(days, ['2030-01-31', '2030-02-28', '2030-03-31', '2030-04-30'])
+
+    def test_reminders_move_to_the_next_occurrence(self):
+        now = timezone.now().replace(microsecond=0)
+        task = Task.objects.create(title='Daily', due_date=now + timedelta(hours=3), recurrence='daily', user=self.user)
+        self.assertEqual(task.remind_at, now + timedelta(hours=1))
+        TaskOccurrence.objects.create(task=task, original_date=now + timedelta(days=1, hours=3), is_completed=True)
+        fired = []
+        scheduler = ReminderScheduler(handler=fired.extend, horizon=timedelta(days=3))
+        scheduler.run_once(now)
+        scheduler.run_once(now + timedelta(hours=1, seconds=1))
+        self.assertEqual([reminded.due_date for reminded in fired], [now + timedelta(hours=3)])
+        self.assertEqual(Task.objects.get(pk=task.pk).remind_at, now + timedelta(days=1, hours=1))
+        # The next occurrence was completed in advance, so its reminder is skipped
+        scheduler.run_once(now + timedelta(days=1, hours=1, seconds=1))
+        self.assertEqual(len(fired), 1)
+        self.assertEqual(Task.objects.get(pk=task.pk).remind_at, now + timedelta(days=2, hours=1))
+
+
+class CalendarSummaryTest(TestCase):
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(
+            username='summaryuser',
+            email='summary@example.com',
+            phone='+123456789030',
+            password='testpass',
+            region='Asia/Tokyo'
+        )
+        self.client.force_login(self.user)
+
+        def utc(day, hour, minute=0):
+            return datetime(2030, 3, day, hour, minute, tzinfo=dt_timezone.utc)
+
+        Task.objects.create(title='Early', priority='high', due_date=utc(4, 1), is_completed=True, user=self.user)
+        # 23:30 on 4 March in Tokyo
+        Task.objects.create(title='Late', priority='low', due_date=utc(4, 14, 30), user=self.user)
+        # 00:30 on 5 March in Tokyo, still 4 March in UTC
+        Task.objects.create(title='Next day', priority='low', due_date=utc(4, 15, 30), user=self.user)
+        Task.objects.create(title='Weekly', due_date=utc(5, 3), recurrence='weekly', user=self.user)
+
+    def summary(self, **params):
+        return self.client.get(reverse('calendar_summary'), {'start': '2030-03-01', 'end': '2030-04-01', **params})
+
+    def test_counts_per_local_day(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.summary()
+        grouped = [query for query in queries if 'GROUP BY' in query['sql']]
+        self.assertEqual(len(grouped), 1)
+        buckets = {bucket['date']: bucket for bucket in response.json()['buckets']}
+        self.assertEqual(list(buckets), ['2030-03-04', '2030-03-05', '2030-03-12', '2030-03-19', '2030-03-26'])
+        self.assertEqual((buckets['2030-03-04']['total'], buckets['2030-03-04']['completed']), (2, 1))
+        self.assertEqual(buckets['2030-03-04']['by_priority']['high'], {'open': 0, 'completed': 1})
+        self.assertEqual(buckets['2030-03-05']['by_priority'], {
+            'low': {'open': 1, 'completed': 0}, 'medium': {'open': 1, 'completed': 0}, 'high': {'open': 0, 'completed': 0}
+        })
+
+    def test_weekly_buckets_and_caching(self):
+        response = self.summary(by='week')
+        weeks = [(bucket['date'], bucket['total']) for bucket in response.json()['buckets']]
+        self.assertEqual(weeks, [('2030-03-04', 4), ('2030-03-11', 1), ('2030-03-18', 1), ('2030-03-25', 1)])
+        response = self.client.get(
+            reverse('calendar_summary'), {'start': '2030-03-01', 'end': '2030-04-01', 'by': 'week'},
+            HTTP_IF_NONE_MATCH=response['ETag']
+        )
+        self.assertEqual(response.status_code, 304)
+
+    def test_invalid_windows(self):
+        self.assertEqual(self.summary(by='month').status_code, 400)
+        self.assertEqual(self.summary(end='2035-01-01').status_code, 400)
+        self.assertEqual(self.client.get(reverse('calendar_summary')).status_code, 400)
+
+
+class SidebarPaginationTest(TestCase):
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(
+            username='pageuser',
+            email='page@example.com',
+            phone='+123456789031',
+            password='testpass'
+        )
+        self.client.force_login(self.user)
+        start = timezone.now().replace(microsecond=0) + timedelta(hours=1)
+        # Tasks sharing a deadline are ordered by id, so pages split ties without losing or repeating any
+        Task.objects.bulk_create([
+            Task(title=f'Task {n}', due_date=start + timedelta(hours=n // 3), user=self.user) for n in range(60)
+        ])
+        Task.objects.create(title='Daily', due_date=start + timedelta(minutes=30), recurrence='daily', user=self.user)
+
+    def page(self, cursor):
+        response = self.client.get(reverse('sidebar_tasks'), {'cursor': cursor})
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_pages_cover_the_window_once(self):
+        content = self.client.get(reverse('home')).content.decode()
+        self.assertEqual(content.count('data-due='), 50)
+        cursor = re.search(r'class="sidebar-more[^>]*data-cursor="([^"]+)"', content).group(1)
+        listed = re.findall(r'data-task-id="(\d+)" data-due="([^"]+)"(?: data-occurrence="([^"]+)")?', content)
+        seen = [(int(pk), occurrence or None) for pk, _, occurrence in listed]
+        data = self.page(cursor)
+        self.assertIsNone(data['next_cursor'])
+        seen += [(item['id'], item.get('occurrence')) for item in data['tasks']]
+        # 60 tasks and the daily task's 7 or 8 occurrences in the 8-day window, each once
+        self.assertEqual(len(seen), len(set(seen)))
+        self.assertEqual(len([item for item in seen if item[1] is None]), 60)
+        self.assertIn(len([item for item in seen if item[1]]), (7, 8))
+        keys = [(datetime.fromisoformat(item['due_date']), item['id']) for item in data['tasks']]
+        self.assertEqual(keys, sorted(keys))
+
+    def test_deep_page_starts_at_the_cursor(self):
+        task = Task.objects.filter(user=self.user, recurrence='').order_by('due_date', 'pk')[40]
+        with CaptureQueriesContext(connection) as queries:
+            data = self.page(encode_cursor(task))
+        listed = [item for item in data['tasks'] if 'occurrence' not in item]
+        self.assertEqual(len(listed), 19)
+        self.assertTrue(all((datetime.fromisoformat(item['due_date']), item['id']) > (task.due_date, task.pk) for item in listed))
+        page_query = [query['sql'] for query in queries.captured_queries if 'ORDER BY' in query['sql']][-1]
+        plan = ' '.join(str(row) for row in connection.cursor().execute('EXPLAIN QUERY PLAN ' + page_query).fetchall())
+        self.assertIn('due_date>?', plan.replace(' ', ''))
+
+    def test_recurring_task_pages_through_a_year(self):
+        # The only recurring task, so every page after the first is filled by its occurrences alone
+        Task.objects.filter(user=self.user, recurrence='daily').delete()
+        daily = Task.objects.create(
+            title='Year', due_date=datetime(2031, 1, 1, 9, 0, tzinfo=dt_timezone.utc), recurrence='daily',
+            recurrence_until=datetime(2031, 12, 31, 9, 0, tzinfo=dt_timezone.utc), user=self.user
+        )
+        window = {'start_date': '2031-01-01', 'end_date': '2031-12-31'}
+        content = self.client.get(reverse('home'), window).content.decode()
+        seen = re.findall(rf'data-task-id="{daily.pk}" data-due="[^"]+" data-occurrence="([^"]+)"', content)
+        self.assertTrue(seen)
+        cursor = re.search(r'class="sidebar-more[^>]*data-cursor="([^"]+)"', content).group(1)
+        pages = 1
+        while cursor:
+            response = self.client.get(reverse('sidebar_tasks'), {**window, 'cursor': cursor})
+            data = response.json()
+            seen += [item['occurrence'] for item in data['tasks'] if item['id'] == daily.pk]
+            cursor = data['next_cursor']
+            pages += 1
+        self.assertGreater(pages, 2)
+        self.assertEqual(len(seen), 365)
+        self.assertEqual(len(set(seen)), 365)
+
+    def test_invalid_cursor(self):
+        for cursor in ('', 'abc', '12-x', '99999999999999999999999-1'):
+            response = self.client.get(reverse('sidebar_tasks'), {'cursor': cursor})
+            self.assertEqual(response.status_code, 400)
+
+
+class FailingSMSBackend(sms.BaseSMSBackend):
+    def send_messages(self, messages):
+        raise ConnectionError('Provider unavailable')
+
+
+@override_settings(SMS_BACKEND='TaskSystemapp.sms.LocmemSMSBackend')
+class NotificationTest(TestCase):
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(
+            username='notifyuser',
+            email='notify@example.com',
+            phone='+123456789032',
+            password='testpass'
+        )
+        # Later than the notifications the test queues
+        self.now = timezone.now() + timedelta(seconds=5)
+        del sms.outbox[:]
+
+    def queue(self, count):
+        tasks = [
+            Task.objects.create(title=f'Task {n}', due_date=self.now + timedelta(hours=2), user=self.user)
+            for n in range(count)
+        ]
+        queue_reminders(Task.objects.filter(pk__in=[task.pk for task in tasks]).select_related('user').order_by('pk'))
+
+    def test_fired_reminders_are_sent_by_email_and_sms(self):
+        task = Task.objects.create(title='Call back', due_date=self.now + timedelta(minutes=90), user=self.user)
+        ReminderScheduler(handler=queue_reminders).run_once(self.now)
+        self.assertEqual(Notification.objects.filter(task=task, status='pending').count(), 2)
+        DeliveryWorker().run_once()
+        self.assertEqual([message.to for message in mail.outbox], [['notify@example.com']])
+        self.assertEqual(mail.outbox[0].subject, 'Reminder: Call back')
+        self.assertEqual([message.to for message in sms.outbox], ['+123456789032'])
+        self.assertEqual(Notification.objects.filter(status='sent').count(), 2)
+
+    def test_digest_and_rate_limit(self):
+        self.queue(3)
+        worker = DeliveryWorker(rate_limit=(1, 3600))
+        worker.run_once(self.now)
+        # One email and one text message for the three reminders
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].subject, '3 task reminders')
+        self.assertEqual(mail.outbox[0].body.count('is due'), 3)
+        self.assertEqual(len(sms.outbox), 1)
+        self.assertEqual(Notification.objects.filter(status='sent').count(), 2)
+        self.assertEqual(Notification.objects.filter(status='merged').count(), 4)
+
+        self.queue(1)
+        worker.run_once(self.now + timedelta(minutes=1))
+        self.assertEqual(len(mail.outbox), 1)
+        waiting = Notification.objects.filter(status='pending')
+        self.assertEqual(waiting.count(), 2)
+        self.assertTrue(all(notification.next_attempt_at == self.now + timedelta(hours=1) for notification in waiting))
+        worker.run_once(self.now + timedelta(hours=1, seconds=1))
+        self.assertEqual(len(mail.outbox), 2)
+
+    @override_settings(SMS_BACKEND='TaskSystemapp.tests.FailingSMSBackend', NOTIFICATION_RETRY_DELAY=60)
+    def test_failures_back_off_then_dead_letter(self):
+        self.queue(1)
+        worker = DeliveryWorker(max_attempts=3)
+        worker.run_once(self.now)
+        self.assertEqual(len(mail.outbox), 1)
+        failed = Notification.objects.get(channel='sms')
+        self.assertEqual((failed.status, failed.attempts), ('pending', 1))
+        self.assertIn('Provider unavailable', failed.last_error)
+        self.assertTrue(self.now + timedelta(seconds=30) <= failed.next_attempt_at <= self.now + timedelta(seconds=60))
+        retried = failed.next_attempt_at
+        worker.run_once(retried)
+        failed.refresh_from_db()
+        self.assertEqual(failed.attempts, 2)
+        # The delay doubles after each failure
+        self.assertTrue(retried + timedelta(seconds=60) <= failed.next_attempt_at <= retried + timedelta(seconds=120))
+        worker.run_once(failed.next_attempt_at)
+        failed.refresh_from_db()
+        self.assertEqual((failed.status, failed.attempts), ('dead', 3))
+        call_command('deliver_notifications', retry_dead=True, stdout=StringIO())
+        self.assertEqual(Notification.objects.get(pk=failed.pk).status, 'pending')
+
+
+class TaskWidgetTest(TestCase):
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(
+            username='widgetuser',
+            email='widget@example.com',
+            phone='+123456789033',
+            password='testpass'
+        )
+        self.client.force_login(self.user)
+        Task.objects.create(title='Soon', due_date=timezone.now() + timedelta(days=1), user=self.user)
+        Task.objects.create(title='Later', due_date=timezone.now() + timedelta(days=30), user=self.user)
+
+    def task_queries(self, **headers):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('task_widget'), {'format': 'json'}, headers=headers)
+        return response, [q['sql'] for q in queries.captured_queries if '"TaskSystemapp_task"' in q['sql']]
+
+    def test_only_upcoming_tasks_are_queried(self):
+        response, queries = self.task_queries()
+        self.assertEqual([task['title'] for task in response.json()['tasks']], ['Soon'])
+        # The upcoming tasks, and the recurring ones to expand
+        self.assertEqual(len(queries), 2)
+        self.assertIn('no-cache', response['Cache-Control'])
+        self.assertIn('private', response['Cache-Control'])
+        # Polling an unchanged list touches neither the tasks nor the body
+        response, queries = self.task_queries(if_none_match=response['ETag'])
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(queries, [])
+
+        page = self.client.get(reverse('task_widget'))
+        self.assertContains(page, 'Soon')
+        self.assertNotContains(page, 'Later')
+        self.assertRedirects(self.client.get(reverse('home'), {'widget_mode': 1}), reverse('task_widget'))
+
+    def test_task_change_updates_the_etag(self):
+        etag = self.client.get(reverse('task_widget'), {'format': 'json'})['ETag']
+        Task.objects.create(title='Sooner', due_date=timezone.now() + timedelta(hours=3), user=self.user)
+        response, _ = self.task_queries(if_none_match=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([task['title'] for task in response.json()['tasks']], ['Sooner', 'Soon'])
+
+    async def test_long_poll_returns_on_change(self):
+        await self.async_client.aforce_login(self.user)
+        url = reverse('task_widget')
+        etag = (await self.async_client.get(url, {'format': 'json'}))['ETag']
+        response = await self.async_client.get(url, {'format': 'json', 'wait': 0.2}, headers={'if-none-match': etag})
+        self.assertEqual(response.status_code, 304)
+
+        async def change():
+            await asyncio.sleep(0.2)
+            await Task.objects.acreate(title='Pushed', due_date=timezone.now() + timedelta(hours=1), user=self.user)
+            await get_channel_layer().group_send(user_group(self.user.pk), {'type': 'task.update', 'changes': []})
+
+        started = time.monotonic()
+        response, _ = await asyncio.gather(
+            self.async_client.get(url, {'format': 'json', 'wait': 20}, headers={'if-none-match': etag}), change()
+        )
+        self.assertLess(time.monotonic() - started, 10)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['tasks'][0]['title'], 'Pushed')
+
+
+class TaskPriorityTest(TestCase):
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(
+            username='priorityuser',
+            email='priority@example.com',
+            phone='+123456789034',
+            password='testpass'
+        )
+        self.client.force_login(self.user)
+
+    def test_names_outside_codes_inside(self):
+        task = Task.objects.create(title='Urgent', priority='high', due_date=timezone.now() + timedelta(days=1), user=self.user)
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT priority FROM "TaskSystemapp_task" WHERE id = %s', [task.pk])
+            self.assertEqual(cursor.fetchone()[0], 1)
+        self.assertEqual(Task.objects.get(priority='high').priority, 'high')
+        self.assertEqual(list(Task.objects.values_list('priority', flat=True)), ['high'])
+        response = self.client.post(reverse('quick_add_task'), {'title': 'Later', 'priority': 'low', 'due_date': '2030-01-01 09:00'})
+        self.assertEqual(Task.objects.get(pk=response.json()['task_id']).priority, 'low')
+        response = self.client.post(reverse('quick_add_task'), {'title': 'Bad', 'priority': 'urgent', 'due_date': '2030-01-01 09:00'})
+        self.assertIn('priority', response.json()['errors'])
+
+    def test_widget_lists_most_urgent_first_from_the_index(self):
+        now = timezone.now()
+        for n, priority in enumerate(['low', 'high', 'medium', 'high'] * 4):
+            Task.objects.create(title=f'{priority} {n}', priority=priority, due_date=now + timedelta(hours=n + 1), user=self.user)
+        Task.objects.create(title='Daily', priority='high', due_date=now + timedelta(minutes=30), recurrence='daily', user=self.user)
+        with CaptureQueriesContext(connection) as queries:
+            tasks = self.client.get(reverse('task_widget'), {'format': 'json'}).json()['tasks']
+        self.assertEqual(len(tasks), 10)
+        self.assertEqual([task['priority'] for task in tasks], ['high'] * 10)
+        # Occurrences of the daily task are merged in deadline order
+        self.assertEqual(tasks[0]['title'], 'Daily')
+        self.assertEqual(tasks, sorted(tasks, key=lambda task: task['due_date']))
+        if connection.vendor == 'sqlite':
+            listed = next(q['sql'] for q in queries.captured_queries if 'ORDER BY' in q['sql'] and 'LIMIT' in q['sql'])
+            plan = ' '.join(row[-1] for row in connection.cursor().execute('EXPLAIN QUERY PLAN ' + listed).fetchall())
+            self.assertIn('task_user_priority_idx', plan)
+            self.assertNotIn('TEMP B-TREE', plan)
+
+
+class StaticAssetTest(TestCase):
+    def setUp(self):
+        static_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, static_root)
+        settings_override = override_settings(STATIC_ROOT=static_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        call_command('collectstatic', interactive=False, verbosity=0)
+        self.user = CustomUser.objects.create_user(
+            username='staticuser',
+            email='static@example.com',
+            phone='+123456789035',
+            password='testpass'
+        )
+        self.client.force_login(self.user)
+
+    def test_home_links_hashed_names(self):
+        content = self.client.get(reverse('home')).content.decode()
+        match = re.search(r'href="/static/(css/home\.[0-9a-f]{12}\.css)"', content)
+        self.assertIsNotNone(match)
+        self.assertRegex(content, r'src="/static/js/home\.[0-9a-f]{12}\.js"')
+
+        response = self.client.get('/static/' + match.group(1))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Cache-Control'], 'public, max-age=31536000, immutable')
+        self.assertIn('Accept-Encoding', response['Vary'])
+        self.assertNotIn('Content-Encoding', response)
+        self.assertTrue(response['Content-Type'].startswith('text/css'))
+        body = b''.join(response.streaming_content)
+
+        response = self.client.get('/static/' + match.group(1), headers={'accept-encoding': 'gzip, deflate, br;q=0'})
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(gzip.decompress(b''.join(response.streaming_content)), body)
+
+    def test_plain_names_are_revalidated(self):
+        response = self.client.get('/static/js/home.js', headers={'accept-encoding': 'gzip'})
+        self.assertEqual(response['Cache-Control'], 'public, no-cache')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        response.close()
+        response = self.client.get('/static/js/home.js', headers={'if-modified-since': response['Last-Modified']})
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(self.client.get('/static/js/missing.js').status_code, 404)
+        self.assertEqual(self.client.get('/static/../manage.py').status_code, 404)
+
+    async def test_async_stack_streams_the_file_asynchronously(self):
+        response = await self.async_client.get('/static/js/home.js', headers={'accept-encoding': 'gzip'})
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.is_async)
+        body = b''.join([chunk async for chunk in response.streaming_content])
+        with open(os.path.join(settings.STATIC_ROOT, 'js', 'home.js.gz'), 'rb') as f:
+            self.assertEqual(body, f.read())
+        self.assertEqual(response['Content-Length'], str(len(body)))
+
+    def test_bench_static_reports_savings(self):
+        out = StringIO()
+        call_command('bench_static', host='testserver', stdout=out)
+        self.assertIn('0 with hashed names', out.getvalue())
+
+
+class TaskStatusCountsTest(TestCase):
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(
+            username='countsuser',
+            email='counts@example.com',
+            phone='+123456789036',
+            password='testpass'
+        )
+        self.client.force_login(self.user)
+        self.now = timezone.now()
+        for title, priority, due, completed in [
+            ('Late', 'high', -timedelta(hours=1), False),
+            ('Done', 'high', -timedelta(days=2), True),
+            ('Soon', 'medium', timedelta(days=1), False),
+            ('Edge', 'low', timedelta(days=7, hours=-1), False),
+            ('Far', 'low', timedelta(days=7, hours=1), False),
+        ]:
+            Task.objects.create(title=title, priority=priority, due_date=self.now + due, is_completed=completed, user=self.user)
+
+    def test_status_is_annotated_against_one_time(self):
+        tasks = {task.title: task for task in Task.objects.with_status(self.now)}
+        self.assertEqual(
+            {title: task.status for title, task in tasks.items()},
+            {'Late': 'overdue', 'Done': 'completed', 'Soon': 'expiring', 'Edge': 'expiring', 'Far': 'normal'},
+        )
+        # The properties read the annotation, and agree with the SQL at the edges
+        self.assertTrue(tasks['Edge'].is_expiring_soon)
+        self.assertFalse(tasks['Far'].is_expiring_soon)
+        self.assertTrue(tasks['Late'].is_overdue)
+        self.assertFalse(Task.objects.get(title='Done').is_overdue)
+        self.assertEqual(list(Task.objects.with_status(self.now).filter(status='overdue')), [tasks['Late']])
+
+    def test_counts_in_one_query(self):
+        Task.objects.create(title='Other', due_date=self.now, user=CustomUser.objects.create_user(
+            username='countsother', email='countsother@example.com', phone='+123456789037'
+        ))
+        with self.assertNumQueries(1):
+            counts = Task.objects.filter(user=self.user).status_counts(self.now)
+        self.assertEqual(counts['total'], 5)
+        self.assertEqual(counts['open'], 4)
+        self.assertEqual(counts['status'], {'completed': 1, 'overdue': 1, 'expiring': 2, 'normal': 1})
+        self.assertEqual(counts['priority']['high'], {'completed': 1, 'overdue': 1, 'expiring': 0, 'normal': 0})
+        self.assertEqual(counts['priority']['low']['expiring'], 1)
+
+    def test_header_and_endpoint(self):
+        Task.objects.create(title='Daily', due_date=self.now + timedelta(hours=2), recurrence='daily', user=self.user)
+        response = self.client.get(reverse('home'))
+        self.assertContains(response, '<span data-count="overdue">1</span> overdue', html=False)
+        # The recurring task counts as its occurrences over the next seven days
+        self.assertEqual(response.context['task_counts']['status']['expiring'], 9)
+
+        counts = self.client.get(reverse('task_status_counts')).json()
+        self.assertEqual(counts, json.loads(json.dumps(response.context['task_counts'])))
+        Task.objects.filter(title='Late').update(is_completed=True)
+        Task.objects.get(title='Soon').save()
+        counts = self.client.get(reverse('task_status_counts')).json()
+        self.assertEqual(counts['status']['overdue'], 0)
+        self.assertEqual(counts['status']['completed'], 2)
+
+
+class SQLiteChannelLayerTest(TestCase):
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        self.path = os.path.join(directory, 'channels.sqlite3')
+
+    def layer(self, **config):
+        # Each instance stands for a worker process: it only receives on the channels it made
+        return SQLiteChannelLayer(path=self.path, poll_interval=0.005, **config)
+
+    async def test_group_send_reaches_other_processes(self):
+        first, second = self.layer(), self.layer()
+        local, remote = await first.new_channel(), await second.new_channel()
+        await first.group_add('tasks.user.1', local)
+        await second.group_add('tasks.user.1', remote)
+        await first.group_send('tasks.user.1', {'type': 'task.update', 'changes': [{'op': 'delete', 'id': 1}], 'raw': b'\x00'})
+        self.assertEqual((await first.receive(local))['changes'], [{'op': 'delete', 'id': 1}])
+        message = await asyncio.wait_for(second.receive(remote), 2)
+        self.assertEqual(message['raw'], b'\x00')
+
+        await second.group_discard('tasks.user.1', remote)
+        await first.group_send('tasks.user.1', {'type': 'task.update', 'changes': []})
+        with self.assertRaises(asyncio.TimeoutError):
+            await asyncio.wait_for(second.receive(remote), 0.1)
+        await first.close()
+        await second.close()
+
+    def test_threads_share_one_connection(self):
+        layer = self.layer()
+        with mock.patch('TaskSystemapp.layers.sqlite3.connect', wraps=sqlite3.connect) as connect:
+            async_to_sync(layer.group_add)('tasks.user.3', async_to_sync(layer.new_channel)())
+            # Each call runs on a new thread, as publish_task_changes does after every commit
+            for n in range(20):
+                async_to_sync(layer.group_send)('tasks.user.3', {'type': 'task.update', 'n': n})
+        self.assertEqual(connect.call_count, 1)
+        async_to_sync(layer.close)()
+        self.assertIsNone(layer._db)
+
+    async def test_queues_are_bounded_and_expire(self):
+        sender, receiver = self.layer(capacity=2, expiry=0.2), self.layer(capacity=2, expiry=0.2)
+        channel = await receiver.new_channel()
+        await receiver.group_add('tasks.user.2', channel)
+        await sender.send(channel, {'type': 'one'})
+        await sender.send(channel, {'type': 'two'})
+        with self.assertRaises(ChannelFull):
+            await sender.send(channel, {'type': 'three'})
+        # A full member is skipped by group sends
+        await sender.group_send('tasks.user.2', {'type': 'skipped'})
+        self.assertEqual([(await receiver.receive(channel))['type'] for _ in range(2)], ['one', 'two'])
+
+        await sender.send(channel, {'type': 'stale'})
+        await asyncio.sleep(0.3)
+        await sender.send(await sender.new_channel(), {'type': 'purges'})
+        await sender.group_send('tasks.user.2', {'type': 'late'})
+        # The unreceived message expired, which also took the channel out of its group
+        with self.assertRaises(asyncio.TimeoutError):
+            await asyncio.wait_for(receiver.receive(channel), 0.1)
+        await sender.close()
+        await receiver.close()
+
+    def test_bench_channel_layer(self):
+        out = StringIO()
+        call_command('bench_channel_layer', workers=1, receivers=1, messages=20, stdout=out)
+        rows = {tuple(line.split()[:2]): line.split() for line in out.getvalue().splitlines()[1:]}
+        self.assertEqual(rows['sqlite', '1+1'][2:4], ['20', '20'])
+        self.assertEqual(rows['inmemory', '1'][2:4], ['20', '20'])
+        # The in-memory layer cannot reach the other process
+        self.assertEqual(rows['inmemory', '1+1'][3], '0')
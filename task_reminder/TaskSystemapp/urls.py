@@ -1,15 +1,32 @@
 from django.urls import path
-from .views import custom_login, register,home,quick_add_task,detailed_add_task,delete_task,profile,complete_task, custom_logout
+from .views import custom_login, register,home,quick_add_task,detailed_add_task,delete_task,profile,complete_task, custom_logout, task_events, batch_add_tasks, batch_complete_tasks, batch_delete_tasks, import_tasks, import_status, resume_import, task_feed, reset_feed_token, task_archive, restore_archived_task, calendar_summary, sidebar_tasks, task_widget, task_status_counts, skip_occurrence, reschedule_occurrence
 from django.conf import settings          # Import settings
 from django.conf.urls.static import static  # Importing static file handlers
 urlpatterns = [
     path('login/', custom_login, name='login'),
     path('register/', register, name='register'),
     path('home/', home, name='home'),
+    path('home/tasks/', sidebar_tasks, name='sidebar_tasks'),
+    path('home/counts/', task_status_counts, name='task_status_counts'),
+    path('widget/', task_widget, name='task_widget'),
+    path('events/', task_events, name='task_events'),
+    path('events/summary/', calendar_summary, name='calendar_summary'),
     path('quick-add/', quick_add_task, name='quick_add_task'),
     path('detailed-add/', detailed_add_task, name='detailed_add_task'),
     path('delete-task/<int:task_id>/', delete_task, name='delete_task'),
      path('profile/', profile, name='profile'),
     path('complete-task/<int:task_id>/', complete_task, name='complete_task'),
+    path('skip-occurrence/<int:task_id>/', skip_occurrence, name='skip_occurrence'),
+    path('reschedule-occurrence/<int:task_id>/', reschedule_occurrence, name='reschedule_occurrence'),
      path('logout/', custom_logout, name='logout'),
+    path('batch/add/', batch_add_tasks, name='batch_add_tasks'),
+    path('batch/complete/', batch_complete_tasks, name='batch_complete_tasks'),
+    path('batch/delete/', batch_delete_tasks, name='batch_delete_tasks'),
+    path('import/', import_tasks, name='import_tasks'),
+    path('import/<int:job_id>/', import_status, name='import_status'),
+    path('import/<int:job_id>/resume/', resume_import, name='resume_import'),
+    path('feed/<str:token>/tasks.ics', task_feed, name='task_feed'),
+    path('profile/feed/reset/', reset_feed_token, name='reset_feed_token'),
+    path('archive/', task_archive, name='task_archive'),
+    path('archive/<int:task_id>/restore/', restore_archived_task, name='restore_archived_task'),
 ]
\ No newline at end of file
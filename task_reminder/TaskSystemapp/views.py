@@ -1,11 +1,65 @@
+import asyncio
+import hashlib
+import heapq
+import json
+from asgiref.sync import sync_to_async
+from channels.layers import get_channel_layer
+import operator
+from functools import reduce
 from django.contrib.auth import authenticate, login, logout
+from django.contrib.auth.decorators import login_required
 from django.shortcuts import render, redirect, get_object_or_404
-from django.http import JsonResponse
-from datetime import timedelta, datetime
+from django.urls import reverse
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
+from django.db import transaction
+from django.db.models import Case, F, Q, TextField, Value, When
+from django.http import Http404, HttpResponse, JsonResponse, StreamingHttpResponse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.dateparse import parse_datetime
+from django.utils.http import http_date, parse_etags, quote_etag
+from datetime import date, timedelta, datetime, time, timezone as dt_timezone
 from django.utils import timezone, translation
-from django.conf import settings
-from .forms import LoginForm, RegisterForm, QuickTaskForm, DetailedTaskForm, UserUpdateForm
-from .models import Task, CustomUser
+from .forms import (
+    LoginForm, RegisterForm, QuickTaskForm, DetailedTaskForm, RescheduleOccurrenceForm, UserUpdateForm, json_type_errors
+)
+from .models import Task, TaskArchive, TaskOccurrence, CustomUser, ImportJob, PRIORITY_CODES, SOON_EXPIRING, task_status
+from .archive import restore_task
+from .locales import user_timezone
+from .recurrence import expand, is_occurrence, iter_expand
+from .imports import import_format, import_job_status, run_import
+from .cache import EVENTS_TIMEOUT, HOME_FRAGMENT_TIMEOUT, WIDGET_TIMEOUT, cache_stream, task_cache, task_cache_key, task_validators
+from .realtime import publish_task_changes, task_diff, user_group
+from .signals import batch_task_changes, bump_task_version
+from .search import count_search_results, search_tasks
+from .summary import task_counts, task_summary
+from .routers import read_from_replica
+from .feed import FEED_CHUNK_SIZE, feed_overrides, feed_rows, stream_calendar
+
+# Number of search results shown per page
+SEARCH_PAGE_SIZE = 20
+# Number of tasks per page of the sidebar's date window
+SIDEBAR_PAGE_SIZE = 50
+# Longest time a widget's long poll is held open, in seconds
+WIDGET_MAX_WAIT = 25
+# Most urgent tasks shown in a widget
+WIDGET_LIMIT = 10
+# Columns of the listed tasks
+LIST_COLUMNS = ('id', 'title', 'priority', 'due_date', 'is_completed', 'recurrence', 'recurrence_interval', 'recurrence_until')
+EPOCH = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+# Most tasks or ids accepted by one batch request, and rows per INSERT within it
+BATCH_LIMIT = 5000
+BATCH_CHUNK_SIZE = 500
+# Batch items with any of these are validated by the detailed add form
+DETAILED_FIELDS = [field for field in DetailedTaskForm.Meta.fields if field not in QuickTaskForm.Meta.fields]
+# Rows fetched from the database (and events written) per chunk of the streamed events feed
+EVENTS_CHUNK_SIZE = 500
+# Number of archived tasks shown per page
+ARCHIVE_PAGE_SIZE = 50
+# Longest window of the calendar summary, enough for a year view with its neighbouring weeks
+SUMMARY_MAX_RANGE = timedelta(days=400)
+# Longest window of the calendar events, which lists each occurrence of a recurring task
+EVENTS_MAX_RANGE = timedelta(days=400)
 
 def custom_login(request):
     """
@@ -44,116 +98,582 @@ def register(request):
     return render(request, 'TaskSystemapp/register.html', {'form': form})
 
 
-def home(request):
+def parse_date(date_str):
+    """
+    Parses a YYYY-MM-DD URL parameter, returning None if it is missing or invalid.
+    """
+    try:
+        return datetime.strptime(date_str, "%Y-%m-%d").date()
+    except (TypeError, ValueError):
+        return None
+
+
+def window_dates(request, now):
+    """
+    The sidebar's date window: the start_date and end_date parameters, or today and the week after it.
+    """
+    start_date = parse_date(request.GET.get('start_date'))
+    end_date = parse_date(request.GET.get('end_date'))
+    if not start_date or not end_date:
+        start_date = timezone.localdate(now)
+        end_date = start_date + timedelta(days=7)
+    return start_date, end_date
+
+
+def local_day_range(start_date, end_date):
+    """
+    Converts an inclusive range of dates in the active time zone into half-open [start, end) datetimes.
+    The first and last representable dates leave that side open, as the bounds would not fit in a datetime.
+    """
+    if start_date == date.min:
+        start = datetime.min.replace(tzinfo=dt_timezone.utc)
+    else:
+        start = timezone.make_aware(datetime.combine(start_date, time.min))
+    if end_date == date.max:
+        end = datetime.max.replace(tzinfo=dt_timezone.utc)
+    else:
+        end = timezone.make_aware(datetime.combine(end_date + timedelta(days=1), time.min))
+    return start, end
+
+
+@login_required
+@read_from_replica
+async def home(request):
     """
     Home view:
-    - Synchronise user's time zone and language settings
     - Filter tasks based on start_date, end_date and search criteria in URL parameters
     - Get the list of tasks in the sidebar, upcoming tasks, and selected tasks
     - Pass each form object to the template for rendering.
+    The upcoming, recurring and selected tasks are fetched with a single projected query and split up here,
+    with ordering and status flags computed once against the same current time. The date window is a second
+    query returning its first keyset page; the sidebar loads the rest as it is scrolled.
+    The header counts tasks by status (task_counts), cached alongside the fragments.
+    The view is async, so a worker serves other requests while it waits on the cache and the database.
+    Dates are shown in the user's time zone and language, activated by UserLocaleMiddleware.
+    Widget windows opened with ?widget_mode=1 are sent to the lighter task_widget view.
     """
-    user = request.user
-    if user.is_authenticated:
-        # Get up-to-date user information and ensure that time zones and language settings are synchronised
-        user = CustomUser.objects.get(pk=user.pk)
-
-    # Synchronise user time zone and language settings
-    if user.is_authenticated and user.region:
-        try:
-            timezone.activate(user.region)
-        except Exception:
-            timezone.deactivate()
-    if user.is_authenticated and hasattr(user, 'language'):
-        translation.activate(user.language)
-    else:
-        translation.activate(settings.LANGUAGE_CODE)
+    if request.GET.get('widget_mode'):
+        return redirect('task_widget')
+    user = await request.auser()
 
     current_time = timezone.now()
     search_query = request.GET.get('search', '').strip()
 
-    # Parses the date parameter passed in the URL
-    start_date_str = request.GET.get('start_date')
-    end_date_str = request.GET.get('end_date')
-    def parse_date(date_str):
-        try:
-            return datetime.strptime(date_str, "%Y-%m-%d").date()
-        except Exception:
-            return None
+    start_date, end_date = window_dates(request, current_time)
 
-    start_date = parse_date(start_date_str)
-    end_date = parse_date(end_date_str)
-    if not start_date or not end_date:
-        start_date = current_time.date()
-        end_date = current_time.date() + timedelta(days=7)
-
-    # Filter tasks for the current user within a specified date range
-    user_tasks = Task.objects.filter(
-        user=user,
-        due_date__date__gte=start_date,
-        due_date__date__lte=end_date
+    # Tasks for the current user within the specified date range.
+    # Half-open datetime bounds keep due_date bare, so this is a range scan on (user, due_date).
+    range_start, range_end = local_day_range(start_date, end_date)
+    # Tasks that are about to expire (current time up to 7 days and not completed)
+    soon_end = current_time + SOON_EXPIRING
+    soon = Q(user=user, is_completed=False, due_date__gte=current_time, due_date__lt=soon_end)
+
+    # Selected task (specified by URL parameter task_id)
+    try:
+        selected_task_id = int(request.GET.get('task_id', ''))
+    except ValueError:
+        selected_task_id = None
+
+    # Rendered sidebar and upcoming lists are cached per task version, so repeat loads skip the task query
+    locale_key = (timezone.get_current_timezone_name(), translation.get_language())
+    upcoming_key = task_cache_key(user, 'upcoming', *locale_key)
+    sidebar_key = None if search_query else task_cache_key(
+        user, 'sidebar', range_start.isoformat(), range_end.isoformat(), *locale_key
     )
+    counts_key = task_cache_key(user, 'counts', *locale_key)
+    fragments = await task_cache().aget_many([key for key in (upcoming_key, sidebar_key, counts_key) if key])
 
-    # Filter tasks by search keywords
+    # Filter tasks by search keywords: the full-text index ranks by relevance, then priority, one page at a time
+    search_page = 1
+    search_has_more = False
     if search_query:
-        task_list = list(user_tasks)
-        def priority_order(task):
-            mapping = {'high': 1, 'medium': 2, 'low': 3}
-            return mapping.get(task.priority, 4)
-        filtered_tasks = []
-        for task in task_list:
-            count = task.title.lower().count(search_query.lower())
-            if count > 0:
-                filtered_tasks.append((task, count))
-        filtered_tasks.sort(key=lambda x: (-x[1], priority_order(x[0])))
-        user_tasks = [item[0] for item in filtered_tasks]
-    else:
-        user_tasks = user_tasks.order_by('due_date')
+        try:
+            search_page = max(int(request.GET.get('page', 1)), 1)
+        except ValueError:
+            search_page = 1
+        if search_page > 1:
+            # Pages past the end show the last one, as Paginator.get_page does, so the offset stays in range
+            found = await sync_to_async(count_search_results)(user, search_query, range_start, range_end)
+            search_page = min(search_page, max((found + SEARCH_PAGE_SIZE - 1) // SEARCH_PAGE_SIZE, 1))
+        search_results = await sync_to_async(search_tasks)(
+            user, search_query, range_start, range_end,
+            limit=SEARCH_PAGE_SIZE + 1, offset=(search_page - 1) * SEARCH_PAGE_SIZE
+        )
+        search_has_more = len(search_results) > SEARCH_PAGE_SIZE
+        search_results = search_results[:SEARCH_PAGE_SIZE]
 
-    all_tasks = user_tasks  # For sidebar and search results display
+    wanted = []
+    if upcoming_key not in fragments:
+        wanted.append(soon)
+    sidebar_wanted = bool(sidebar_key and sidebar_key not in fragments)
+    # Open recurring tasks whose series has started by the end of the lists, expanded into occurrences below
+    if wanted or sidebar_wanted:
+        wanted.append(Q(user=user, recurrence__gt='', is_completed=False, due_date__lt=max(range_end, soon_end)))
+    if selected_task_id:
+        wanted.append(Q(user=user, pk=selected_task_id))
 
-    # Get tasks that are about to expire (current time up to 7 days and not completed)
-    soon_expiring_tasks = Task.objects.filter(
-        user=user,
-        is_completed=False,
-        due_date__lte=current_time + timedelta(days=7),
-        due_date__gte=current_time
-    ).order_by('due_date')
+    tasks = []
+    if wanted:
+        # Every branch of the OR repeats the user condition, so SQLite can answer each one from an index,
+        # and then sorts the few rows found most urgent first
+        tasks = Task.objects.filter(reduce(operator.or_, wanted)).only(*LIST_COLUMNS).order_by('priority', 'due_date', 'pk')
+        if selected_task_id:
+            # Only the selected task's description is read
+            tasks = tasks.annotate(detail=Case(
+                When(pk=selected_task_id, then=F('description')), default=Value(''), output_field=TextField()
+            ))
+        tasks = [task async for task in tasks]
 
-    # Selected task (specified by URL parameter task_id)
     selected_task = None
-    selected_task_id = request.GET.get('task_id')
-    if selected_task_id:
-        try:
-            selected_task = Task.objects.get(pk=selected_task_id, user=user)
-        except Task.DoesNotExist:
-            selected_task = None
+    for task in tasks:
+        if task.pk == selected_task_id:
+            task.description = task.detail
+            selected_task = task
+    # A recurring task is listed as its occurrences, never as the row holding its rule
+    tz = user_timezone(user)
+    recurring = [task for task in tasks if task.recurrence and not task.is_completed]
+    soon_expiring_tasks = [
+        task for task in tasks
+        if not task.recurrence and not task.is_completed and current_time <= task.due_date < soon_end
+    ]
+    # The upcoming occurrences, when the recurring tasks were loaded for them
+    occurrences = None
+    if upcoming_key not in fragments:
+        occurrences = await sync_to_async(expand)(recurring, current_time, soon_end, tz) if recurring else []
+        soon_expiring_tasks = merge_by_priority(soon_expiring_tasks, [task for task in occurrences if not task.is_completed])
+    # The date window is listed one keyset page at a time; sidebar_tasks loads the following pages
+    window_tasks, next_cursor = [], None
+    if sidebar_wanted:
+        window_tasks, next_cursor = await sync_to_async(window_page)(user, range_start, range_end, recurring, tz)
+
+    selected_occurrence = parse_occurrence(request.GET.get('occurrence'))
+    if selected_task:
+        selected_task.status = task_status(selected_task, current_time)
+    for task in soon_expiring_tasks + window_tasks:
+        task.status = task_status(task, current_time)
+        if task.pk == selected_task_id and getattr(task, 'occurrence', None) == selected_occurrence:
+            selected_task = task
+
+    all_tasks = sidebar_tasks = None
+    if search_query:
+        for task in search_results:
+            task.status = task_status(task, current_time)
+        all_tasks = search_results  # Search results panel, in relevance order
+        sidebar_tasks = sorted(search_results, key=lambda task: (task.due_date, PRIORITY_CODES[task.priority]))
+        sidebar_html = render_to_string(
+            'TaskSystemapp/sidebar_tasks.html', {'sidebar_tasks': sidebar_tasks, 'search_query': search_query}
+        )
+    elif sidebar_key in fragments:
+        sidebar_html = mark_safe(fragments[sidebar_key])
+    else:
+        all_tasks = sidebar_tasks = window_tasks
+        sidebar_html = render_to_string('TaskSystemapp/sidebar_tasks.html', {
+            'sidebar_tasks': sidebar_tasks,
+            'next_cursor': next_cursor,
+            'more_url': f"{reverse('sidebar_tasks')}?start_date={start_date.isoformat()}&end_date={end_date.isoformat()}",
+        })
+        await task_cache().aset(sidebar_key, sidebar_html, HOME_FRAGMENT_TIMEOUT)
+
+    if upcoming_key in fragments:
+        upcoming_html = mark_safe(fragments[upcoming_key])
+        soon_expiring_tasks = None
+    else:
+        upcoming_html = render_to_string(
+            'TaskSystemapp/upcoming_tasks.html', {'soon_expiring_tasks': soon_expiring_tasks}
+        )
+        await task_cache().aset(upcoming_key, upcoming_html, HOME_FRAGMENT_TIMEOUT)
+
+    counts = fragments.get(counts_key)
+    if counts is None:
+        counts = await sync_to_async(task_counts)(user, current_time, tz, occurrences)
+        await task_cache().aset(counts_key, counts, HOME_FRAGMENT_TIMEOUT)
 
     context = {
         'all_tasks': all_tasks,
+        'sidebar_tasks': sidebar_tasks,
+        'sidebar_html': sidebar_html,
         'soon_expiring_tasks': soon_expiring_tasks,
+        'upcoming_html': upcoming_html,
+        'task_counts': counts,
         'selected_task': selected_task,
         'quick_form': QuickTaskForm(),
         'detailed_form': DetailedTaskForm(),
         'current_time': current_time,
         'search_query': search_query,
+        'search_page': search_page,
+        'search_has_more': search_has_more,
         'user': user,
     }
     return render(request, 'TaskSystemapp/home.html', context)
 
 
-def task_events(request):
+@login_required
+@read_from_replica
+async def sidebar_tasks(request):
     """
-    Returns a calendar event (in JSON format) for the current user task, for front-end calendar display.
+    Sidebar Page View: for infinite scrolling, the page of the sidebar's date window after the given cursor, as JSON
+    {"tasks": [...], "next_cursor": ...}; next_cursor is null on the last page.
     """
-    tasks = Task.objects.filter(user=request.user)
-    events = []
-    for task in tasks:
-        events.append({
-            'title': task.title,
-            'start': task.due_date.isoformat(),
-            'color': '#4CAF50' if task.is_completed else '#FF5722'
-        })
-    return JsonResponse(events, safe=False)
+    after = decode_cursor(request.GET.get('cursor'))
+    if after is None:
+        return JsonResponse({'success': False, 'error': 'A cursor from the previous page is required'}, status=400)
+    user = await request.auser()
+    range_start, range_end = local_day_range(*window_dates(request, timezone.now()))
+    recurring = Task.objects.filter(user=user, recurrence__gt='', is_completed=False, due_date__lt=range_end)
+    recurring = [task async for task in recurring.only(*LIST_COLUMNS)]
+    tasks, next_cursor = await sync_to_async(window_page)(user, range_start, range_end, recurring, user_timezone(user), after)
+    return JsonResponse({'success': True, 'tasks': [task_item(task) for task in tasks], 'next_cursor': next_cursor})
+
+
+def task_item(task):
+    """
+    JSON form of a listed task or occurrence.
+    """
+    item = {
+        'id': task.pk,
+        'title': task.title,
+        'priority': task.priority,
+        'due_date': task.due_date.isoformat(),
+        'is_completed': task.is_completed,
+    }
+    if getattr(task, 'occurrence', None):
+        item['occurrence'] = task.occurrence.isoformat()
+    return item
+
+
+def encode_cursor(task):
+    """
+    Keyset cursor of a listed task or occurrence: its deadline in microseconds since the epoch, and its id.
+    """
+    return f'{(task.due_date - EPOCH) // timedelta(microseconds=1)}-{task.pk}'
+
+
+def decode_cursor(value):
+    """
+    The (due_date, id) of a cursor from encode_cursor, or None if it is not one.
+    """
+    try:
+        micros, pk = (int(part) for part in (value or '').split('-'))
+        return EPOCH + timedelta(microseconds=micros), pk
+    except (ValueError, OverflowError, OSError):
+        # Not two integers, or a deadline outside the datetime range
+        return None
+
+
+def window_page(user, range_start, range_end, recurring, tz, after=None):
+    """
+    One page of the tasks due in [range_start, range_end), in (due_date, id) order: up to SIDEBAR_PAGE_SIZE tasks
+    and occurrences of the recurring tasks that come after the (due_date, id) cursor, and the next page's cursor
+    (None on the last page). The cursor's deadline starts the index range scan, so a deep page costs what the first does.
+    """
+    start = range_start
+    rows = Task.objects.filter(user=user, recurrence='', due_date__lt=range_end)
+    if after:
+        start = max(range_start, after[0])
+        rows = rows.filter(Q(due_date__gt=after[0]) | Q(pk__gt=after[1]))
+    rows = list(rows.filter(due_date__gte=start).only(*LIST_COLUMNS).order_by('due_date', 'pk')[:SIDEBAR_PAGE_SIZE + 1])
+    # The cursor is applied before the limit, so occurrences at or before it do not use up the page
+    occurrences = expand(recurring, start, range_end, tz, limit=SIDEBAR_PAGE_SIZE + 1, after=after)
+    page = sorted(rows + occurrences, key=lambda task: (task.due_date, task.pk))
+    if len(page) <= SIDEBAR_PAGE_SIZE:
+        return page, None
+    page = page[:SIDEBAR_PAGE_SIZE]
+    return page, encode_cursor(page[-1])
+
+
+@login_required
+async def task_widget(request):
+    """
+    Widget View: the WIDGET_LIMIT most urgent tasks about to expire, for the widget window and desktop widgets,
+    as a small page or, with ?format=json, as {"tasks": [...]}. Only the upcoming and recurring tasks are queried, and the result is cached per task
+    version for WIDGET_TIMEOUT, so a poll costs the session and user lookups and a cache read.
+    An unchanged list is answered with 304 Not Modified. With ?wait=<seconds> and a matching If-None-Match the request
+    is held until one of the user's tasks changes or the wait ends (long poll), so widgets need not poll tightly.
+    Reads go to the primary, since a long poll answers a change that was just made.
+    """
+    as_json = request.GET.get('format') == 'json'
+    try:
+        wait = min(max(float(request.GET.get('wait', 0)), 0), WIDGET_MAX_WAIT)
+    except ValueError:
+        wait = 0
+    user = await request.auser()
+    body, etag, last_modified = await widget_content(user, as_json)
+    if wait and etag in parse_etags(request.headers.get('If-None-Match', '')):
+        body, etag, last_modified = await wait_for_change(user, as_json, etag, wait)
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is None:
+        if as_json:
+            response = HttpResponse(body, content_type='application/json')
+        else:
+            response = render(request, 'TaskSystemapp/widget.html', {'tasks_html': mark_safe(body)})
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(last_modified)
+    # Always revalidated: a task change has to show at the next poll, and a 304 is cheap
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
+
+
+def upcoming_tasks(user, now, limit=None):
+    """
+    The user's first limit (or all) open tasks and occurrences due within SOON_EXPIRING from now, most urgent first.
+    """
+    soon_end = now + SOON_EXPIRING
+    tasks = by_priority(Task.objects.filter(
+        user=user, is_completed=False, recurrence='', due_date__gte=now, due_date__lt=soon_end
+    )).only(*LIST_COLUMNS)
+    recurring = Task.objects.filter(user=user, recurrence__gt='', is_completed=False, due_date__lt=soon_end)
+    occurrences = expand(list(recurring.only(*LIST_COLUMNS)), now, soon_end, user_timezone(user))
+    return merge_by_priority(list(tasks[:limit]), [task for task in occurrences if not task.is_completed])[:limit]
+
+
+def by_priority(tasks):
+    """
+    Orders a query of open tasks most urgent first. Naming every priority lets SQLite read task_user_priority_idx
+    one priority after the other, already in order, so a LIMIT ends the scan early instead of sorting every match.
+    """
+    return tasks.filter(priority__in=list(PRIORITY_CODES)).order_by('priority', 'due_date', 'pk')
+
+
+def merge_by_priority(tasks, occurrences):
+    """
+    Merges occurrences of recurring tasks into tasks already in (priority, due_date, id) order from the database.
+    """
+    def key(task):
+        return PRIORITY_CODES[task.priority], task.due_date, task.pk
+    return list(heapq.merge(tasks, sorted(occurrences, key=key), key=key))
+
+
+async def widget_content(user, as_json):
+    """
+    The widget body at the user's task version, with its ETag and Last-Modified timestamp.
+    Tasks also enter and leave the list as time passes, so the body is recomputed every WIDGET_TIMEOUT seconds.
+    """
+    now = timezone.now()
+    period = int(now.timestamp()) // WIDGET_TIMEOUT * WIDGET_TIMEOUT
+    key = task_cache_key(
+        user, 'widget', as_json, period, timezone.get_current_timezone_name(), translation.get_language()
+    )
+    body = await task_cache().aget(key)
+    if body is None:
+        tasks = await sync_to_async(upcoming_tasks)(user, now, WIDGET_LIMIT)
+        if as_json:
+            body = json.dumps({'tasks': [task_item(task) for task in tasks]})
+        else:
+            body = render_to_string('TaskSystemapp/widget_tasks.html', {'soon_expiring_tasks': tasks})
+        await task_cache().aset(key, body, WIDGET_TIMEOUT)
+    etag = quote_etag(hashlib.md5(body.encode()).hexdigest())
+    changed_at = user.tasks_changed_at.timestamp() if user.tasks_changed_at else 0
+    return body, etag, int(max(changed_at, period))
+
+
+async def wait_for_change(user, as_json, etag, wait):
+    """
+    Waits up to wait seconds for a change to the user's tasks, published to their channel group, or for the
+    widget's period to end, and returns the widget content as it is then.
+    """
+    channel_layer = get_channel_layer()
+    if channel_layer is None:
+        return await widget_content(user, as_json)
+    group = user_group(user.pk)
+    channel = await channel_layer.new_channel()
+    await channel_layer.group_add(group, channel)
+    try:
+        # Check again once subscribed, or a change made just before would go unnoticed until the wait ends
+        content = await widget_content(await CustomUser.objects.aget(pk=user.pk), as_json)
+        if content[1] != etag:
+            return content
+        period_left = WIDGET_TIMEOUT - timezone.now().timestamp() % WIDGET_TIMEOUT
+        try:
+            await asyncio.wait_for(channel_layer.receive(channel), min(wait, period_left))
+        except asyncio.TimeoutError:
+            pass
+        return await widget_content(await CustomUser.objects.aget(pk=user.pk), as_json)
+    finally:
+        await channel_layer.group_discard(group, channel)
+
+
+def parse_occurrence(value):
+    """
+    Parses the occurrence parameter naming one occurrence of a recurring task: its ISO 8601 date by the rule.
+    """
+    try:
+        # An unencoded '+' in the UTC offset arrives as a space
+        parsed = parse_datetime((value or '').strip().replace(' ', '+'))
+    except ValueError:
+        return None
+    # Occurrences are always named with their UTC offset
+    return parsed if parsed and timezone.is_aware(parsed) else None
+
+
+@login_required
+@read_from_replica
+async def task_events(request):
+    """
+    Calendar events (JSON) for the current user's tasks, for front-end calendar display.
+    Takes FullCalendar's start/end window parameters and only returns tasks due in [start, end), at most
+    EVENTS_MAX_RANGE apart. The JSON array is streamed from an async projected query merged with the occurrences of
+    recurring tasks, computed as they are written, so memory stays flat however many tasks there are,
+    and an unchanged window is answered with 304 Not Modified.
+    """
+    start = parse_window_param(request.GET.get('start'))
+    end = parse_window_param(request.GET.get('end'))
+    if not start or not end or start >= end:
+        return JsonResponse({'error': 'start and end are required, e.g. ?start=2025-03-01&end=2025-04-01'}, status=400)
+    if end - start > EVENTS_MAX_RANGE:
+        return JsonResponse({'error': f'The window can span at most {EVENTS_MAX_RANGE.days} days'}, status=400)
+
+    # The user's task version identifies the response, so neither the ETag check nor a cache hit touches the tasks
+    user = await request.auser()
+    key = task_cache_key(user, 'events', start.isoformat(), end.isoformat())
+    etag, last_modified = task_validators(user, key)
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is None:
+        body = await task_cache().aget(key)
+        if body is not None:
+            response = HttpResponse(body, content_type='application/json')
+        else:
+            rows = (
+                Task.objects.filter(user=user, recurrence='', due_date__gte=start, due_date__lt=end)
+                .order_by('due_date', 'id')
+                # values() rather than values_list(), which aiterator() cannot run outside the async context
+                .values('id', 'title', 'due_date', 'is_completed')
+            )
+            # Rows are read while streaming, after the request's database routing has ended, so bind the database now
+            rows = rows.using(rows.db)
+            # Recurring tasks are expanded into their occurrences in the window, merged with the other events by deadline
+            recurring = Task.objects.filter(user=user, recurrence__gt='', is_completed=False, due_date__lt=end).only(
+                'id', 'title', 'due_date', 'is_completed', 'recurrence', 'recurrence_interval', 'recurrence_until'
+            )
+            recurring = [task async for task in recurring]
+            occurrences = await sync_to_async(iter_expand)(recurring, start, end, user_timezone(user))
+            response = StreamingHttpResponse(
+                cache_stream(key, stream_events(with_occurrences(rows.aiterator(chunk_size=EVENTS_CHUNK_SIZE), occurrences))),
+                content_type='application/json'
+            )
+    response['ETag'] = etag
+    if last_modified:
+        response['Last-Modified'] = http_date(last_modified)
+    return response
+
+
+def parse_window_param(value):
+    """
+    Parses a calendar window bound: an ISO 8601 datetime, or a date meaning midnight in the active time zone.
+    """
+    if not value:
+        return None
+    # An unencoded '+' in a UTC offset arrives as a space
+    value = value.strip().replace(' ', '+')
+    try:
+        parsed = parse_datetime(value)
+        if parsed is None:
+            day = parse_date(value)
+            if day is None:
+                return None
+            parsed = datetime.combine(day, time.min)
+    except ValueError:
+        return None
+    if timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed)
+    return parsed
+
+
+async def with_occurrences(rows, occurrences):
+    """
+    The async event rows, in (due_date, id) order, merged with rows for an iterator of occurrences of recurring
+    tasks in the same order.
+    """
+    occurrence = next(occurrences, None)
+    async for row in rows:
+        while occurrence and (occurrence.due_date, occurrence.pk) < (row['due_date'], row['id']):
+            yield occurrence_row(occurrence)
+            occurrence = next(occurrences, None)
+        yield row
+    while occurrence:
+        yield occurrence_row(occurrence)
+        occurrence = next(occurrences, None)
+
+
+def occurrence_row(task):
+    return {'id': task.pk, 'title': task.title, 'due_date': task.due_date, 'is_completed': task.is_completed}
+
+
+async def stream_events(rows):
+    """
+    Yields a JSON array of calendar events from async rows, EVENTS_CHUNK_SIZE events per chunk.
+    """
+    yield '['
+    batch = []
+    first = True
+    async for row in rows:
+        batch.append(json.dumps({
+            'id': row['id'],
+            'title': row['title'],
+            'start': row['due_date'].isoformat(),
+            'color': '#4CAF50' if row['is_completed'] else '#FF5722'
+        }))
+        if len(batch) == EVENTS_CHUNK_SIZE:
+            yield ('' if first else ',') + ','.join(batch)
+            batch = []
+            first = False
+    if batch:
+        yield ('' if first else ',') + ','.join(batch)
+    yield ']'
+
+
+@login_required
+@read_from_replica
+async def calendar_summary(request):
+    """
+    Calendar Summary View: how many tasks are due each day (or each week, with ?by=week) in FullCalendar's
+    start/end window, by priority and completion, so month and year views need not load every task.
+    The counts are one GROUP BY query; unchanged windows are served from the cache or with 304 Not Modified.
+    """
+    start = parse_window_param(request.GET.get('start'))
+    end = parse_window_param(request.GET.get('end'))
+    by = request.GET.get('by', 'day')
+    if not start or not end or start >= end:
+        return JsonResponse({'error': 'start and end are required, e.g. ?start=2025-01-01&end=2026-01-01'}, status=400)
+    if by not in ('day', 'week'):
+        return JsonResponse({'error': 'by must be day or week'}, status=400)
+    if end - start > SUMMARY_MAX_RANGE:
+        return JsonResponse({'error': f'The window can span at most {SUMMARY_MAX_RANGE.days} days'}, status=400)
+
+    user = await request.auser()
+    tz = user_timezone(user)
+    key = task_cache_key(user, 'summary', start.isoformat(), end.isoformat(), by, tz)
+    etag, last_modified = task_validators(user, key)
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is None:
+        body = await task_cache().aget(key)
+        if body is None:
+            buckets = await sync_to_async(task_summary)(user, start, end, by, tz)
+            body = json.dumps({'start': start.isoformat(), 'end': end.isoformat(), 'by': by, 'buckets': buckets})
+            await task_cache().aset(key, body, EVENTS_TIMEOUT)
+        response = HttpResponse(body, content_type='application/json')
+    response['ETag'] = etag
+    if last_modified:
+        response['Last-Modified'] = http_date(last_modified)
+    return response
+
+
+@login_required
+@read_from_replica
+async def task_status_counts(request):
+    """
+    Task Counts View: the current user's tasks counted by status (completed, overdue, expiring, normal) and
+    priority as JSON, e.g. for a badge. The counts are one GROUP BY query, cached per task version for as long as
+    the home page fragments, since tasks also become overdue as time passes.
+    """
+    user = await request.auser()
+    key = task_cache_key(user, 'counts', timezone.get_current_timezone_name(), translation.get_language())
+    counts = await task_cache().aget(key)
+    if counts is None:
+        counts = await sync_to_async(task_counts)(user, timezone.now(), user_timezone(user))
+        await task_cache().aset(key, counts, HOME_FRAGMENT_TIMEOUT)
+    response = JsonResponse(counts)
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
 
 
 def detailed_add_task(request):
@@ -166,8 +686,9 @@ def detailed_add_task(request):
             task = form.save(commit=False)
             task.user = request.user
             task.save()
+            publish_task_changes(task.user_id, [task_diff('create', task)])
             task_deadline = task.due_date.strftime("%Y-%m-%d %H:%M")
-            return JsonResponse({'success': True, 'task_deadline': task_deadline})
+            return JsonResponse({'success': True, 'task_deadline': task_deadline, 'task_id': task.pk})
         else:
             return JsonResponse({'success': False, 'errors': form.errors})
     return redirect('home')
@@ -175,21 +696,97 @@ def detailed_add_task(request):
 
 def complete_task(request, task_id):
     """
-    Marks the specified task as completed and redirects back to the home page.
+    Marks the specified task as completed. Support AJAX request, return JSON data when successful, otherwise redirect back to the home page.
+    For a recurring task, ?occurrence=<date> completes that one occurrence; without it the whole series ends.
     """
     task = get_object_or_404(Task, pk=task_id, user=request.user)
-    task.is_completed = True
-    task.save()
+    occurrence, error = read_occurrence(request, task)
+    if error:
+        return error
+    if occurrence:
+        stored, _ = TaskOccurrence.objects.update_or_create(task=task, original_date=occurrence, defaults={'is_completed': True})
+        task.occurrence = occurrence
+        task.due_date = stored.due_date or occurrence
+        task.is_completed = True
+    else:
+        task.is_completed = True
+        task.save(update_fields=['is_completed', 'updated_at'])
+    publish_task_changes(task.user_id, [task_diff('complete', task)])
+    if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
+        return JsonResponse({'success': True})
     return redirect('home')
 
 
+@login_required
+def skip_occurrence(request, task_id):
+    """
+    Skip Occurrence View: leaves one occurrence of a recurring task, named by the occurrence parameter, out of every
+    list, the calendar and the reminders. POST only; returns JSON.
+    """
+    if request.method != 'POST':
+        return JsonResponse({'success': False, 'error': 'Invalid request method'}, status=405)
+    task = get_object_or_404(Task, pk=task_id, user=request.user)
+    occurrence, error = read_occurrence(request, task)
+    if error or occurrence is None:
+        return error or JsonResponse({'success': False, 'error': 'An occurrence is required'}, status=400)
+    TaskOccurrence.objects.update_or_create(task=task, original_date=occurrence, defaults={'is_skipped': True})
+    task.occurrence = occurrence
+    publish_task_changes(task.user_id, [task_diff('delete', task)])
+    return JsonResponse({'success': True})
+
+
+@login_required
+def reschedule_occurrence(request, task_id):
+    """
+    Reschedule Occurrence View: moves one occurrence of a recurring task, named by the occurrence parameter, to the
+    due_date posted, leaving the rule and the other occurrences as they are. POST only; returns JSON.
+    """
+    if request.method != 'POST':
+        return JsonResponse({'success': False, 'error': 'Invalid request method'}, status=405)
+    task = get_object_or_404(Task, pk=task_id, user=request.user)
+    occurrence, error = read_occurrence(request, task)
+    if error or occurrence is None:
+        return error or JsonResponse({'success': False, 'error': 'An occurrence is required'}, status=400)
+    form = RescheduleOccurrenceForm(request.POST)
+    if not form.is_valid():
+        return JsonResponse({'success': False, 'errors': form.errors}, status=400)
+    stored, _ = TaskOccurrence.objects.update_or_create(
+        task=task, original_date=occurrence, defaults={'due_date': form.cleaned_data['due_date'], 'is_skipped': False}
+    )
+    task.occurrence = occurrence
+    task.due_date = stored.due_date
+    task.is_completed = stored.is_completed
+    publish_task_changes(task.user_id, [task_diff('update', task)])
+    return JsonResponse({
+        'success': True, 'task_deadline': task.due_date.strftime("%Y-%m-%d %H:%M"), 'task': task_item(task)
+    })
+
+
+def read_occurrence(request, task):
+    """
+    The occurrence of task named by the request's occurrence parameter, or None if it has none.
+    Returns (occurrence, None), or (None, error response) if the parameter does not name one of the task's occurrences.
+    """
+    value = request.GET.get('occurrence', request.POST.get('occurrence'))
+    if value is None:
+        return None, None
+    occurrence = parse_occurrence(value)
+    if occurrence is None:
+        return None, JsonResponse({'success': False, 'error': 'Invalid occurrence'}, status=400)
+    if not task.recurrence or not is_occurrence(task, occurrence, user_timezone(request.user)):
+        return None, JsonResponse({'success': False, 'error': 'Not an occurrence of this task'}, status=400)
+    return occurrence, None
+
+
 def delete_task(request, task_id):
     """
     Deletes the specified task.Support AJAX request, return JSON data when successful, otherwise redirect back to the home page.
     """
     task = get_object_or_404(Task, pk=task_id, user=request.user)
     if request.method == 'POST':
+        diff = task_diff('delete', task)
         task.delete()
+        publish_task_changes(request.user.pk, [diff])
         if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
             return JsonResponse({'success': True})
         return redirect('home')
@@ -206,13 +803,230 @@ def quick_add_task(request):
             task = form.save(commit=False)
             task.user = request.user
             task.save()
+            publish_task_changes(task.user_id, [task_diff('create', task)])
             task_deadline = task.due_date.strftime("%Y-%m-%d %H:%M")
-            return JsonResponse({'success': True, 'task_deadline': task_deadline})
+            return JsonResponse({'success': True, 'task_deadline': task_deadline, 'task_id': task.pk})
         else:
             return JsonResponse({'success': False, 'errors': form.errors})
     return redirect('home')
 
 
+def read_batch(request, key):
+    """
+    Reads the list under key from a JSON batch request body.
+    Returns (items, None), or (None, error response) if the request is not a valid batch.
+    """
+    if request.method != 'POST':
+        return None, JsonResponse({'success': False, 'error': 'Invalid request method'}, status=405)
+    try:
+        items = json.loads(request.body).get(key)
+    except (ValueError, AttributeError):
+        items = None
+    if not isinstance(items, list):
+        return None, JsonResponse({'success': False, 'error': f'Expected a JSON object with a "{key}" list'}, status=400)
+    if len(items) > BATCH_LIMIT:
+        return None, JsonResponse({'success': False, 'error': f'At most {BATCH_LIMIT} items per batch'}, status=400)
+    return items, None
+
+
+def read_batch_ids(request):
+    """
+    Like read_batch for {"ids": [...]}, also returning the items that are valid task ids.
+    """
+    items, error = read_batch(request, 'ids')
+    if error:
+        return None, None, error
+    return items, [item for item in items if is_task_id(item)], None
+
+
+def is_task_id(item):
+    return isinstance(item, int) and not isinstance(item, bool)
+
+
+@login_required
+def batch_add_tasks(request):
+    """
+    Batch Add Task View: {"tasks": [{"title": ..., "priority": ..., "due_date": ...}, ...]}.
+    Each task is validated like the quick add form, or the detailed add form if it has any field only that form has,
+    e.g. a description or a recurrence rule. Values must be JSON strings, or numbers for number fields. The valid ones are inserted with one bulk_create; the result of each item is returned in order.
+    """
+    items, error = read_batch(request, 'tasks')
+    if error:
+        return error
+    results = []
+    new_tasks = []
+    for index, item in enumerate(items):
+        if not isinstance(item, dict):
+            results.append({'index': index, 'success': False, 'errors': {'__all__': ['Expected an object']}})
+            continue
+        form_class = DetailedTaskForm if any(field in item for field in DETAILED_FIELDS) else QuickTaskForm
+        errors = json_type_errors(form_class, item)
+        if errors:
+            results.append({'index': index, 'success': False, 'errors': errors})
+            continue
+        form = form_class(item)
+        if not form.is_valid():
+            results.append({'index': index, 'success': False, 'errors': form.errors})
+            continue
+        task = form.save(commit=False)
+        task.user = request.user
+        task.set_remind_at()
+        new_tasks.append(task)
+        results.append({'index': index, 'success': True, 'task': task})
+
+    with transaction.atomic():
+        Task.objects.bulk_create(new_tasks, batch_size=BATCH_CHUNK_SIZE)
+        bump_task_version([request.user.pk])
+        publish_task_changes(request.user.pk, [task_diff('create', task) for task in new_tasks])
+
+    for result in results:
+        task = result.pop('task', None)
+        if task is not None:
+            result['id'] = task.pk
+            result['task_deadline'] = task.due_date.strftime("%Y-%m-%d %H:%M")
+    return JsonResponse({'success': True, 'created': len(new_tasks), 'results': results})
+
+
+@login_required
+def batch_complete_tasks(request):
+    """
+    Batch Complete View: {"ids": [...]} marks the user's tasks as completed with a single UPDATE.
+    """
+    items, ids, error = read_batch_ids(request)
+    if error:
+        return error
+    with transaction.atomic():
+        tasks = Task.objects.filter(user=request.user, pk__in=ids)
+        found = list(tasks.values('id', 'title', 'priority', 'due_date'))
+        tasks.update(is_completed=True, updated_at=timezone.now())
+        bump_task_version([request.user.pk])
+        publish_task_changes(request.user.pk, [
+            task_diff('complete', Task(pk=row['id'], title=row['title'], priority=row['priority'], due_date=row['due_date'], is_completed=True))
+            for row in found
+        ])
+    return JsonResponse(batch_id_results(items, {row['id'] for row in found}, 'completed'))
+
+
+@login_required
+def batch_delete_tasks(request):
+    """
+    Batch Delete View: {"ids": [...]} deletes the user's tasks with a single filtered delete.
+    """
+    items, ids, error = read_batch_ids(request)
+    if error:
+        return error
+    with transaction.atomic(), batch_task_changes():
+        tasks = Task.objects.filter(user=request.user, pk__in=ids)
+        found = set(tasks.values_list('id', flat=True))
+        tasks.delete()
+        publish_task_changes(request.user.pk, [{'op': 'delete', 'id': task_id} for task_id in found])
+    return JsonResponse(batch_id_results(items, found, 'deleted'))
+
+
+def batch_id_results(items, found, done):
+    """
+    Per-item results of a batch over task ids, in request order, so the nth result is for the nth item.
+    """
+    results = []
+    for item in items:
+        if not is_task_id(item):
+            results.append({'id': item, 'success': False, 'error': 'Invalid task id'})
+        elif item in found:
+            results.append({'id': item, 'success': True})
+        else:
+            results.append({'id': item, 'success': False, 'error': 'Task not found'})
+    return {'success': True, done: len(found), 'results': results}
+
+
+@login_required
+def import_tasks(request):
+    """
+    Task Import View: POST a CSV or iCalendar file as "file" to import its tasks.
+    The import runs in chunks and its job summary is returned as JSON; the import_tasks command suits very large files.
+    """
+    if request.method != 'POST':
+        return JsonResponse({'success': False, 'error': 'Invalid request method'}, status=405)
+    upload = request.FILES.get('file')
+    if upload is None:
+        return JsonResponse({'success': False, 'error': 'No file uploaded'}, status=400)
+    file_format = request.POST.get('format') or import_format(upload.name)
+    if file_format not in ('csv', 'ics'):
+        return JsonResponse({'success': False, 'error': 'Unsupported file type, expected .csv or .ics'}, status=400)
+    job = ImportJob.objects.create(user=request.user, file=upload, name=upload.name, format=file_format)
+    run_import(job)
+    return JsonResponse({'success': job.status == 'done', 'job': import_job_status(job)})
+
+
+@login_required
+def import_status(request, job_id):
+    """
+    Import Status View: the progress and record errors of one of the user's imports.
+    """
+    job = get_object_or_404(ImportJob, pk=job_id, user=request.user)
+    return JsonResponse({'success': True, 'job': import_job_status(job)})
+
+
+@login_required
+def resume_import(request, job_id):
+    """
+    Resume Import View: continue a failed import after its last committed chunk.
+    """
+    if request.method != 'POST':
+        return JsonResponse({'success': False, 'error': 'Invalid request method'}, status=405)
+    job = get_object_or_404(ImportJob, pk=job_id, user=request.user)
+    if job.status != 'failed':
+        return JsonResponse({'success': False, 'error': f'Import is {job.status}'}, status=400)
+    run_import(job)
+    return JsonResponse({'success': job.status == 'done', 'job': import_job_status(job)})
+
+
+@login_required
+def task_archive(request):
+    """
+    Archive View: the user's archived tasks, newest deadline first, optionally filtered by a search term in the
+    title or description. This is the only view reading the archive; the home page and its search see active tasks.
+    """
+    search_query = request.GET.get('search', '').strip()
+    try:
+        page = max(int(request.GET.get('page', 1)), 1)
+    except ValueError:
+        page = 1
+    tasks = TaskArchive.objects.filter(user=request.user).only(
+        'task_id', 'title', 'description', 'priority', 'due_date', 'completed_at'
+    ).order_by('-due_date', '-task_id')
+    if search_query:
+        tasks = tasks.filter(Q(title__icontains=search_query) | Q(description__icontains=search_query))
+    if page > 1:
+        # Pages past the end show the last one, as Paginator.get_page does, so the offset stays in range
+        page = min(page, max((tasks.count() + ARCHIVE_PAGE_SIZE - 1) // ARCHIVE_PAGE_SIZE, 1))
+    offset = (page - 1) * ARCHIVE_PAGE_SIZE
+    tasks = list(tasks[offset:offset + ARCHIVE_PAGE_SIZE + 1])
+    context = {
+        'archived_tasks': tasks[:ARCHIVE_PAGE_SIZE],
+        'has_more': len(tasks) > ARCHIVE_PAGE_SIZE,
+        'page': page,
+        'search_query': search_query,
+        'user': request.user,
+    }
+    return render(request, 'TaskSystemapp/archive.html', context)
+
+
+@login_required
+def restore_archived_task(request, task_id):
+    """
+    Moves an archived task back to the active tasks. Support AJAX request, return JSON data when successful, otherwise redirect back to the archive.
+    """
+    if request.method != 'POST':
+        return JsonResponse({'success': False, 'error': 'Invalid request method'}, status=405)
+    archived = get_object_or_404(TaskArchive, task_id=task_id, user=request.user)
+    task = restore_task(archived)
+    publish_task_changes(task.user_id, [task_diff('create', task)])
+    if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
+        return JsonResponse({'success': True, 'task_id': task.pk})
+    return redirect('task_archive')
+
+
+@login_required
 def profile(request):
     """
     User Profile View: Allows users to update their personal information.
@@ -226,7 +1040,58 @@ def profile(request):
             return redirect('profile')
     else:
         form = UserUpdateForm(instance=request.user)
-    return render(request, 'TaskSystemapp/profile.html', {'form': form, 'user': request.user})
+    feed_url = request.build_absolute_uri(reverse('task_feed', args=[request.user.get_feed_token()]))
+    return render(request, 'TaskSystemapp/profile.html', {'form': form, 'user': request.user, 'feed_url': feed_url})
+
+
+@login_required
+def reset_feed_token(request):
+    """
+    Replaces the user's calendar feed link; calendars subscribed with the old link stop receiving updates.
+    """
+    if request.method == 'POST':
+        request.user.reset_feed_token()
+    return redirect('profile')
+
+
+@read_from_replica
+async def task_feed(request, token):
+    """
+    Calendar Feed View: the tasks of the user owning token as an iCalendar file, for calendar app subscriptions.
+    Tasks are VTODOs with a reminder alarm, or VEVENTs with ?as=events. The feed is streamed from a projected query,
+    and polls made since the user's last task change are answered with 304 Not Modified without reading any task.
+    """
+    try:
+        user = await CustomUser.objects.aget(feed_token=token)
+    except CustomUser.DoesNotExist:
+        raise Http404("Unknown feed")
+    as_events = request.GET.get('as') == 'events'
+    domain = request.get_host().split(':')[0]
+    key = task_cache_key(user, 'feed', as_events, domain)
+    etag, last_modified = task_validators(user, key)
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is None:
+        content_type = 'text/calendar; charset=utf-8'
+        body = await task_cache().aget(key)
+        if body is not None:
+            response = HttpResponse(body, content_type=content_type)
+        else:
+            overrides = await feed_overrides(user)
+            rows = feed_rows(user)
+            # Rows are read while streaming, after the request's database routing has ended, so bind the database now
+            rows = rows.using(rows.db).aiterator(chunk_size=FEED_CHUNK_SIZE)
+            calendar = stream_calendar(rows, domain, f'{user.username} tasks', as_events, user_timezone(user), overrides)
+            response = StreamingHttpResponse(
+                cache_stream(key, calendar),
+                content_type=content_type
+            )
+        response['Content-Disposition'] = 'inline; filename="tasks.ics"'
+    response['ETag'] = etag
+    if last_modified:
+        response['Last-Modified'] = http_date(last_modified)
+    # Let clients cache the feed but revalidate on every poll
+    response['Cache-Control'] = 'private, no-cache'
+    return response
 
 
 def custom_logout(request):
@@ -2,6 +2,7 @@
 ASGI config for task_reminder project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
+HTTP requests go to Django and WebSocket connections to the Channels consumers, so one worker process serves both.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.1/howto/deployment/asgi/
@@ -13,4 +14,19 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'task_reminder.settings')
 
-application = get_asgi_application()
+# Set up Django before importing the consumers, which import models
+django_asgi_app = get_asgi_application()
+
+from channels.auth import AuthMiddlewareStack  # noqa: E402
+from channels.routing import ProtocolTypeRouter, URLRouter  # noqa: E402
+from channels.security.websocket import AllowedHostsOriginValidator  # noqa: E402
+
+from .routing import websocket_urlpatterns  # noqa: E402
+
+application = ProtocolTypeRouter({
+    "http": django_asgi_app,
+    # The session cookie identifies the user, so each socket only joins its owner's group
+    "websocket": AllowedHostsOriginValidator(
+        AuthMiddlewareStack(URLRouter(websocket_urlpatterns))
+    ),
+})
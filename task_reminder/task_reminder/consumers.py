@@ -1,9 +1,63 @@
 from channels.generic.websocket import AsyncWebsocketConsumer
+from TaskSystemapp.realtime import user_group
+import asyncio
 import json
+
+# Changes arriving within this many seconds are sent to the browser as one batch
+COALESCE_INTERVAL = 0.25
+
+
 class TaskConsumer(AsyncWebsocketConsumer):
+    """
+    Pushes the signed-in user's task changes to their browser.
+    Each user has their own group, and bursts of changes are coalesced into one
+    {"type": "tasks.batch", "changes": [...]} message per COALESCE_INTERVAL, keeping only the latest state of each task
+    or occurrence.
+    """
+
     async def connect(self):
+        user = self.scope.get('user')
+        if user is None or not user.is_authenticated:
+            await self.close()
+            return
+        self.group_name = user_group(user.pk)
+        self.pending = {}
+        self.flush_task = None
+        await self.channel_layer.group_add(self.group_name, self.channel_name)
         await self.accept()
-        await self.channel_layer.group_add("tasks", self.channel_name)
+
+    async def disconnect(self, code):
+        if getattr(self, 'group_name', None):
+            await self.channel_layer.group_discard(self.group_name, self.channel_name)
+        if getattr(self, 'flush_task', None):
+            self.flush_task.cancel()
 
     async def task_update(self, event):
-        await self.send(text_data=json.dumps(event))
\ No newline at end of file
+        for change in event['changes']:
+            self.merge(change)
+        if self.flush_task is None:
+            self.flush_task = asyncio.ensure_future(self.flush_later())
+
+    def merge(self, change):
+        # Occurrences of a recurring task share its id, so each is kept apart from the others and from the task
+        key = (change['id'], change.get('occurrence'))
+        if change['op'] == 'delete' and key[1] is None:
+            # The whole task is gone, along with any change to one of its occurrences
+            for pending in [pending for pending in self.pending if pending[0] == key[0] and pending[1] is not None]:
+                del self.pending[pending]
+        previous = self.pending.get(key)
+        if previous and previous['op'] == 'create':
+            if change['op'] == 'delete':
+                # Created and deleted within one batch: the browser never needs to know
+                del self.pending[key]
+                return
+            change = {**change, 'op': 'create'}
+        self.pending[key] = change
+
+    async def flush_later(self):
+        await asyncio.sleep(COALESCE_INTERVAL)
+        changes = list(self.pending.values())
+        self.pending = {}
+        self.flush_task = None
+        if changes:
+            await self.send(text_data=json.dumps({'type': 'tasks.batch', 'changes': changes}))
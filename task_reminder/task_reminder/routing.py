@@ -1,9 +1,7 @@
-from channels.routing import ProtocolTypeRouter, URLRouter
 from django.urls import path
 from . import consumers
 
-application = ProtocolTypeRouter({
-    "websocket": URLRouter([
-        path("ws/tasks/", consumers.TaskConsumer.as_asgi()),
-    ])
-})
\ No newline at end of file
+# WebSocket routes, served by the application in asgi.py
+websocket_urlpatterns = [
+    path("ws/tasks/", consumers.TaskConsumer.as_asgi()),
+]
@@ -35,6 +35,7 @@ ALLOWED_HOSTS = [
 # Application definition
 
 INSTALLED_APPS = [
+    'daphne',  # runserver serves the ASGI application (HTTP and WebSockets)
     "TaskSystemapp.apps.TaskSystemConfig",  #Applications added
     'django.contrib.admin',
     'django.contrib.auth',
@@ -47,11 +48,16 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'TaskSystemapp.middleware.RequestTimingMiddleware',  # First, so its total covers the other middleware
+    'TaskSystemapp.middleware.StaticAssetMiddleware',  # Collected static files, before any session or user lookup
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
+    'TaskSystemapp.middleware.RequestRoutingMiddleware',  # Replica reads, pinned to the primary after a write
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'TaskSystemapp.middleware.RequestProfilerMiddleware',  # ?_profile=1 for staff users
+    'TaskSystemapp.middleware.UserLocaleMiddleware',  # The user's time zone and language, from the user row
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
     'corsheaders.middleware.CorsMiddleware',
@@ -85,8 +91,52 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'world.sqlite3',  # Clearly point to database files
+        'OPTIONS': {
+            'timeout': 20,  # Seconds a writer waits for the lock instead of failing with "database is locked"
+        },
+        'CONN_MAX_AGE': 60,
+        'CONN_HEALTH_CHECKS': True,
     }
 }
+# Optional read replica, e.g. a copy of world.sqlite3 refreshed with python manage.py copy_replica.
+# home, the calendar feeds and search read from it, except right after the session wrote something.
+if os.environ.get('TASK_DB_REPLICA'):
+    DATABASES['replica'] = {
+        **DATABASES['default'],
+        'NAME': os.environ['TASK_DB_REPLICA'],
+        'TEST': {'MIRROR': 'default'},
+    }
+DATABASE_ROUTERS = ['TaskSystemapp.routers.PrimaryReplicaRouter']
+REPLICA_PIN_SECONDS = 15  # How long a session reads from the primary after it wrote
+
+# Applied to every new SQLite connection (TaskSystemapp.db.configure_sqlite).
+# WAL lets readers carry on while the reminder and notification workers write.
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',  # Safe with WAL; only the last transactions can be lost on power failure
+    'cache_size': -20000,  # KiB, i.e. 20 MB of page cache per connection
+    'temp_store': 'MEMORY',
+    'mmap_size': 128 * 1024 * 1024,
+}
+
+# Cache
+# Local memory (per process, LRU culled at MAX_ENTRIES) by default. Point TASK_CACHE_BACKEND/TASK_CACHE_LOCATION
+# at a shared backend, e.g. django.core.cache.backends.redis.RedisCache and redis://127.0.0.1:6379,
+# so that several worker processes share one cache.
+CACHES = {
+    'default': {
+        'BACKEND': os.environ.get('TASK_CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.environ.get('TASK_CACHE_LOCATION', 'task-reminder'),
+        'TIMEOUT': 300,
+    }
+}
+if CACHES['default']['BACKEND'].endswith('LocMemCache'):
+    CACHES['default']['OPTIONS'] = {'MAX_ENTRIES': 10000}
+TASK_CACHE_ALIAS = 'default'
+TASK_CACHE_HOME_TIMEOUT = 60  # Seconds a rendered sidebar/upcoming list is reused
+TASK_CACHE_EVENTS_TIMEOUT = 300  # Seconds a calendar events response is reused
+TASK_CACHE_WIDGET_TIMEOUT = 60  # Seconds a widget's upcoming task list is reused
+TASK_CACHE_EVENTS_MAX_BYTES = 1024 * 1024  # Larger events responses are streamed without caching
 
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
@@ -116,6 +166,10 @@ USE_TZ = True
 
 # Internationalisation
 LANGUAGE_CODE = 'en-us'
+LANGUAGES = [
+    ('en', 'English'),
+    ('zh-hans', 'Simplified Chinese'),
+]
 LOCALE_PATHS = [BASE_DIR / 'locale']
 
 # Static files (CSS, JavaScript, Images)
@@ -125,6 +179,15 @@ BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 
 STATIC_URL = '/static/'
 STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')
+# python manage.py collectstatic writes content-hashed names and .gz/.br copies (pip install brotli for .br),
+# served with far-future caching by TaskSystemapp.middleware.StaticAssetMiddleware
+STORAGES = {
+    'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+    'staticfiles': {'BACKEND': 'TaskSystemapp.storage.CompressedManifestStaticFilesStorage'},
+}
+
+# Uploaded files, e.g. task imports waiting to be resumed
+MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.1/ref/settings/#default-auto-field
@@ -135,6 +198,50 @@ BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 AUTH_USER_MODEL = 'TaskSystemapp.CustomUser'
 LOGIN_URL = '/TaskSystemapp/login/'  # Customise the login path
 LOGIN_REDIRECT_URL = '/TaskSystemapp/home/'  # Jump path after successful login
-ASGI_APPLICATION = 'task_reminder.routing.application'
-
-
+ASGI_APPLICATION = 'task_reminder.asgi.application'
+
+
+# Reminder scheduler (python manage.py run_reminders)
+REMINDER_HANDLER = 'TaskSystemapp.notifications.queue_reminders'  # Called with the list of tasks whose reminders fired
+REMINDER_HORIZON = 3600  # Seconds of upcoming reminders held in memory
+REMINDER_GRACE = 86400  # Reminders missed by less than this (e.g. while the scheduler was down) still fire
+REMINDER_POLL_INTERVAL = 30  # Seconds between polls for created, completed or rescheduled tasks
+
+# Notification delivery (python manage.py deliver_notifications)
+EMAIL_BACKEND = 'django.core.mail.backends.console.EmailBackend'  # Use the SMTP backend and EMAIL_HOST etc. in production
+DEFAULT_FROM_EMAIL = 'reminders@localhost'
+SMS_BACKEND = 'TaskSystemapp.sms.ConsoleSMSBackend'  # A BaseSMSBackend subclass for the SMS provider
+NOTIFICATION_CHANNELS = ['email', 'sms']  # How reminders are sent; SMS only to users with a phone number
+NOTIFICATION_BATCH_SIZE = 200  # Notifications claimed and sent per batch
+NOTIFICATION_RATE_LIMIT = (5, 3600)  # At most 5 messages per recipient per hour; later ones wait and are merged
+NOTIFICATION_MAX_ATTEMPTS = 6  # Failed sends before a notification is dead-lettered
+NOTIFICATION_RETRY_DELAY = 30  # Seconds before the first retry, doubled after each failure
+NOTIFICATION_RETRY_MAX_DELAY = 3600  # Longest wait between retries
+NOTIFICATION_LEASE = 300  # Seconds a claimed batch is held before another worker may take it over
+NOTIFICATION_POLL_INTERVAL = 10  # Seconds between checks for newly queued notifications
+
+# Task import (import/ endpoint and python manage.py import_tasks)
+TASK_IMPORT_CHUNK_SIZE = 500  # Records validated, inserted and committed together
+
+# Task archive (python manage.py archive_tasks, e.g. nightly from cron)
+TASK_ARCHIVE_AFTER_DAYS = 90  # Completed tasks due and last changed longer ago than this are archived
+TASK_ARCHIVE_CHUNK_SIZE = 500  # Tasks moved per transaction
+
+# Request instrumentation (TaskSystemapp.middleware.RequestTimingMiddleware)
+PERF_SLOW_REQUEST_MS = 500  # Requests slower than this are logged to TaskSystemapp.performance
+PERF_PROFILE_DIR = None  # Set to a directory to also keep staff request profiles as .prof files
+
+# Channel layer carrying live task updates to the WebSocket consumers. The SQLite layer reaches the sockets of every
+# worker process on this host through one shared file; use channels_redis.core.RedisChannelLayer across hosts, and
+# channels.layers.InMemoryChannelLayer only with a single process.
+CHANNEL_LAYERS = {
+    'default': {
+        'BACKEND': 'TaskSystemapp.layers.SQLiteChannelLayer',
+        'CONFIG': {
+            'path': os.path.join(BASE_DIR, 'channels.sqlite3'),
+            'capacity': 100,  # Messages waiting per channel before sends to it fail
+            'expiry': 60,  # Seconds before an unreceived message is dropped
+            'poll_interval': 0.01,  # Seconds between reads while a socket of the process waits for messages
+        },
+    }
+}